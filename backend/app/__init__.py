@@ -1,37 +1,201 @@
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_cors import CORS
+from .admission import parse_limits
+from .engine import READ_BIND, SQLITE_PRAGMAS, RoutingSession, configure_engines, engine_options, shard_binds
+from .startup import MigrateCommands, prepare_database, track_forks
+from datetime import datetime
+from functools import lru_cache
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+@lru_cache(maxsize=8192)
+def format_datetime(value):
+    """ISO-format a datetime; cached because the same timestamps repeat across payloads"""
+    return value.isoformat()
+
+class FocusFlowJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson when it is installed and the stdlib otherwise.
+
+    Output is compact with sorted keys either way, and datetimes are written
+    as ISO 8601 strings like the models' to_dict() methods do.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, datetime):
+            return format_datetime(o)
+        return DefaultJSONProvider.default(o)
 
-def create_app():
+    def dumps_bytes(self, obj):
+        """Serialize obj to compact UTF-8 JSON bytes"""
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass  # e.g. integers wider than 64 bits; let the stdlib handle them
+        return super().dumps(obj, separators=(',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            return self.dumps_bytes(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+def create_app(config=None):
+    """Create the Flask app; values in config override the defaults below"""
     app = Flask(__name__)
+    app.json = FocusFlowJSONProvider(app)
     
     # Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///focusflow.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DATABASE_READ_URL'] = os.environ.get('DATABASE_READ_URL')  # optional read-only engine for GETs
+    app.config['SHARD_URLS'] = [url for url in os.environ.get('SHARD_URLS', '').split(',') if url]  # extra user shards
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds
+    app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    app.config['SQLITE_PRAGMAS'] = dict(SQLITE_PRAGMAS)
+    app.config['DB_STARTUP'] = os.environ.get('DB_STARTUP', 'create_all')  # create_all, check or skip
+    app.config['MIGRATIONS_DIR'] = os.environ.get('MIGRATIONS_DIR', os.path.join(os.path.dirname(app.root_path), 'migrations'))
+    app.config['TOKEN_MAX_AGE'] = int(os.environ.get('TOKEN_MAX_AGE', 7 * 24 * 60 * 60))  # seconds
+    app.config['TOKEN_CACHE_SIZE'] = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+    app.config['TOKEN_CACHE_TTL'] = int(os.environ.get('TOKEN_CACHE_TTL', 30))  # seconds before a cached token is checked for revocation again
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    app.config['PASSWORD_SALT_LENGTH'] = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    app.config['PASSWORD_HASH_QUEUE_LIMIT'] = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 32))
+    app.config['RESPONSE_CACHE'] = os.environ.get('RESPONSE_CACHE', 'sqlite')  # sqlite, memory (single process only) or none
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+    app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 300))  # seconds
+    app.config['RESPONSE_CACHE_PATH'] = os.environ.get('RESPONSE_CACHE_PATH')
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes
+    app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # bearer token for /metrics; unset serves local clients only
+    app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', 'true').lower() == 'true'
+    app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 500))  # 0 disables the slow-request log
+    app.config['QUERY_CHECKS'] = os.environ.get('QUERY_CHECKS', 'off')  # off, warn or raise
+    app.config['QUERY_REPEAT_THRESHOLD'] = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 3))
+    app.config['TOMBSTONE_RETENTION_DAYS'] = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', 30))  # see flask compact-tombstones
+    app.config['COLD_STORAGE_AFTER_DAYS'] = int(os.environ.get('COLD_STORAGE_AFTER_DAYS', 90))  # see flask freeze-archived-goals
+    app.config['COLD_STORAGE_BATCH_SIZE'] = int(os.environ.get('COLD_STORAGE_BATCH_SIZE', 500))
+    app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))  # goals per INSERT when importing NDJSON
+    app.config['ADMISSION_CONTROL'] = os.environ.get('ADMISSION_CONTROL', 'true').lower() == 'true'
+    app.config['ADMISSION_LIMITS'] = parse_limits(os.environ.get('ADMISSION_LIMITS', ''))  # concurrent requests per class and process
+    app.config['ADMISSION_QUEUE_LIMIT'] = int(os.environ.get('ADMISSION_QUEUE_LIMIT', 64))  # waiting requests per class
+    app.config['ADMISSION_QUEUE_TIMEOUT_MS'] = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', 1000))
+    app.config['RATE_LIMIT_PER_SECOND'] = float(os.environ.get('RATE_LIMIT_PER_SECOND', 50))  # per user, 0 to disable
+    app.config['RATE_LIMIT_BURST'] = int(os.environ.get('RATE_LIMIT_BURST', 100))
+    app.config['BATCH_WORKERS'] = int(os.environ.get('BATCH_WORKERS', 4))  # threads for parallel batch reads, 0 to disable
+    
+    if config:
+        app.config.update(config)
+    
+    # Database engine profile
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    if app.config['DATABASE_READ_URL']:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[READ_BIND] = app.config['DATABASE_READ_URL']
+    if app.config['SHARD_URLS']:
+        app.config.setdefault('SQLALCHEMY_BINDS', {}).update(shard_binds(app.config))
     
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    configure_engines(app, db)
+    app.cli.add_command(MigrateCommands(db, app.config['MIGRATIONS_DIR']))
     
     # Enable CORS
     CORS(app)
     
+    # Per-request SQL and latency metrics; installed first so they time the other hooks
+    if app.config['METRICS_ENABLED']:
+        from .metrics import init_metrics
+        init_metrics(app, db)
+    
+    # N+1 detection and per-view query budgets for development and tests
+    if app.config['QUERY_CHECKS'] != 'off':
+        from .querylog import init_query_checks
+        init_query_checks(app, db)
+    
+    # Per-class concurrency limits and per-user rate limits that shed load early
+    if app.config['ADMISSION_CONTROL']:
+        from .admission import init_admission
+        init_admission(app)
+    
+    # Negotiated gzip/deflate compression, including streamed responses
+    from .compression import compress_response
+    app.after_request(compress_response)
+    
+    # Signed auth tokens with an in-process verification cache and stored revocations
+    from .tokens import TokenManager
+    app.extensions['focusflow_tokens'] = TokenManager(
+        app.config['SECRET_KEY'],
+        app.config['TOKEN_MAX_AGE'],
+        app.config['TOKEN_CACHE_SIZE'],
+        app.config['TOKEN_CACHE_TTL']
+    )
+    
+    # Password hashing runs on a bounded pool off the request threads
+    from .passwords import PasswordHasher
+    app.extensions['focusflow_passwords'] = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        app.config['PASSWORD_SALT_LENGTH'],
+        app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_QUEUE_LIMIT']
+    )
+    
+    # Per-user cache for goal list responses
+    from .cache import create_response_cache
+    app.extensions['focusflow_response_cache'] = create_response_cache(app)
+    
+    # Sub-requests of POST /batch go through the app's own WSGI handler
+    from .batch import BatchDispatcher
+    app.extensions['focusflow_batch'] = BatchDispatcher(app, app.config['BATCH_WORKERS'])
+    
     # Import and register blueprints
     from .routes import goals_bp
+    from .bulk import bulk_bp
+    from .transfer import transfer_bp
+    from .stats import stats_bp
     from .auth import auth_bp
+    from .batch import batch_bp
     
     app.register_blueprint(goals_bp, url_prefix='/goals')
+    app.register_blueprint(bulk_bp, url_prefix='/goals')
+    app.register_blueprint(transfer_bp, url_prefix='/goals')
+    app.register_blueprint(stats_bp, url_prefix='/goals')
     app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(batch_bp)
+    
+    # Delta-sync, cold storage, export/import and stats commands
+    from .sync import compact_tombstones_command
+    from .coldstore import freeze_archived_goals_command
+    from .transfer import export_goals_command, import_goals_command
+    from .stats import rebuild_stats_command
+    app.cli.add_command(compact_tombstones_command)
+    app.cli.add_command(freeze_archived_goals_command)
+    app.cli.add_command(export_goals_command)
+    app.cli.add_command(import_goals_command)
+    app.cli.add_command(rebuild_stats_command)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Create or verify the schema, and reset pools in forked workers
+    prepare_database(app, db)
+    track_forks(app)
     
     return app
@@ -0,0 +1,292 @@
+from collections import OrderedDict, defaultdict, deque
+from flask import current_app, g, jsonify, request
+from threading import Event, Lock
+from time import monotonic, perf_counter
+from .metrics import DURATION_BUCKETS, Histogram, _labels
+from .tokens import verify_token
+import math
+import time
+
+# Admission control runs before any view. Every request is put in an
+# endpoint class; each class admits at most its limit of requests at once
+# per process, and the rest wait in line. A request is turned away with 503
+# as soon as its queue time (including time spent queued at the proxy,
+# from X-Request-Start) would exceed ADMISSION_QUEUE_TIMEOUT_MS, judged from
+# how long the class's requests have been taking, so overload shows up as
+# quick rejections instead of long tails for everyone. Authenticated users
+# are also rate limited with a token bucket each and get 429 once it runs dry.
+
+DEFAULT_ADMISSION_LIMITS = {'auth': 8, 'heavy': 4, 'write': 16, 'read': 64}
+
+# Requests that read or write a user's whole dataset
+HEAVY_ENDPOINTS = {'transfer.export_goals', 'transfer.import_goals', 'bulk.bulk_goals', 'bulk.bulk_milestones'}
+LIST_ENDPOINTS = {'goals.get_goals', 'goals.get_archived_goals'}
+
+# Password hashing endpoints
+AUTH_ENDPOINTS = {'auth.login', 'auth.register'}
+
+# Never queued or limited; a batch's sub-requests are admitted one by one
+EXEMPT_ENDPOINTS = {'metrics.metrics', 'static', 'batch.batch'}
+
+# Users whose token buckets are kept; the least recently seen start over full
+MAX_RATE_LIMITED_USERS = 100000
+
+# Weight of the latest request in a class's average handling time
+SERVICE_TIME_WEIGHT = 0.1
+
+def parse_limits(value):
+    """Parse 'class=limit,...' over the default limits; a limit of 0 removes the cap"""
+    limits = dict(DEFAULT_ADMISSION_LIMITS)
+    for item in value.split(','):
+        if item.strip():
+            name, limit = item.split('=', 1)
+            limits[name.strip()] = int(limit)
+    return limits
+
+def busy_response(status, message, retry_after):
+    """Fast rejection telling the client to come back in retry_after seconds"""
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(math.ceil(retry_after), 1))
+    return response
+
+class ConcurrencyLimit:
+    """Admits up to limit holders at once and lines up at most queue_limit more.
+
+    Waiters are admitted in arrival order: each holds a ticket in a queue and
+    a released slot is handed straight to the oldest ticket, so newcomers
+    never overtake them.
+    """
+
+    def __init__(self, limit, queue_limit):
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.active = 0
+        self.service_time = 0.0  # moving average of seconds a slot is held
+        self._tickets = deque()  # one Event per waiter, oldest first
+        self._lock = Lock()
+
+    @property
+    def waiting(self):
+        return len(self._tickets)
+
+    def expected_wait(self):
+        """Seconds a request arriving now would probably wait"""
+        if self.active < self.limit and not self.waiting:
+            return 0.0
+        return self.service_time * (self.waiting + 1) / self.limit
+
+    def acquire(self, timeout):
+        """Take a slot within timeout seconds; returns None, or the suggested retry delay if refused"""
+        with self._lock:
+            if self.active < self.limit and not self._tickets:
+                self.active += 1
+                return None
+            expected = self.expected_wait()
+            if len(self._tickets) >= self.queue_limit or expected > timeout:
+                return expected
+
+            ticket = Event()
+            self._tickets.append(ticket)
+
+        if ticket.wait(timeout):
+            return None
+
+        with self._lock:
+            if ticket.is_set():
+                return None  # handed a slot just as the wait timed out
+            self._tickets.remove(ticket)
+            return self.expected_wait()
+
+    def release(self, held):
+        """Give back a slot that was held for held seconds"""
+        with self._lock:
+            self.service_time += (held - self.service_time) * SERVICE_TIME_WEIGHT
+            if self._tickets:
+                # The slot passes to the oldest waiter without ever being free
+                self._tickets.popleft().set()
+            else:
+                self.active -= 1
+
+class TokenBuckets:
+    """Per-key token buckets refilled at rate tokens per second up to burst"""
+
+    def __init__(self, rate, burst, max_keys=MAX_RATE_LIMITED_USERS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = Lock()
+
+    def take(self, key):
+        """Take a token from key's bucket; returns 0, or the seconds until one is available"""
+        now = monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+class AdmissionController:
+    """Per-process concurrency limits, rate limits and their metrics"""
+
+    def __init__(self, limits, queue_limit, queue_timeout, rate, burst):
+        self.limits = {name: ConcurrencyLimit(limit, queue_limit) for name, limit in limits.items() if limit > 0}
+        self.queue_timeout = queue_timeout
+        self.rate_limits = TokenBuckets(rate, burst) if rate > 0 else None
+        self.queue_time = Histogram(
+            'focusflow_request_queue_seconds', 'Time requests waited before being handled or rejected.',
+            DURATION_BUCKETS, ('class',)
+        )
+        self._rejections = defaultdict(int)  # (class, reason) -> count
+        self._lock = Lock()
+
+    def reject(self, endpoint_class, reason):
+        with self._lock:
+            self._rejections[(endpoint_class, reason)] += 1
+
+    def render(self):
+        """Prometheus lines for queue times, rejections and slots in use"""
+        lines = self.queue_time.render()
+
+        with self._lock:
+            rejections = sorted(self._rejections.items())
+        lines += [
+            '# HELP focusflow_rejections_total Requests rejected by admission control.',
+            '# TYPE focusflow_rejections_total counter',
+        ]
+        lines += [f'focusflow_rejections_total{_labels(("class", "reason"), key)} {count}' for key, count in rejections]
+
+        for metric, description, attribute in (
+            ('focusflow_requests_in_flight', 'Admitted requests being handled.', 'active'),
+            ('focusflow_requests_queued', 'Requests waiting for admission.', 'waiting'),
+        ):
+            lines += [f'# HELP {metric} {description}', f'# TYPE {metric} gauge']
+            lines += [
+                f'{metric}{_labels(("class",), (name,))} {getattr(limit, attribute)}'
+                for name, limit in sorted(self.limits.items())
+            ]
+        return lines
+
+def endpoint_class():
+    """Return the admission class of the current request, or None if it is exempt"""
+    endpoint = request.endpoint
+    if endpoint is None or endpoint in EXEMPT_ENDPOINTS or request.method == 'OPTIONS':
+        return None
+    if endpoint in AUTH_ENDPOINTS:
+        return 'auth'
+    if endpoint in HEAVY_ENDPOINTS:
+        return 'heavy'
+
+    args = request.args
+    if endpoint in LIST_ENDPOINTS and 'limit' not in args and 'cursor' not in args and (
+        endpoint == 'goals.get_archived_goals'
+        or args.get('include_archived', 'false').lower() == 'true'
+        or args.get('stream', 'false').lower() == 'true'
+    ):
+        return 'heavy'
+    if endpoint == 'goals.get_changes' and args.get('since', '0') == '0':
+        return 'heavy'  # full sync
+
+    return 'read' if request.method in ('GET', 'HEAD') else 'write'
+
+def upstream_queue_time():
+    """Seconds the request spent queued before reaching this process, from X-Request-Start"""
+    header = request.headers.get('X-Request-Start')
+    if not header:
+        return 0.0
+    try:
+        started = float(header.removeprefix('t='))
+    except ValueError:
+        return 0.0
+    if not math.isfinite(started) or started <= 0:
+        return 0.0
+
+    # Proxies send seconds, milliseconds or microseconds since the epoch
+    while started > 1e11:
+        started /= 1000
+    return max(time.time() - started, 0.0)
+
+def _bearer_user_id():
+    """The user id login_required will resolve for this request, or None"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    return verify_token(auth_header[len('Bearer '):])
+
+def _admit():
+    """before_request hook applying the rate limit and the class's concurrency limit"""
+    name = endpoint_class()
+    if name is None:
+        return None
+
+    controller = get_admission_controller()
+    if controller.rate_limits is not None:
+        user_id = _bearer_user_id()
+        if user_id is not None:
+            wait = controller.rate_limits.take(user_id)
+            if wait:
+                controller.reject(name, 'rate_limit')
+                return busy_response(429, 'Too many requests, please retry shortly', wait)
+
+    g.queue_time = upstream_queue_time()
+    if g.queue_time > controller.queue_timeout:
+        # Queued too long at the proxy; the client has likely given up
+        controller.queue_time.observe((name,), g.queue_time)
+        controller.reject(name, 'expired')
+        return busy_response(503, 'Server busy, please retry shortly', 1)
+
+    limit = controller.limits.get(name)
+    if limit is None:
+        controller.queue_time.observe((name,), g.queue_time)
+        return None
+
+    started = perf_counter()
+    retry_after = limit.acquire(controller.queue_timeout - g.queue_time)
+    g.queue_time += perf_counter() - started
+    controller.queue_time.observe((name,), g.queue_time)
+    if retry_after is not None:
+        controller.reject(name, 'overloaded')
+        return busy_response(503, 'Server busy, please retry shortly', retry_after)
+
+    g.admission_slot = (limit, perf_counter())
+    return None
+
+def _add_queue_timing(response):
+    """after_request hook reporting the request's queue time in Server-Timing"""
+    queue_time = g.get('queue_time')
+    if queue_time is not None and current_app.config['SERVER_TIMING']:
+        response.headers.add('Server-Timing', f'queue;dur={queue_time * 1000:.2f}')
+    return response
+
+def _release(exc):
+    """teardown_request hook freeing the request's slot, after any streamed body is sent"""
+    slot = g.pop('admission_slot', None)
+    if slot is not None:
+        limit, admitted = slot
+        limit.release(perf_counter() - admitted)
+
+def init_admission(app):
+    """Install the admission hooks with the limits in the app's config"""
+    config = app.config
+    app.extensions['focusflow_admission'] = AdmissionController(
+        config['ADMISSION_LIMITS'],
+        config['ADMISSION_QUEUE_LIMIT'],
+        config['ADMISSION_QUEUE_TIMEOUT_MS'] / 1000,
+        config['RATE_LIMIT_PER_SECOND'],
+        config['RATE_LIMIT_BURST']
+    )
+    app.before_request(_admit)
+    app.after_request(_add_queue_timing)
+    app.teardown_request(_release)
+
+def get_admission_controller():
+    """Return the admission controller registered by create_app"""
+    return current_app.extensions['focusflow_admission']
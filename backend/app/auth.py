@@ -1,32 +1,38 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from .models import db, User
+from .admission import busy_response
+from .models import db
+from .passwords import HashingPoolSaturated, check_password, hash_password, password_needs_rehash
+from .shards import create_user, find_user, use_user_shard, username_taken
+from .tokens import issue_token, revoke_token, verify_token
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
 
+def _hashing_busy_response():
+    """Fast rejection used when the password hashing pool is saturated"""
+    return busy_response(503, 'Server busy, please retry shortly', 1)
+
 def login_required(f):
     """Decorator to require authentication for protected routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # For now, we'll use a simple header-based auth
-        # Later this will be replaced with JWT tokens
         auth_header = request.headers.get('Authorization')
         
         if not auth_header or not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Authentication required'}), 401
         
-        # Extract user ID from token (simplified for now)
-        # In production, this would decode a JWT token
+        # Verify the signed token; no database access is needed
         try:
-            user_id = int(auth_header.split(' ')[1])
-            user = User.query.get(user_id)
-            if not user:
-                return jsonify({'error': 'Invalid token'}), 401
-            request.user_id = user_id
-        except (ValueError, IndexError):
+            token = auth_header.split(' ')[1]
+        except IndexError:
             return jsonify({'error': 'Invalid token format'}), 401
         
+        user_id = verify_token(token)
+        if user_id is None:
+            return jsonify({'error': 'Invalid token'}), 401
+        request.user_id = user_id
+        use_user_shard(user_id)
+        
         return f(*args, **kwargs)
     return decorated_function
 
@@ -42,14 +48,15 @@ def register():
     password = data['password']
     
     # Check if username already exists
-    if User.query.filter_by(username=username).first():
+    if username_taken(username):
         return jsonify({'error': 'Username already exists'}), 400
     
     # Create new user
-    hashed_password = generate_password_hash(password)
-    user = User(username=username, password=hashed_password)
-    
-    db.session.add(user)
+    try:
+        hashed_password = hash_password(password)
+    except HashingPoolSaturated:
+        return _hashing_busy_response()
+    user = create_user(username, hashed_password)
     db.session.commit()
     
     return jsonify({
@@ -60,7 +67,7 @@ def register():
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
-    """Login user and return user ID (temporary token)"""
+    """Login user and return a signed, expiring token"""
     data = request.get_json()
     
     if not data or 'username' not in data or 'password' not in data:
@@ -69,16 +76,30 @@ def login():
     username = data['username']
     password = data['password']
     
-    user = User.query.filter_by(username=username).first()
+    user = find_user(username)
     
-    if not user or not check_password_hash(user.password, password):
-        return jsonify({'error': 'Invalid username or password'}), 401
+    try:
+        if not user or not check_password(user.password, password):
+            return jsonify({'error': 'Invalid username or password'}), 401
+        
+        # Upgrade hashes made with outdated parameters while we have the password
+        if password_needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.session.commit()
+    except HashingPoolSaturated:
+        return _hashing_busy_response()
     
-    # For now, return user ID as a simple token
-    # Later this will be replaced with a proper JWT token
     return jsonify({
         'message': 'Login successful',
         'user_id': user.id,
         'username': user.username,
-        'token': str(user.id)  # Simple token for now
+        'token': issue_token(user.id)
     })
+
+@auth_bp.route('/logout', methods=['POST'])
+@login_required
+def logout():
+    """Revoke the token used to make this request"""
+    revoke_token(request.headers['Authorization'].split(' ')[1])
+    db.session.commit()
+    return jsonify({'message': 'Logout successful'})
@@ -0,0 +1,173 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, Response, current_app, request, jsonify
+from urllib.parse import urlsplit
+import posixpath
+from werkzeug.test import EnvironBuilder
+from .admission import busy_response, upstream_queue_time
+from .auth import login_required
+import time
+
+batch_bp = Blueprint('batch', __name__)
+
+MAX_BATCH_REQUESTS = 50
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+READ_METHODS = ('GET',)
+
+# Only API routes can be batched; /metrics and anything else outside these
+# prefixes must be requested directly so their own access checks apply
+BATCH_PATH_PREFIXES = ('/goals', '/auth')
+
+# Headers of the batch request that every sub-request inherits
+FORWARDED_HEADERS = ('Authorization', 'X-Forwarded-For')
+
+# Headers set for each sub-request rather than taken from the item
+STAMPED_HEADERS = ('X-Request-Start',)
+
+# Headers of a sub-response that are passed back to the client
+RETURNED_HEADERS = ('ETag', 'Retry-After')
+
+class BatchDispatcher:
+    """Runs sub-requests through the app's own WSGI handler.
+
+    Every sub-request gets a fresh app and request context, so it has its
+    own database session, g and hooks (auth, admission control, caching,
+    metrics), exactly as if it had arrived on its own. Read-only
+    sub-requests can run on a thread pool of max_workers threads.
+    """
+
+    def __init__(self, app, max_workers):
+        self.app = app
+        self.max_workers = max_workers
+        self._start_pool()
+
+    def _start_pool(self):
+        self._executor = None
+        if self.max_workers:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch')
+
+    def dispatch(self, environ):
+        """Handle one sub-request and return its buffered response"""
+        # Its queue time starts now, not when the batch reached the proxy
+        environ['HTTP_X_REQUEST_START'] = f't={time.time():.6f}'
+        with self.app.app_context():
+            return Response.from_app(self.app.wsgi_app, environ, buffered=True)
+
+    def dispatch_all(self, environs, parallel):
+        """Handle sub-requests in order and return their responses.
+
+        With parallel, each run of consecutive reads is spread over the pool
+        and the request thread; writes still run one at a time in between,
+        so every read sees the writes listed before it.
+        """
+        if not parallel or self._executor is None:
+            return [self.dispatch(environ) for environ in environs]
+
+        responses = []
+        reads = []
+        for environ in [*environs, None]:
+            if environ is not None and environ['REQUEST_METHOD'] in READ_METHODS:
+                reads.append(environ)
+                continue
+
+            if reads:
+                futures = [self._executor.submit(self.dispatch, read) for read in reads[1:]]
+                responses.append(self.dispatch(reads[0]))
+                responses += [future.result() for future in futures]
+                reads = []
+            if environ is not None:
+                responses.append(self.dispatch(environ))
+        return responses
+
+    def reset_after_fork(self):
+        """Replace the pool in a forked child, where the parent's threads do not exist"""
+        self._start_pool()
+
+def _build_environ(item):
+    """Build the WSGI environ for one sub-request, or return an error message"""
+    if not isinstance(item, dict):
+        return None, 'Each request must be an object'
+
+    method = item.get('method', 'GET')
+    if not isinstance(method, str) or method.upper() not in BATCH_METHODS:
+        return None, f'Method must be one of {", ".join(BATCH_METHODS)}'
+
+    path = item.get('path')
+    if not isinstance(path, str) or not path.startswith('/'):
+        return None, 'Path must start with /'
+    route = posixpath.normpath(urlsplit(path).path)
+    if route == '/batch':
+        return None, 'Batches cannot be nested'
+    if not any(route == prefix or route.startswith(prefix + '/') for prefix in BATCH_PATH_PREFIXES):
+        return None, f'Only paths under {", ".join(BATCH_PATH_PREFIXES)} can be batched'
+
+    headers = item.get('headers') or {}
+    if not isinstance(headers, dict) or not all(isinstance(value, str) for value in headers.values()):
+        return None, 'Headers must map names to strings'
+    headers = {name: value for name, value in headers.items() if name.title() not in FORWARDED_HEADERS + STAMPED_HEADERS}
+    headers.update((name, request.headers[name]) for name in FORWARDED_HEADERS if name in request.headers)
+
+    builder = EnvironBuilder(
+        path=path,
+        method=method.upper(),
+        base_url=request.host_url,
+        headers=headers,
+        json=item['body'] if 'body' in item else None,
+        environ_base={'REMOTE_ADDR': request.remote_addr}
+    )
+    try:
+        return builder.get_environ(), None
+    finally:
+        builder.close()
+
+def _response_dict(response):
+    if response.is_json:
+        body = response.get_json(silent=True)
+    else:
+        body = response.get_data(as_text=True) or None
+    return {
+        'status': response.status_code,
+        'headers': {name: response.headers[name] for name in RETURNED_HEADERS if name in response.headers},
+        'body': body
+    }
+
+@batch_bp.route('/batch', methods=['POST'])
+@login_required
+def batch():
+    """Run many API requests in one round trip and return their responses in order.
+
+    Each sub-request is handled like a separate request with the batch's
+    credentials and commits on its own. They run in order, except that with
+    parallel, consecutive reads run concurrently.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('requests'), list):
+        return jsonify({'error': 'A list of requests is required'}), 400
+
+    items = data['requests']
+    if len(items) > MAX_BATCH_REQUESTS:
+        return jsonify({'error': f'At most {MAX_BATCH_REQUESTS} requests are allowed per batch'}), 400
+
+    # The batch itself is exempt from admission, so its proxy queue time is judged once here
+    controller = current_app.extensions.get('focusflow_admission')
+    if controller is not None and upstream_queue_time() > controller.queue_timeout:
+        controller.reject('batch', 'expired')
+        return busy_response(503, 'Server busy, please retry shortly', 1)
+
+    environs, errors = [], {}
+    for index, item in enumerate(items):
+        environ, error = _build_environ(item)
+        if error:
+            errors[index] = {'status': 400, 'headers': {}, 'body': {'error': error}}
+        else:
+            environs.append(environ)
+
+    responses = iter(
+        current_app.extensions['focusflow_batch'].dispatch_all(environs, bool(data.get('parallel', False)))
+    )
+    return jsonify({
+        'responses': [
+            errors[index] if index in errors else _response_dict(next(responses))
+            for index in range(len(items))
+        ]
+    })
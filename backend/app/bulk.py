@@ -0,0 +1,351 @@
+from flask import Blueprint, request, jsonify
+from .models import db, Goal, Milestone
+from .auth import login_required
+from .cache import invalidate_after_write
+from .queries import MILESTONE_COLUMNS, insert_in_row_order, load_goal_dicts, milestone_row_to_dict
+from .stats import add_goal_activity, remove_goal_activity
+from .sync import next_revision, record_deletions
+from datetime import datetime
+
+bulk_bp = Blueprint('bulk', __name__)
+bulk_bp.after_request(invalidate_after_write)
+
+MAX_BULK_OPERATIONS = 500
+
+# Types accepted for the fields an operation may set
+GOAL_FIELD_TYPES = {'title': str, 'description': (str, type(None)), 'category': str}
+MILESTONE_FIELD_TYPES = {'title': str, 'completed': bool}
+
+def _int_id(value):
+    """Return value if it is a usable integer id, otherwise None"""
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+def _error(index, status, message):
+    return {'index': index, 'status': status, 'error': message}
+
+def _field_error(op, field_types):
+    """Return a message naming the first field of op with the wrong type, or None"""
+    for field, types in field_types.items():
+        if field in op and not isinstance(op[field], types):
+            return f'Invalid {field}'
+    return None
+
+def _read_batch(data):
+    """Validate the request envelope, returning (operations, atomic, error)"""
+    if not isinstance(data, dict) or not isinstance(data.get('operations'), list):
+        return None, None, 'A list of operations is required'
+
+    operations = data['operations']
+    if len(operations) > MAX_BULK_OPERATIONS:
+        return None, None, f'At most {MAX_BULK_OPERATIONS} operations are allowed per request'
+
+    atomic = data.get('atomic', True)
+    if not isinstance(atomic, bool):
+        return None, None, 'atomic must be true or false'
+
+    return operations, atomic, None
+
+def _finish(results, errors):
+    """Commit the applied operations and report every item's outcome"""
+    db.session.commit()
+    results = sorted(results + errors, key=lambda result: result['index'])
+    return jsonify({'results': results}), 207 if errors else 200
+
+def _refresh_goal_counters(goal_ids, revision, auto_archive_ids=()):
+    """Recount milestone counters and stamp the sync revision of the given goals with one UPDATE.
+
+    Goals in auto_archive_ids are then archived by a second UPDATE if all of
+    their milestones are completed, the same rule update_milestone applies.
+    """
+    if not goal_ids:
+        return
+
+    now = datetime.utcnow()
+    db.session.execute(
+        db.update(Goal).where(Goal.id.in_(goal_ids)).values(
+            milestone_total=db.select(db.func.count(Milestone.id))
+            .where(Milestone.goal_id == Goal.id)
+            .scalar_subquery(),
+            milestone_completed=db.select(db.func.count(Milestone.id))
+            .where(Milestone.goal_id == Goal.id, Milestone.completed == True)
+            .scalar_subquery(),
+            updated_at=now,
+            revision=revision
+        ),
+        execution_options={'synchronize_session': False}
+    )
+
+    if auto_archive_ids:
+        db.session.execute(
+            db.update(Goal).where(
+                Goal.id.in_(auto_archive_ids),
+                Goal.milestone_total > 0,
+                Goal.milestone_completed == Goal.milestone_total
+            ).values(archived=True, archived_at=now),
+            execution_options={'synchronize_session': False}
+        )
+
+@bulk_bp.route('/bulk', methods=['POST'])
+@login_required
+def bulk_goals():
+    """Create, update and delete many goals in one transaction.
+
+    Created goals may carry their own list of milestones. With atomic (the
+    default) nothing is applied if any operation is invalid; otherwise the
+    valid operations are applied and the rest are reported as errors.
+    """
+    user_id = request.user_id
+    operations, atomic, error = _read_batch(request.get_json())
+
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Resolve ownership (and current category) of every referenced goal with a single query
+    referenced_ids = {
+        _int_id(op.get('id')) for op in operations
+        if isinstance(op, dict) and op.get('op') in ('update', 'delete')
+    }
+    owned_categories = dict(db.session.execute(
+        db.select(Goal.id, Goal.category).where(Goal.user_id == user_id, Goal.id.in_(referenced_ids - {None}))
+    ).all())
+
+    creates, updates, deletes, errors = [], [], [], []
+    seen_ids = set()
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        # Checked before anything touches the session, so a bad value is this
+        # operation's 400 instead of a failed flush
+        field_error = _field_error(op, GOAL_FIELD_TYPES) if kind else None
+
+        if kind == 'create':
+            milestones = op.get('milestones', [])
+            if 'title' not in op:
+                errors.append(_error(index, 400, 'Title is required'))
+            elif field_error:
+                errors.append(_error(index, 400, field_error))
+            elif not isinstance(milestones, list) or not all(
+                isinstance(milestone, dict) and isinstance(milestone.get('title'), str) for milestone in milestones
+            ):
+                errors.append(_error(index, 400, 'Every milestone requires a title'))
+            else:
+                creates.append((index, op))
+        elif kind in ('update', 'delete'):
+            goal_id = _int_id(op.get('id'))
+            if goal_id not in owned_categories:
+                errors.append(_error(index, 404, 'Goal not found'))
+            elif goal_id in seen_ids:
+                errors.append(_error(index, 400, 'Goal appears more than once in this batch'))
+            elif kind == 'update' and field_error:
+                errors.append(_error(index, 400, field_error))
+            else:
+                seen_ids.add(goal_id)
+                (updates if kind == 'update' else deletes).append((index, op))
+        else:
+            errors.append(_error(index, 400, 'Unknown operation'))
+
+    if atomic and errors:
+        return jsonify({'error': 'No operations were applied', 'results': errors}), 400
+
+    now = datetime.utcnow()
+    revision = next_revision(user_id) if creates or updates or deletes else None
+
+    # Stats of recategorized and deleted goals are uncounted now and the
+    # recategorized and created ones counted once they are written
+    recategorized_ids = [
+        op['id'] for _, op in updates if 'category' in op and op['category'] != owned_categories[op['id']]
+    ]
+    remove_goal_activity(recategorized_ids + [op['id'] for _, op in deletes])
+
+    # Insert goals and report their ids in input order, then all of their
+    # milestones with a single executemany
+    created_ids = []
+    if creates:
+        created_ids = [row.id for row in insert_in_row_order(
+            Goal,
+            [
+                {
+                    'title': op['title'],
+                    'description': op.get('description', ''),
+                    'category': op.get('category', 'Personal'),
+                    'user_id': user_id,
+                    'milestone_total': len(op.get('milestones', [])),
+                    'revision': revision
+                }
+                for _, op in creates
+            ],
+            Goal.id
+        )]
+
+        milestone_rows = [
+            {'title': milestone['title'], 'goal_id': goal_id}
+            for (_, op), goal_id in zip(creates, created_ids)
+            for milestone in op.get('milestones', [])
+        ]
+        if milestone_rows:
+            db.session.execute(db.insert(Milestone), milestone_rows)
+
+    mappings = []
+    for _, op in updates:
+        mapping = {field: op[field] for field in ('title', 'description', 'category') if field in op}
+        mapping.update(id=op['id'], updated_at=now, revision=revision)
+        mappings.append(mapping)
+    if mappings:
+        db.session.bulk_update_mappings(Goal, mappings)
+
+    if deletes:
+        deleted_ids = [op['id'] for _, op in deletes]
+        db.session.execute(
+            db.delete(Milestone).where(Milestone.goal_id.in_(deleted_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.execute(
+            db.delete(Goal).where(Goal.id.in_(deleted_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        record_deletions(user_id, revision, 'goal', deleted_ids)
+
+    add_goal_activity(created_ids + recategorized_ids)
+
+    # Read back created and updated goals in one pass
+    goal_dicts = {
+        goal['id']: goal
+        for goal in load_goal_dicts(Goal.id.in_(created_ids + [op['id'] for _, op in updates]))
+    }
+
+    results = [
+        {'index': index, 'status': 201, 'data': goal_dicts[goal_id]}
+        for (index, _), goal_id in zip(creates, created_ids)
+    ]
+    results += [{'index': index, 'status': 200, 'data': goal_dicts[op['id']]} for index, op in updates]
+    results += [
+        {'index': index, 'status': 200, 'data': {'message': 'Goal deleted successfully'}}
+        for index, _ in deletes
+    ]
+
+    return _finish(results, errors)
+
+@bulk_bp.route('/milestones/bulk', methods=['POST'])
+@login_required
+def bulk_milestones():
+    """Create, update and delete many milestones in one transaction.
+
+    Follows the same atomic/partial rules as bulk_goals. Goal counters are
+    recounted once per affected goal and goals whose milestones were updated
+    are auto-archived when all of them are completed.
+    """
+    user_id = request.user_id
+    operations, atomic, error = _read_batch(request.get_json())
+
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Resolve ownership of every referenced goal and milestone with two queries
+    goal_ids = {
+        _int_id(op.get('goal_id')) for op in operations
+        if isinstance(op, dict) and op.get('op') == 'create'
+    }
+    milestone_ids = {
+        _int_id(op.get('id')) for op in operations
+        if isinstance(op, dict) and op.get('op') in ('update', 'delete')
+    }
+    owned_goal_ids = set(db.session.scalars(
+        db.select(Goal.id).where(Goal.user_id == user_id, Goal.id.in_(goal_ids - {None}))
+    ))
+    owned_milestones = dict(db.session.execute(
+        db.select(Milestone.id, Milestone.goal_id)
+        .join(Goal, Milestone.goal_id == Goal.id)
+        .where(Goal.user_id == user_id, Milestone.id.in_(milestone_ids - {None}))
+    ).all())
+
+    creates, updates, deletes, errors = [], [], [], []
+    seen_ids = set()
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        field_error = _field_error(op, MILESTONE_FIELD_TYPES) if kind else None
+
+        if kind == 'create':
+            if _int_id(op.get('goal_id')) not in owned_goal_ids:
+                errors.append(_error(index, 404, 'Goal not found'))
+            elif 'title' not in op:
+                errors.append(_error(index, 400, 'Title is required'))
+            elif field_error:
+                errors.append(_error(index, 400, field_error))
+            else:
+                creates.append((index, op))
+        elif kind in ('update', 'delete'):
+            milestone_id = _int_id(op.get('id'))
+            if milestone_id not in owned_milestones:
+                errors.append(_error(index, 404, 'Milestone not found'))
+            elif milestone_id in seen_ids:
+                errors.append(_error(index, 400, 'Milestone appears more than once in this batch'))
+            elif kind == 'update' and field_error:
+                errors.append(_error(index, 400, field_error))
+            else:
+                seen_ids.add(milestone_id)
+                (updates if kind == 'update' else deletes).append((index, op))
+        else:
+            errors.append(_error(index, 400, 'Unknown operation'))
+
+    if atomic and errors:
+        return jsonify({'error': 'No operations were applied', 'results': errors}), 400
+
+    now = datetime.utcnow()
+    revision = next_revision(user_id) if creates or updates or deletes else None
+
+    updated_goal_ids = {owned_milestones[op['id']] for _, op in updates}
+    affected_goal_ids = (
+        {op['goal_id'] for _, op in creates} | updated_goal_ids | {owned_milestones[op['id']] for _, op in deletes}
+    )
+    # Uncount the affected goals' stats now and count them again once changed
+    remove_goal_activity(affected_goal_ids)
+
+    created = []
+    if creates:
+        created = insert_in_row_order(
+            Milestone, [{'title': op['title'], 'goal_id': op['goal_id']} for _, op in creates], *MILESTONE_COLUMNS
+        )
+
+    mappings = []
+    for _, op in updates:
+        mapping = {'id': op['id']}
+        if 'title' in op:
+            mapping['title'] = op['title']
+        if 'completed' in op:
+            mapping['completed'] = op['completed']
+            # Set completed_at timestamp when milestone is completed
+            mapping['completed_at'] = now if mapping['completed'] else None
+        if len(mapping) > 1:
+            mappings.append(mapping)
+    if mappings:
+        db.session.bulk_update_mappings(Milestone, mappings)
+
+    if deletes:
+        deleted_ids = [op['id'] for _, op in deletes]
+        db.session.execute(
+            db.delete(Milestone).where(Milestone.id.in_(deleted_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        record_deletions(user_id, revision, 'milestone', deleted_ids)
+
+    _refresh_goal_counters(affected_goal_ids, revision, auto_archive_ids=updated_goal_ids)
+    add_goal_activity(affected_goal_ids)
+
+    # Read back updated milestones in one pass
+    updated = {
+        row.id: milestone_row_to_dict(row)
+        for row in db.session.execute(
+            db.select(*MILESTONE_COLUMNS).where(Milestone.id.in_([op['id'] for _, op in updates]))
+        )
+    } if updates else {}
+
+    results = [
+        {'index': index, 'status': 201, 'data': milestone_row_to_dict(row)}
+        for (index, _), row in zip(creates, created)
+    ]
+    results += [{'index': index, 'status': 200, 'data': updated[op['id']]} for index, op in updates]
+    results += [
+        {'index': index, 'status': 200, 'data': {'message': 'Milestone deleted successfully'}}
+        for index, _ in deletes
+    ]
+
+    return _finish(results, errors)
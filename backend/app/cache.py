@@ -0,0 +1,248 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from threading import Lock, local
+from flask import current_app, request
+import os
+import sqlite3
+import time
+
+class ResponseCache(ABC):
+    """Base class for per-user response caches.
+
+    Entries are stored per (user_id, key). Each user also has a generation
+    number that invalidate() bumps; set() only stores a value if the user's
+    generation is unchanged since the read began, so a response computed
+    before a concurrent write can never be cached after it.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = Lock()
+
+    def _count(self, hits=0, misses=0, evictions=0):
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def stats(self):
+        """Return hit/miss/eviction counters for this process"""
+        with self._stats_lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    @abstractmethod
+    def generation(self, user_id):
+        """Return the user's current generation, read before computing a value to set()"""
+
+    @abstractmethod
+    def get(self, user_id, key):
+        """Return the cached value, or None on a miss"""
+
+    @abstractmethod
+    def set(self, user_id, key, value, generation):
+        """Store a value unless the user's generation has moved past the given one"""
+
+    @abstractmethod
+    def invalidate(self, user_id):
+        """Drop the user's entries and bump their generation"""
+
+class NullResponseCache(ResponseCache):
+    """Cache backend that stores nothing"""
+
+    def generation(self, user_id):
+        return 0
+
+    def get(self, user_id, key):
+        return None
+
+    def set(self, user_id, key, value, generation):
+        pass
+
+    def invalidate(self, user_id):
+        pass
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache bounded by entry count and TTL"""
+
+    def __init__(self, max_entries, ttl):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (user_id, key) -> (value, expires_at)
+        self._keys_by_user = defaultdict(set)
+        self._generations = defaultdict(int)
+        self._lock = Lock()
+
+    def _remove(self, entry_key):
+        del self._entries[entry_key]
+        user_keys = self._keys_by_user[entry_key[0]]
+        user_keys.discard(entry_key[1])
+        if not user_keys:
+            del self._keys_by_user[entry_key[0]]
+
+    def generation(self, user_id):
+        with self._lock:
+            return self._generations[user_id]
+
+    def get(self, user_id, key):
+        entry_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(entry_key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+
+        if entry is None:
+            self._count(misses=1)
+            return None
+
+        self._count(hits=1)
+        return entry[0]
+
+    def set(self, user_id, key, value, generation):
+        evicted = 0
+        with self._lock:
+            if self._generations[user_id] != generation:
+                return
+
+            self._entries[(user_id, key)] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end((user_id, key))
+            self._keys_by_user[user_id].add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+
+        if evicted:
+            self._count(evictions=evicted)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generations[user_id] += 1
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove((user_id, key))
+
+class SQLiteResponseCache(ResponseCache):
+    """Cache backend stored in a SQLite file shared by every worker process.
+
+    Each thread (and forked process) opens its own connection. The file runs
+    in WAL mode so readers in other workers are not blocked by writers.
+    """
+
+    def __init__(self, path, max_entries, ttl):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = local()
+
+        with self._connect() as connection:
+            connection.executescript(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' user_id INTEGER NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,'
+                ' expires_at REAL NOT NULL, PRIMARY KEY (user_id, key));'
+                'CREATE INDEX IF NOT EXISTS ix_entries_expires_at ON entries (expires_at);'
+                'CREATE TABLE IF NOT EXISTS generations ('
+                ' user_id INTEGER PRIMARY KEY, generation INTEGER NOT NULL);'
+            )
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _generation(self, connection, user_id):
+        row = connection.execute(
+            'SELECT generation FROM generations WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def generation(self, user_id):
+        return self._generation(self._connect(), user_id)
+
+    def get(self, user_id, key):
+        row = self._connect().execute(
+            'SELECT value FROM entries WHERE user_id = ? AND key = ? AND expires_at > ?',
+            (user_id, key, time.time())
+        ).fetchone()
+
+        if row is None:
+            self._count(misses=1)
+            return None
+
+        self._count(hits=1)
+        return row[0]
+
+    def set(self, user_id, key, value, generation):
+        connection = self._connect()
+        now = time.time()
+
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            if self._generation(connection, user_id) != generation:
+                return
+
+            connection.execute(
+                'INSERT OR REPLACE INTO entries (user_id, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                (user_id, key, value, now + self.ttl)
+            )
+
+            # Drop expired entries, then the soonest-expiring ones beyond the size bound
+            connection.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+            overflow = connection.execute('SELECT count(*) FROM entries').fetchone()[0] - self.max_entries
+            if overflow > 0:
+                connection.execute(
+                    'DELETE FROM entries WHERE rowid IN '
+                    '(SELECT rowid FROM entries ORDER BY expires_at LIMIT ?)',
+                    (overflow,)
+                )
+                self._count(evictions=overflow)
+
+    def invalidate(self, user_id):
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT INTO generations (user_id, generation) VALUES (?, 1) '
+                'ON CONFLICT (user_id) DO UPDATE SET generation = generation + 1',
+                (user_id,)
+            )
+            connection.execute('DELETE FROM entries WHERE user_id = ?', (user_id,))
+
+def create_response_cache(app):
+    """Build the response cache backend selected by RESPONSE_CACHE"""
+    backend = app.config['RESPONSE_CACHE']
+    max_entries = app.config['RESPONSE_CACHE_SIZE']
+    ttl = app.config['RESPONSE_CACHE_TTL']
+
+    if backend == 'memory':
+        return MemoryResponseCache(max_entries, ttl)
+    if backend == 'sqlite':
+        path = app.config['RESPONSE_CACHE_PATH'] or os.path.join(app.instance_path, 'response_cache.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteResponseCache(path, max_entries, ttl)
+    if backend == 'none':
+        return NullResponseCache()
+
+    raise ValueError(f'Unknown RESPONSE_CACHE backend: {backend}')
+
+def invalidate_after_write(response):
+    """after_request hook dropping the user's cached responses after a successful write"""
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        user_id = getattr(request, 'user_id', None)
+        if user_id is not None:
+            get_response_cache().invalidate(user_id)
+    return response
+
+def get_response_cache():
+    """Return the response cache registered by create_app"""
+    return current_app.extensions['focusflow_response_cache']
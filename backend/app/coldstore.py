@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import with_appcontext
+from heapq import merge
+from operator import itemgetter
+from .models import db, ColdGoal, Goal, Milestone
+from .queries import FULL_PROJECTION, STREAM_BATCH_SIZE, GoalProjection, encode_cursor, load_goal_dicts, load_goal_page
+from .shards import each_shard
+import click
+import zlib
+
+# Goals archived for longer than COLD_STORAGE_AFTER_DAYS are moved out of the
+# goal and milestone tables into cold_goal, one compressed JSON document per
+# goal holding exactly what the API returns for it (milestones included).
+# Archived listings, get_goal, get_milestones, unarchive, delete and full syncs
+# read it transparently; cold goals are left out of search.
+COMPRESS_LEVEL = 9
+
+def pack_goal(goal):
+    """Compress a full goal dict (as load_goal_dicts returns it) into a cold document"""
+    return zlib.compress(current_app.json.dumps_bytes(goal), COMPRESS_LEVEL)
+
+def unpack_goal(document):
+    return current_app.json.loads(zlib.decompress(document))
+
+def _project(goal, projection):
+    """Limit a full goal dict to a projection like goal_row_to_dict does"""
+    projected = {name: goal[name] for name in projection.fields}
+    if projection.include_milestones:
+        projected['milestones'] = goal['milestones']
+    return projected
+
+def cold_goal_dict(cold_goal, projection=FULL_PROJECTION):
+    return _project(unpack_goal(cold_goal.document), projection)
+
+def get_cold_goal(goal_id, user_id):
+    """Return the user's cold goal with this id, or None"""
+    return db.session.execute(
+        db.select(ColdGoal).where(ColdGoal.id == goal_id, ColdGoal.user_id == user_id)
+    ).scalar()
+
+def load_cold_goal_dicts(*criteria, projection=FULL_PROJECTION):
+    """Load cold goals matching criteria on ColdGoal, ordered by id"""
+    documents = db.session.scalars(db.select(ColdGoal.document).where(*criteria).order_by(ColdGoal.id))
+    return [_project(unpack_goal(document), projection) for document in documents]
+
+def iter_cold_goal_dicts(*criteria, batch_size=STREAM_BATCH_SIZE, projection=FULL_PROJECTION):
+    """Yield cold goals matching criteria one at a time, ordered by id"""
+    documents = db.session.scalars(
+        db.select(ColdGoal.document)
+        .where(*criteria)
+        .order_by(ColdGoal.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for document in documents:
+        yield _project(unpack_goal(document), projection)
+
+def merge_by_id(goals, cold_goals):
+    """Merge hot and cold goal dicts that are each ordered by id"""
+    return merge(goals, cold_goals, key=itemgetter('id'))
+
+def load_goal_page_with_cold(criteria, cold_criteria, limit, after=None, projection=FULL_PROJECTION):
+    """load_goal_page over hot goals matching criteria and cold goals matching cold_criteria.
+
+    Both are read as keyset pages ordered by (created_at, id) and merged, so
+    the cursors are interchangeable with load_goal_page's.
+    """
+    # created_at orders the merged page, so select it even when not requested
+    fields = projection.fields if 'created_at' in projection.fields else projection.fields + ('created_at',)
+    hot, hot_cursor = load_goal_page(
+        *criteria, limit=limit, after=after, projection=GoalProjection(fields, projection.include_milestones)
+    )
+
+    cold_criteria = list(cold_criteria)
+    if after is not None:
+        created_at, goal_id = after
+        cold_criteria.append(
+            (ColdGoal.created_at > created_at)
+            | ((ColdGoal.created_at == created_at) & (ColdGoal.id > goal_id))
+        )
+    cold = db.session.execute(
+        db.select(ColdGoal.created_at, ColdGoal.id, ColdGoal.document)
+        .where(*cold_criteria)
+        .order_by(ColdGoal.created_at, ColdGoal.id)
+        .limit(limit + 1)
+    ).all()
+
+    rows = sorted(
+        [(datetime.fromisoformat(goal['created_at']), goal['id'], goal) for goal in hot]
+        + [(row.created_at, row.id, row.document) for row in cold],
+        key=itemgetter(0, 1)
+    )
+
+    # More goals follow if either side had more than this page can hold
+    next_cursor = None
+    if len(rows) > limit or hot_cursor is not None:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+
+    goals = []
+    for _, _, goal in rows:
+        if isinstance(goal, bytes):
+            goal = _project(unpack_goal(goal), projection)
+        elif 'created_at' not in projection.fields:
+            del goal['created_at']
+        goals.append(goal)
+    return goals, next_cursor
+
+def restore_goal(cold_goal, revision):
+    """Move a cold goal back into the goal and milestone tables as an active goal"""
+    goal = unpack_goal(cold_goal.document)
+    db.session.execute(db.insert(Goal).values(
+        id=goal['id'],
+        title=goal['title'],
+        description=goal['description'],
+        category=goal['category'],
+        user_id=goal['user_id'],
+        created_at=datetime.fromisoformat(goal['created_at']),
+        updated_at=datetime.utcnow(),
+        archived=False,
+        archived_at=None,
+        milestone_total=goal['milestone_total'],
+        milestone_completed=goal['milestone_completed'],
+        revision=revision
+    ))
+    if goal['milestones']:
+        db.session.execute(db.insert(Milestone), [
+            {
+                'id': milestone['id'],
+                'title': milestone['title'],
+                'completed': milestone['completed'],
+                'goal_id': milestone['goal_id'],
+                'created_at': datetime.fromisoformat(milestone['created_at']),
+                'completed_at': datetime.fromisoformat(milestone['completed_at']) if milestone['completed_at'] else None
+            }
+            for milestone in goal['milestones']
+        ])
+    db.session.delete(cold_goal)
+
+def freeze_archived_goals(older_than, batch_size):
+    """Move goals archived before older_than into cold storage and return how many were moved.
+
+    Runs in transactions of at most batch_size goals, so it can be stopped
+    and resumed at any point and never holds locks for long.
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        goal_ids = db.session.scalars(
+            db.select(Goal.id)
+            .where(Goal.archived == True, Goal.archived_at < older_than, Goal.id > last_id)
+            .order_by(Goal.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not goal_ids:
+            return moved
+
+        now = datetime.utcnow()
+        goals = load_goal_dicts(Goal.id.in_(goal_ids))
+        db.session.execute(db.insert(ColdGoal), [
+            {
+                'id': goal['id'],
+                'user_id': goal['user_id'],
+                'category': goal['category'],
+                'created_at': datetime.fromisoformat(goal['created_at']),
+                'archived_at': datetime.fromisoformat(goal['archived_at']),
+                'frozen_at': now,
+                'document': pack_goal(goal)
+            }
+            for goal in goals
+        ])
+        db.session.execute(
+            db.delete(Milestone).where(Milestone.goal_id.in_(goal_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.execute(
+            db.delete(Goal).where(Goal.id.in_(goal_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+
+        moved += len(goals)
+        last_id = goal_ids[-1]
+
+@click.command('freeze-archived-goals')
+@click.option('--days', type=int, default=None, help='Freeze goals archived this many days ago (default COLD_STORAGE_AFTER_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='Goals moved per transaction (default COLD_STORAGE_BATCH_SIZE)')
+@with_appcontext
+def freeze_archived_goals_command(days, batch_size):
+    """Move long-archived goals into cold storage on every shard"""
+    if days is None:
+        days = current_app.config['COLD_STORAGE_AFTER_DAYS']
+    if batch_size is None:
+        batch_size = current_app.config['COLD_STORAGE_BATCH_SIZE']
+    older_than = datetime.utcnow() - timedelta(days=days)
+    moved = sum(freeze_archived_goals(older_than, batch_size) for _ in each_shard())
+    click.echo(f'Moved {moved} goals archived more than {days} days ago to cold storage')
@@ -0,0 +1,58 @@
+from flask import current_app, request
+import zlib
+
+# wbits selecting the gzip container or the zlib container used by HTTP "deflate"
+ENCODING_WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+def _compress_stream(chunks, compressor):
+    """Compress a streamed body chunk by chunk without buffering it whole.
+
+    Each chunk is sync-flushed so the client can decode it as soon as it
+    arrives instead of when zlib's buffer happens to fill.
+    """
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def compress_response(response):
+    """after_request hook compressing responses with gzip or deflate.
+
+    The encoding is negotiated from Accept-Encoding. Buffered bodies smaller
+    than COMPRESS_MIN_SIZE are sent as is; streamed bodies are always
+    compressed incrementally. Compressed responses get a weak ETag since the
+    bytes differ from the identity representation.
+    """
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(ENCODING_WBITS))
+    if encoding is None:
+        return response
+
+    if not response.is_streamed and response.calculate_content_length() < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    compressor = zlib.compressobj(current_app.config['COMPRESS_LEVEL'], zlib.DEFLATED, ENCODING_WBITS[encoding])
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compressor.compress(response.get_data()) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
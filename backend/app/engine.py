@@ -0,0 +1,97 @@
+from functools import partial
+from flask import g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+
+# Bind key of the optional read-only engine used by GET requests
+READ_BIND = 'read'
+READ_METHODS = {'GET', 'HEAD'}
+
+# Bind keys of the databases in SHARD_URLS. Shard 0 is the primary database.
+SHARD_BIND = 'shard{}'
+
+# Table info flag for tables that only exist on the primary database
+PRIMARY_ONLY = 'primary_only'
+
+# Applied to every new SQLite connection. WAL lets readers proceed while a
+# writer commits, and busy_timeout makes writers wait instead of failing with
+# "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,  # milliseconds
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # negative means KiB, so 64 MB
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+def shard_bind(shard):
+    """Bind key of a shard's engine; None, the primary engine, for shard 0"""
+    return SHARD_BIND.format(shard) if shard else None
+
+def shard_binds(config):
+    """SQLALCHEMY_BINDS entries for the databases listed in SHARD_URLS"""
+    return {shard_bind(shard): url for shard, url in enumerate(config['SHARD_URLS'], 1)}
+
+def _primary_only(mapper):
+    return mapper is not None and inspect(mapper).local_table.info.get(PRIMARY_ONLY, False)
+
+class RoutingSession(Session):
+    """Session that sends statements to the shard selected for the current
+    user (see shards.use_shard), and reads made while handling GET/HEAD
+    requests to the read-only engine, when SQLALCHEMY_BINDS configures one.
+
+    Tables marked PRIMARY_ONLY always use the primary engine. Flushes and
+    everything outside a read request on shard 0 use the primary engine.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get('shard') and not _primary_only(mapper):
+            return self._db.engines[shard_bind(g.shard)]
+
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and request.method in READ_METHODS
+        ):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    Server databases get a tuned connection pool. SQLite keeps the
+    Flask-SQLAlchemy defaults and is tuned with pragmas on connect instead.
+    """
+    if make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        return {}
+
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+
+def _apply_sqlite_pragmas(pragmas, read_only, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    if read_only:
+        cursor.execute('PRAGMA query_only=ON')
+    cursor.close()
+
+def configure_engines(app, db):
+    """Install connect hooks on every engine the app uses"""
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                event.listen(
+                    engine,
+                    'connect',
+                    partial(_apply_sqlite_pragmas, app.config['SQLITE_PRAGMAS'], bind_key == READ_BIND)
+                )
@@ -0,0 +1,68 @@
+from functools import wraps
+from flask import current_app, make_response, request
+from .models import db, Goal, User
+import hashlib
+
+def _make_etag(*parts):
+    """Hash the given version parts together with the request URL into an ETag"""
+    raw = '|'.join(str(part) for part in (*parts, request.path, request.query_string.decode()))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def goal_list_etag():
+    """ETag for the authenticated user's goal listings.
+
+    Derived from one aggregate query over the user's goals (count, newest
+    updated_at and highest id) and the user's sync revision, so it changes
+    whenever a goal is created, updated, archived or deleted, a milestone of
+    one of them changes, or a cold-stored goal is restored or deleted.
+    """
+    user_id = request.user_id
+    count, last_updated, last_id, revision = db.session.execute(
+        db.select(
+            db.func.count(Goal.id),
+            db.func.max(Goal.updated_at),
+            db.func.max(Goal.id),
+            db.select(User.sync_revision).where(User.id == user_id).scalar_subquery()
+        )
+        .where(Goal.user_id == user_id)
+    ).one()
+    return _make_etag(user_id, count, last_updated, last_id, revision)
+
+def goal_etag(goal_id):
+    """ETag for a single goal and its milestones, or None if the goal is not found"""
+    user_id = request.user_id
+    updated_at = db.session.execute(
+        db.select(Goal.updated_at).where(Goal.id == goal_id, Goal.user_id == user_id)
+    ).scalar()
+
+    if updated_at is None:
+        return None
+
+    return _make_etag(user_id, goal_id, updated_at)
+
+def conditional_get(etag_func):
+    """Decorator answering 304 Not Modified when If-None-Match matches.
+
+    etag_func receives the view's arguments and returns the current ETag, or
+    None to fall through to the view (e.g. so it can produce a 404). The view
+    itself only runs when the client's copy is stale.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = etag_func(*args, **kwargs)
+            if etag is None:
+                return f(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,216 @@
+from bisect import bisect_left
+from collections import defaultdict
+from flask import Blueprint, current_app, g, has_app_context, jsonify, request
+from sqlalchemy import event
+from threading import Lock
+from time import perf_counter
+import hmac
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Histogram upper bounds; the +Inf bucket is implicit
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100)
+
+# Statements kept per request for the slow-request log
+MAX_RECORDED_STATEMENTS = 100
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Histogram:
+    """Prometheus histogram with one series per label tuple"""
+
+    def __init__(self, name, description, buckets, label_names):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.label_names = label_names
+        self._series = {}  # labels -> [count per bucket..., +Inf count, sum]
+        self._lock = Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le=bound)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {values[-1]}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+class RequestStats:
+    """SQL statements and timings gathered while handling one request"""
+
+    __slots__ = ('started', 'queries', 'db_time', 'statements')
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = []
+
+    def record(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append((statement, elapsed))
+
+class Metrics:
+    """Per-process request metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        labels = ('endpoint', 'method')
+        self.request_duration = Histogram(
+            'focusflow_request_duration_seconds', 'Time spent handling requests.', DURATION_BUCKETS, labels
+        )
+        self.db_duration = Histogram(
+            'focusflow_request_db_seconds', 'Time spent executing SQL per request.', DURATION_BUCKETS, labels
+        )
+        self.queries = Histogram(
+            'focusflow_request_queries', 'SQL statements executed per request.', QUERY_BUCKETS, labels
+        )
+        self._responses = defaultdict(int)  # (endpoint, method, status) -> count
+        self._lock = Lock()
+
+    def observe(self, endpoint, method, status, duration, stats):
+        labels = (endpoint, method)
+        self.request_duration.observe(labels, duration)
+        self.db_duration.observe(labels, stats.db_time)
+        self.queries.observe(labels, stats.queries)
+        with self._lock:
+            self._responses[(endpoint, method, status)] += 1
+
+    def render(self, cache_stats=None, extra_lines=()):
+        lines = []
+        for histogram in (self.request_duration, self.db_duration, self.queries):
+            lines += histogram.render()
+
+        with self._lock:
+            responses = sorted(self._responses.items())
+        lines += ['# HELP focusflow_responses_total Responses sent.', '# TYPE focusflow_responses_total counter']
+        lines += [
+            f'focusflow_responses_total{_labels(("endpoint", "method", "status"), key)} {count}'
+            for key, count in responses
+        ]
+
+        for name, value in sorted((cache_stats or {}).items()):
+            lines += [
+                f'# HELP focusflow_response_cache_{name}_total Response cache {name}.',
+                f'# TYPE focusflow_response_cache_{name}_total counter',
+                f'focusflow_response_cache_{name}_total {value}',
+            ]
+        lines += extra_lines
+        return '\n'.join(lines) + '\n'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['focusflow_query_started'] = perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('focusflow_query_started', None)
+    if started is None or not has_app_context():
+        return
+
+    stats = g.get('request_stats')
+    if stats is not None:
+        stats.record(statement, perf_counter() - started)
+
+def _start_request():
+    g.request_stats = RequestStats()
+
+def _finish_request(response):
+    """after_request hook recording metrics, Server-Timing and slow requests"""
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return response
+
+    duration = perf_counter() - stats.started
+    endpoint = request.endpoint or 'unmatched'
+    get_metrics().observe(endpoint, request.method, response.status_code, duration, stats)
+
+    if current_app.config['SERVER_TIMING']:
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", app;dur={duration * 1000:.2f}'
+        )
+
+    slow_ms = current_app.config['SLOW_REQUEST_MS']
+    if slow_ms and duration * 1000 >= slow_ms:
+        statements = '\n'.join(f'  {elapsed * 1000:8.2f} ms  {statement}' for statement, elapsed in stats.statements)
+        current_app.logger.warning(
+            'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms\n%s',
+            request.method, request.full_path.rstrip('?'), endpoint, duration * 1000,
+            stats.queries, stats.db_time * 1000, statements
+        )
+
+    return response
+
+def init_metrics(app, db):
+    """Install the SQL and request hooks and register the /metrics route.
+
+    Call before other after_request hooks are added so that the recorded
+    duration includes them (Flask runs after_request hooks in reverse).
+    """
+    app.extensions['focusflow_metrics'] = Metrics()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.register_blueprint(metrics_bp)
+
+# Clients allowed to scrape /metrics when no METRICS_TOKEN is set
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+def _metrics_access_error():
+    """Return an error response unless the request may read /metrics, else None"""
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+        if scheme != 'Bearer' or not hmac.compare_digest(supplied.encode(), token.encode()):
+            return jsonify({'error': 'Authentication required'}), 401
+        return None
+
+    # Proxied requests carry X-Forwarded-For even when the proxy is local
+    if request.remote_addr not in LOCAL_ADDRESSES or 'X-Forwarded-For' in request.headers:
+        return jsonify({'error': 'Metrics are only served locally without METRICS_TOKEN'}), 403
+    return None
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this worker process"""
+    error = _metrics_access_error()
+    if error is not None:
+        return error
+
+    cache = current_app.extensions.get('focusflow_response_cache')
+    admission = current_app.extensions.get('focusflow_admission')
+    body = get_metrics().render(
+        cache.stats() if cache is not None else None,
+        admission.render() if admission is not None else ()
+    )
+    return current_app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+def get_metrics():
+    """Return the metrics registered by create_app"""
+    return current_app.extensions['focusflow_metrics']
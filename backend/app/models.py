@@ -1,11 +1,14 @@
 from . import db
+from .engine import PRIMARY_ONLY
 from datetime import datetime
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
+    password = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sync_revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # bumped by every write
+    sync_floor = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # oldest usable sync cursor
     
     # Relationships
     goals = db.relationship('Goal', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -13,6 +16,27 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class UserDirectory(db.Model):
+    """Username to user id, kept on the primary database; the id picks the user's shard"""
+    id = db.Column(db.Integer, primary_key=True)  # the user's id on their shard
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    
+    __table_args__ = {'info': {PRIMARY_ONLY: True}}
+    
+    def __repr__(self):
+        return f'<UserDirectory {self.username}>'
+
+class RevokedToken(db.Model):
+    """A logged-out auth token, kept on the primary database until it would have expired"""
+    jti = db.Column(db.String(64), primary_key=True)  # the token's id
+    user_id = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    __table_args__ = {'info': {PRIMARY_ONLY: True}}
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
+
 class Goal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -21,12 +45,24 @@ class Goal(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    archived = db.Column(db.Boolean, default=False)
+    archived = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
     archived_at = db.Column(db.DateTime)
+    milestone_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    milestone_completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # user's sync_revision when last changed
     
     # Relationships
     milestones = db.relationship('Milestone', backref='goal', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_goal_user_id_archived_category', 'user_id', 'archived', 'category'),
+        db.Index('ix_goal_user_id_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_goal_user_id_updated_at', 'user_id', 'updated_at'),
+        db.Index('ix_goal_user_id_revision', 'user_id', 'revision'),
+        # Never reuse ids: goals moved to cold storage keep theirs
+        {'sqlite_autoincrement': True},
+    )
+    
     def __repr__(self):
         return f'<Goal {self.title}>'
     
@@ -41,6 +77,8 @@ class Goal(db.Model):
             'updated_at': self.updated_at.isoformat(),
             'archived': self.archived,
             'archived_at': self.archived_at.isoformat() if self.archived_at else None,
+            'milestone_total': self.milestone_total,
+            'milestone_completed': self.milestone_completed,
             'milestones': [milestone.to_dict() for milestone in self.milestones]
         }
 
@@ -64,6 +102,11 @@ class Milestone(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
     
+    __table_args__ = (
+        db.Index('ix_milestone_goal_id_completed', 'goal_id', 'completed'),
+        {'sqlite_autoincrement': True},
+    )
+    
     def __repr__(self):
         return f'<Milestone {self.title}>'
     
@@ -76,3 +119,49 @@ class Milestone(db.Model):
             'created_at': self.created_at.isoformat(),
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
+
+class Tombstone(db.Model):
+    """A hard-deleted goal or milestone, kept so delta sync can report the deletion"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(16), nullable=False)  # 'goal' or 'milestone'
+    object_id = db.Column(db.Integer, nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_tombstone_user_id_revision', 'user_id', 'revision'),
+        db.Index('ix_tombstone_deleted_at', 'deleted_at'),
+    )
+    
+    def __repr__(self):
+        return f'<Tombstone {self.kind} {self.object_id}>'
+
+class ColdGoal(db.Model):
+    """An archived goal moved out of the goal and milestone tables (see coldstore)"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # the goal's original id
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime)
+    frozen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    document = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON of the goal and its milestones
+    
+    __table_args__ = (
+        db.Index('ix_cold_goal_user_id_created_at', 'user_id', 'created_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<ColdGoal {self.id}>'
+
+class DailyStat(db.Model):
+    """A user's milestone and archive activity in one goal category on one UTC day (see stats)"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)  # '' for goals without one
+    milestones_added = db.Column(db.Integer, nullable=False, default=0)  # by created_at
+    milestones_completed = db.Column(db.Integer, nullable=False, default=0)  # by completed_at
+    goals_archived = db.Column(db.Integer, nullable=False, default=0)  # by archived_at
+    
+    def __repr__(self):
+        return f'<DailyStat {self.user_id} {self.day} {self.category}>'
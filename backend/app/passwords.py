@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashingPoolSaturated(Exception):
+    """Raised when too many password hashes are already running or queued"""
+
+class PasswordHasher:
+    """Runs password hashing on a dedicated, bounded thread pool.
+
+    hashlib releases the GIL while deriving keys, so hashes run in parallel
+    without tying up more request workers than the pool allows. Once
+    max_workers + queue_limit hashes are in flight, new work is rejected
+    immediately instead of waiting behind them.
+    """
+
+    def __init__(self, method, salt_length, max_workers, queue_limit):
+        self.method = method
+        self.salt_length = salt_length
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._method_prefix = None
+        self._start_pool()
+
+    def _start_pool(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+        self._slots = BoundedSemaphore(self.max_workers + self.queue_limit)
+
+    def _run(self, func, *args):
+        """Run func on the pool and wait for its result"""
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        """Hash a password with the configured method and salt length"""
+        password_hash = self._run(generate_password_hash, password, self.method, self.salt_length)
+        if self._method_prefix is None:
+            self._method_prefix = password_hash.split('$', 1)[0]
+        return password_hash
+
+    def check(self, stored_hash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """Return True if a stored hash was made with different parameters"""
+        if self._method_prefix is None:
+            # Werkzeug fills in default parameters (e.g. pbkdf2 -> pbkdf2:sha256:600000),
+            # so derive the canonical prefix from one throwaway hash per process.
+            self.hash('')
+
+        try:
+            method, salt, _ = stored_hash.split('$', 2)
+        except ValueError:
+            return True
+
+        return method != self._method_prefix or len(salt) != self.salt_length
+
+    def reset_after_fork(self):
+        """Replace the pool in a forked child, where the parent's threads do not exist"""
+        self._start_pool()
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=False)
+
+def get_password_hasher():
+    """Return the password hasher registered by create_app"""
+    return current_app.extensions['focusflow_passwords']
+
+def hash_password(password):
+    """Hash a password off the request thread"""
+    return get_password_hasher().hash(password)
+
+def check_password(stored_hash, password):
+    """Check a password off the request thread"""
+    return get_password_hasher().check(stored_hash, password)
+
+def password_needs_rehash(stored_hash):
+    """Return True if a stored hash uses outdated parameters"""
+    return get_password_hasher().needs_rehash(stored_hash)
@@ -0,0 +1,236 @@
+import base64
+from collections import defaultdict
+from datetime import datetime
+from . import format_datetime
+from .models import db, Goal, Milestone
+
+# Column projections used by the read path. Selecting plain columns returns
+# lightweight Row tuples instead of tracked ORM instances.
+GOAL_COLUMNS = (
+    Goal.id,
+    Goal.title,
+    Goal.description,
+    Goal.category,
+    Goal.user_id,
+    Goal.created_at,
+    Goal.updated_at,
+    Goal.archived,
+    Goal.archived_at,
+    Goal.milestone_total,
+    Goal.milestone_completed,
+)
+
+MILESTONE_COLUMNS = (
+    Milestone.id,
+    Milestone.title,
+    Milestone.completed,
+    Milestone.goal_id,
+    Milestone.created_at,
+    Milestone.completed_at,
+)
+
+# Pagination settings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STREAM_BATCH_SIZE = 500
+STREAM_CHUNK_SIZE = 50  # goals per chunk of a streamed response, each flushed through compression
+
+GOAL_FIELDS = {column.key: column for column in GOAL_COLUMNS}
+
+class GoalProjection:
+    """Which goal columns a read selects and whether it loads milestones"""
+
+    def __init__(self, fields=None, include_milestones=True):
+        self.fields = tuple(fields) if fields else tuple(GOAL_FIELDS)
+        self.include_milestones = include_milestones
+
+    def columns(self, *required):
+        """Columns to select: the requested fields plus any the query itself needs"""
+        names = self.fields + tuple(name for name in required if name not in self.fields)
+        return [GOAL_FIELDS[name] for name in names]
+
+FULL_PROJECTION = GoalProjection()
+
+def parse_projection(fields=None, include=None):
+    """Build a GoalProjection from ?fields= and ?include= values.
+
+    fields is a comma-separated list of goal fields (id is always returned).
+    include=milestones embeds milestones; without include they are embedded
+    only when no fields were requested. Raises ValueError on unknown names.
+    """
+    names = None
+    if fields is not None:
+        names = list(dict.fromkeys(name for name in fields.split(',') if name))
+        unknown = set(names) - set(GOAL_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        if 'id' not in names:
+            names.insert(0, 'id')
+
+    if include is None:
+        return GoalProjection(names, include_milestones=fields is None)
+
+    relations = {name for name in include.split(',') if name}
+    if relations - {'milestones'}:
+        raise ValueError(f"Unknown include: {', '.join(sorted(relations - {'milestones'}))}")
+
+    return GoalProjection(names, include_milestones='milestones' in relations)
+
+def milestone_row_to_dict(row):
+    """Serialize a milestone row exactly like Milestone.to_dict()"""
+    return {
+        'id': row.id,
+        'title': row.title,
+        'completed': row.completed,
+        'goal_id': row.goal_id,
+        'created_at': format_datetime(row.created_at),
+        'completed_at': format_datetime(row.completed_at) if row.completed_at else None
+    }
+
+def _json_value(value):
+    return format_datetime(value) if isinstance(value, datetime) else value
+
+def goal_row_to_dict(row, milestones=None, fields=None):
+    """Serialize a goal row like Goal.to_dict(), limited to the given fields.
+
+    With every field and a milestone list the output is identical to
+    Goal.to_dict(); milestones=None leaves the key out entirely.
+    """
+    goal = {name: _json_value(getattr(row, name)) for name in fields or row._fields}
+    if milestones is not None:
+        goal['milestones'] = milestones
+    return goal
+
+def _goal_dicts_with_milestones(goal_rows, milestone_query, projection):
+    """Attach the milestones returned by a single query to their goal rows.
+
+    The milestone query is skipped entirely when the projection excludes them.
+    """
+    if not projection.include_milestones:
+        return [goal_row_to_dict(row, fields=projection.fields) for row in goal_rows]
+
+    milestones_by_goal = defaultdict(list)
+    for row in db.session.execute(milestone_query.order_by(Milestone.id)):
+        milestones_by_goal[row.goal_id].append(milestone_row_to_dict(row))
+
+    return [goal_row_to_dict(row, milestones_by_goal[row.id], projection.fields) for row in goal_rows]
+
+def insert_in_row_order(target, rows, *columns):
+    """Insert rows with multi-row INSERTs and return their RETURNING rows in row order.
+
+    columns must start with the target's autoincrementing id.
+    """
+    insert = db.insert(target)
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # sort_by_parameter_order makes SQLAlchemy insert one row at a time on
+        # SQLite. Rows of one INSERT get increasing rowids in VALUES order while
+        # the write lock is held, so the rows sorted by id already match.
+        return sorted(db.session.execute(insert.returning(*columns), rows), key=lambda row: row[0])
+    return db.session.execute(insert.returning(*columns, sort_by_parameter_order=True), rows).all()
+
+def load_goal_dicts(*criteria, projection=FULL_PROJECTION):
+    """Load goals matching the given criteria together with their milestones.
+
+    Always issues at most two SELECTs (goals, then milestones joined back to
+    the same goal criteria) regardless of how many goals match.
+    """
+    goal_rows = db.session.execute(
+        db.select(*projection.columns()).where(*criteria).order_by(Goal.id)
+    ).all()
+
+    if not goal_rows:
+        return []
+
+    return _goal_dicts_with_milestones(
+        goal_rows,
+        db.select(*MILESTONE_COLUMNS)
+        .join(Goal, Milestone.goal_id == Goal.id)
+        .where(*criteria),
+        projection
+    )
+
+def encode_cursor(created_at, goal_id):
+    """Encode a (created_at, id) keyset position as an opaque cursor string"""
+    raw = f'{created_at.isoformat()}|{goal_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    created_at, goal_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(goal_id)
+
+def load_goal_page(*criteria, limit, after=None, projection=FULL_PROJECTION):
+    """Load one keyset page of goals ordered by (created_at, id).
+
+    Returns the page as a list of goal dicts and the cursor for the next page,
+    or None when this is the last page.
+    """
+    if after is not None:
+        created_at, goal_id = after
+        criteria += (
+            (Goal.created_at > created_at)
+            | ((Goal.created_at == created_at) & (Goal.id > goal_id)),
+        )
+
+    # Fetch one extra row to find out whether another page follows
+    goal_rows = db.session.execute(
+        db.select(*projection.columns('created_at'))
+        .where(*criteria)
+        .order_by(Goal.created_at, Goal.id)
+        .limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(goal_rows) > limit:
+        goal_rows = goal_rows[:limit]
+        next_cursor = encode_cursor(goal_rows[-1].created_at, goal_rows[-1].id)
+
+    if not goal_rows:
+        return [], None
+
+    goals = _goal_dicts_with_milestones(
+        goal_rows,
+        db.select(*MILESTONE_COLUMNS).where(Milestone.goal_id.in_([row.id for row in goal_rows])),
+        projection
+    )
+    return goals, next_cursor
+
+def iter_goal_dicts(*criteria, batch_size=STREAM_BATCH_SIZE, projection=FULL_PROJECTION):
+    """Yield goal dicts one at a time using server-side cursors.
+
+    Goals and milestones are read as two streams ordered by goal id and merged,
+    so memory use stays bounded by batch_size however many goals match.
+    """
+    goal_rows = db.session.execute(
+        db.select(*projection.columns())
+        .where(*criteria)
+        .order_by(Goal.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    if not projection.include_milestones:
+        for row in goal_rows:
+            yield goal_row_to_dict(row, fields=projection.fields)
+        return
+
+    milestone_rows = iter(db.session.execute(
+        db.select(*MILESTONE_COLUMNS)
+        .join(Goal, Milestone.goal_id == Goal.id)
+        .where(*criteria)
+        .order_by(Milestone.goal_id, Milestone.id)
+        .execution_options(yield_per=batch_size)
+    ))
+
+    pending = next(milestone_rows, None)
+    for row in goal_rows:
+        # Skip milestones whose goal is no longer part of the goal stream
+        while pending is not None and pending.goal_id < row.id:
+            pending = next(milestone_rows, None)
+
+        milestones = []
+        while pending is not None and pending.goal_id == row.id:
+            milestones.append(milestone_row_to_dict(pending))
+            pending = next(milestone_rows, None)
+
+        yield goal_row_to_dict(row, milestones, projection.fields)
@@ -0,0 +1,162 @@
+from collections import Counter
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from weakref import WeakSet
+import re
+
+# Query logs active in the current context (see QueryLog)
+_active = ContextVar('focusflow_query_logs', default=())
+
+# Engines whose statements are recorded, attached by init_query_checks
+_engines = WeakSet()
+
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when more SQL statements run than a budget allows"""
+
+class NPlusOneDetected(AssertionError):
+    """Raised when a request repeats the same statement shape too many times"""
+
+def statement_shape(statement):
+    """Normalize a statement so that executions differing only in values compare equal"""
+    shape = _IN_LIST_RE.sub('(?)', statement)
+    shape = _NUMBER_RE.sub('?', shape)
+    return _WHITESPACE_RE.sub(' ', shape).strip()
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for log in _active.get():
+        log.statements.append(statement)
+
+    if has_app_context():
+        log = g.get('query_log')
+        if log is not None:
+            log.statements.append(statement)
+
+class QueryLog:
+    """Context manager recording every SQL statement executed while it is active.
+
+    Covers the engines of apps created with QUERY_CHECKS on, in the current
+    thread or task, and logs can nest.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self._tokens = []
+
+    def __enter__(self):
+        if not _engines:
+            # Counting nothing would let every budget pass
+            raise RuntimeError('No engine records statements; create the app with QUERY_CHECKS=warn or raise')
+        self._tokens.append(_active.set(_active.get() + (self,)))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.reset(self._tokens.pop())
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, threshold):
+        """Return (shape, count) for statement shapes run at least threshold times"""
+        shapes = Counter(statement_shape(statement) for statement in self.statements)
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def describe(self):
+        return '\n'.join(f'  {index}. {statement_shape(statement)}' for index, statement in enumerate(self.statements, 1))
+
+class max_queries(ContextDecorator):
+    """Fail when more than limit SQL statements run inside a block or function.
+
+    Meant for tests:
+
+        with max_queries(3):
+            client.get('/goals/', headers=headers)
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._logs = []
+
+    def __enter__(self):
+        log = QueryLog().__enter__()
+        self._logs.append(log)
+        return log
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        log = self._logs.pop()
+        log.__exit__(exc_type, exc_value, traceback)
+
+        if exc_type is None and log.count > self.limit:
+            raise QueryBudgetExceeded(f'{log.count} queries ran, the budget is {self.limit}:\n{log.describe()}')
+        return False
+
+def query_budget(limit):
+    """Declare the most SQL statements a view may run.
+
+    Enforced per request when QUERY_CHECKS is warn or raise; free otherwise.
+    """
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+def repeats_queries(f):
+    """Exempt a view that runs the same statements once per batch from N+1 detection"""
+    f.repeats_queries = True
+    return f
+
+def _start_request():
+    g.query_log = QueryLog()
+
+def _check_request(response):
+    """after_request hook reporting N+1 patterns and exceeded view budgets"""
+    log = g.pop('query_log', None)
+    if log is None:
+        return response
+
+    endpoint = f'{request.method} {request.path} ({request.endpoint})'
+    view = current_app.view_functions.get(request.endpoint)
+    problems = []
+
+    repeated = None if getattr(view, 'repeats_queries', False) else log.repeated(current_app.config['QUERY_REPEAT_THRESHOLD'])
+    if repeated:
+        shapes = '\n'.join(f'  {count}x {shape}' for shape, count in repeated)
+        problems.append((NPlusOneDetected, f'Possible N+1 queries in {endpoint}:\n{shapes}'))
+
+    budget = getattr(view, 'query_budget', None)
+    if budget is not None and log.count > budget:
+        problems.append((
+            QueryBudgetExceeded,
+            f'{endpoint} ran {log.count} queries, its budget is {budget}:\n{log.describe()}'
+        ))
+
+    for error, message in problems:
+        if current_app.config['QUERY_CHECKS'] == 'raise':
+            raise error(message)
+        current_app.logger.warning(message)
+
+    return response
+
+def init_query_checks(app, db):
+    """Record the app's statements and check each request's as QUERY_CHECKS selects"""
+    mode = app.config['QUERY_CHECKS']
+    if mode == 'off':
+        return
+    if mode not in ('warn', 'raise'):
+        raise ValueError(f'Unknown QUERY_CHECKS mode: {mode}')
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine not in _engines:
+                event.listen(engine, 'before_cursor_execute', _record_statement)
+                _engines.add(engine)
+
+    app.before_request(_start_request)
+    app.after_request(_check_request)
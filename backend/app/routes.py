@@ -1,33 +1,158 @@
-from flask import Blueprint, request, jsonify
-from .models import db, Goal, Milestone, GOAL_CATEGORIES
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from .models import db, ColdGoal, Goal, Milestone, GOAL_CATEGORIES
 from .auth import login_required
+from .cache import get_response_cache, invalidate_after_write
+from .coldstore import (
+    cold_goal_dict, get_cold_goal, iter_cold_goal_dicts, load_cold_goal_dicts, load_goal_page_with_cold,
+    merge_by_id, restore_goal
+)
+from .etags import conditional_get, goal_etag, goal_list_etag
+from .querylog import query_budget
+from .search import search_goal_ids, search_terms
+from .stats import add_goal_activity, record_activity, record_goal_dict, remove_goal_activity
+from .sync import CursorExpired, load_changes, next_revision, record_deletions
+from .queries import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_CHUNK_SIZE, decode_cursor, iter_goal_dicts, load_goal_dicts,
+    load_goal_page, parse_projection
+)
 from datetime import datetime
+from itertools import islice
 
 goals_bp = Blueprint('goals', __name__)
+goals_bp.after_request(invalidate_after_write)
+
+def _json_array(items):
+    """Encode an iterable of dicts as a JSON array, STREAM_CHUNK_SIZE items per chunk"""
+    dumps = current_app.json.dumps
+    items = iter(items)
+    separator = ''
+    yield '['
+    while chunk := list(islice(items, STREAM_CHUNK_SIZE)):
+        yield separator + ','.join(map(dumps, chunk))
+        separator = ','
+    yield ']'
+
+def _goal_list_response(*criteria, cache_key, cold_criteria=None):
+    """Build the response for a goal listing.
+
+    Supports three modes selected by query parameters: the full list (default),
+    keyset pages (?limit=&cursor=) and a streamed JSON array (?stream=true).
+    ?fields= and ?include= narrow the columns selected and can skip loading
+    milestones. Full lists are served from the per-user response cache.
+    With cold_criteria, matching goals from cold storage are merged in.
+    """
+    try:
+        projection = parse_projection(request.args.get('fields'), request.args.get('include'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if request.args.get('stream', 'false').lower() == 'true':
+        goals = iter_goal_dicts(*criteria, projection=projection)
+        if cold_criteria is not None:
+            goals = merge_by_id(goals, iter_cold_goal_dicts(*cold_criteria, projection=projection))
+        return Response(stream_with_context(_json_array(goals)), mimetype='application/json')
+    
+    if 'limit' in request.args or 'cursor' in request.args:
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({'error': 'Invalid limit or cursor'}), 400
+        
+        if limit < 1:
+            return jsonify({'error': 'Limit must be a positive integer'}), 400
+        
+        if cold_criteria is not None:
+            goals, next_cursor = load_goal_page_with_cold(
+                criteria, cold_criteria, limit=min(limit, MAX_PAGE_SIZE), after=after, projection=projection
+            )
+        else:
+            goals, next_cursor = load_goal_page(
+                *criteria, limit=min(limit, MAX_PAGE_SIZE), after=after, projection=projection
+            )
+        return jsonify({'goals': goals, 'next_cursor': next_cursor})
+    
+    cache = get_response_cache()
+    user_id = request.user_id
+    cache_key = f"{cache_key}:{request.args.get('fields')}:{request.args.get('include')}"
+    generation = cache.generation(user_id)
+    body = cache.get(user_id, cache_key)
+    if body is not None:
+        return current_app.response_class(body, mimetype='application/json')
+    
+    goals = load_goal_dicts(*criteria, projection=projection)
+    if cold_criteria is not None:
+        goals = list(merge_by_id(goals, load_cold_goal_dicts(*cold_criteria, projection=projection)))
+    response = jsonify(goals)
+    cache.set(user_id, cache_key, response.get_data(), generation)
+    return response
+
+def _update_goal_counters(goal_id, revision, total=0, completed=0, auto_archive=False):
+    """Adjust a goal's milestone counters and stamp its updated_at and sync revision in one UPDATE.
+
+    With auto_archive, the same statement also archives the goal once every
+    one of its milestones is completed. Returns the goal's category and
+    archived_at after the update.
+    """
+    now = datetime.utcnow()
+    values = {
+        'milestone_total': Goal.milestone_total + total,
+        'milestone_completed': Goal.milestone_completed + completed,
+        'updated_at': now,
+        'revision': revision
+    }
+    
+    if auto_archive:
+        # SET expressions see the row's old values, so apply the deltas here too
+        all_completed = db.and_(
+            Goal.milestone_total + total > 0,
+            Goal.milestone_completed + completed == Goal.milestone_total + total
+        )
+        values['archived'] = db.case((all_completed, True), else_=Goal.archived)
+        values['archived_at'] = db.case((all_completed, now), else_=Goal.archived_at)
+    
+    return db.session.execute(
+        db.update(Goal).where(Goal.id == goal_id).values(**values).returning(Goal.category, Goal.archived_at),
+        execution_options={'synchronize_session': False}
+    ).one()
+
+def _goal_filters(include_archived, category_filter):
+    """Criteria for the archived and category filters shared by listing and search"""
+    criteria = []
+    if not include_archived:
+        # A plain equality, so ix_goal_user_id_archived_category applies
+        criteria.append(Goal.archived == False)
+    
+    # Apply category filter in the query if specified
+    if category_filter and category_filter != 'All':
+        criteria.append(Goal.category == category_filter)
+    
+    return criteria
 
 # Goals endpoints
 @goals_bp.route('/', methods=['GET'])
+@query_budget(4)
 @login_required
+@conditional_get(goal_list_etag)
 def get_goals():
     """Get all active (non-archived) goals for the authenticated user"""
     user_id = request.user_id  # Set by login_required decorator
     include_archived = request.args.get('include_archived', 'false').lower() == 'true'
     category_filter = request.args.get('category', None)  # New category filter
     
-    if include_archived:
-        goals = Goal.query.filter_by(user_id=user_id).all()
-    else:
-        # A goal is active if archived is explicitly False or None/undefined
-        goals = Goal.query.filter(
-            Goal.user_id == user_id,
-            (Goal.archived == False) | (Goal.archived.is_(None))
-        ).all()
+    criteria = [Goal.user_id == user_id, *_goal_filters(include_archived, category_filter)]
     
-    # Apply category filter if specified
-    if category_filter and category_filter != 'All':
-        goals = [goal for goal in goals if goal.category == category_filter]
+    # Archived goals may have been moved to cold storage
+    cold_criteria = None
+    if include_archived:
+        cold_criteria = [ColdGoal.user_id == user_id]
+        if category_filter and category_filter != 'All':
+            cold_criteria.append(ColdGoal.category == category_filter)
     
-    return jsonify([goal.to_dict() for goal in goals])
+    return _goal_list_response(
+        *criteria, cache_key=f'goals:{include_archived}:{category_filter or "All"}', cold_criteria=cold_criteria
+    )
 
 @goals_bp.route('/categories', methods=['GET'])
 @login_required
@@ -36,6 +161,7 @@ def get_categories():
     return jsonify(GOAL_CATEGORIES)
 
 @goals_bp.route('/', methods=['POST'])
+@query_budget(4)
 @login_required
 def create_goal():
     """Create a new goal"""
@@ -49,7 +175,8 @@ def create_goal():
         title=data['title'],
         description=data.get('description', ''),
         category=data.get('category', 'Personal'),  # New category field
-        user_id=user_id
+        user_id=user_id,
+        revision=next_revision(user_id)
     )
     
     db.session.add(goal)
@@ -58,18 +185,30 @@ def create_goal():
     return jsonify(goal.to_dict()), 201
 
 @goals_bp.route('/<int:goal_id>', methods=['GET'])
+@query_budget(3)
 @login_required
+@conditional_get(goal_etag)
 def get_goal(goal_id):
     """Get a specific goal"""
     user_id = request.user_id
-    goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
     
-    if not goal:
-        return jsonify({'error': 'Goal not found'}), 404
+    try:
+        projection = parse_projection(request.args.get('fields'), request.args.get('include'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify(goal.to_dict())
+    goals = load_goal_dicts(Goal.id == goal_id, Goal.user_id == user_id, projection=projection)
+    
+    if not goals:
+        cold_goal = get_cold_goal(goal_id, user_id)
+        if cold_goal is None:
+            return jsonify({'error': 'Goal not found'}), 404
+        return jsonify(cold_goal_dict(cold_goal, projection))
+    
+    return jsonify(goals[0])
 
 @goals_bp.route('/<int:goal_id>', methods=['PUT'])
+@query_budget(7)
 @login_required
 def update_goal(goal_id):
     """Update a goal"""
@@ -81,6 +220,13 @@ def update_goal(goal_id):
     
     data = request.get_json()
     
+    # Moving the goal to another category moves its stats with it
+    category_changed = 'category' in data and data['category'] != goal.category
+    if category_changed:
+        remove_goal_activity([goal_id])
+    
+    # Bump the revision before changing the goal so both go out in one UPDATE
+    goal.revision = next_revision(user_id)
     if 'title' in data:
         goal.title = data['title']
     if 'description' in data:
@@ -88,25 +234,35 @@ def update_goal(goal_id):
     if 'category' in data:  # New category update
         goal.category = data['category']
     
+    if category_changed:
+        db.session.flush()
+        add_goal_activity([goal_id])
     db.session.commit()
     return jsonify(goal.to_dict())
 
 @goals_bp.route('/<int:goal_id>', methods=['DELETE'])
+@query_budget(7)
 @login_required
 def delete_goal(goal_id):
     """Delete a goal"""
     user_id = request.user_id
-    goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
+    goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first() or get_cold_goal(goal_id, user_id)
     
     if not goal:
         return jsonify({'error': 'Goal not found'}), 404
     
+    if isinstance(goal, ColdGoal):
+        record_goal_dict(cold_goal_dict(goal), sign=-1)
+    else:
+        remove_goal_activity([goal_id])
     db.session.delete(goal)
+    record_deletions(user_id, next_revision(user_id), 'goal', [goal_id])
     db.session.commit()
     
     return jsonify({'message': 'Goal deleted successfully'})
 
 @goals_bp.route('/<int:goal_id>/archive', methods=['POST'])
+@query_budget(4)
 @login_required
 def archive_goal(goal_id):
     """Archive a goal (soft delete)"""
@@ -116,13 +272,17 @@ def archive_goal(goal_id):
     if not goal:
         return jsonify({'error': 'Goal not found'}), 404
     
+    now = datetime.utcnow()
+    record_activity(user_id, goal.category, archived=[(goal.archived_at, -1), (now, 1)])
+    goal.revision = next_revision(user_id)
     goal.archived = True
-    goal.archived_at = datetime.utcnow()
+    goal.archived_at = now
     db.session.commit()
     
     return jsonify({'message': 'Goal archived successfully'})
 
 @goals_bp.route('/<int:goal_id>/unarchive', methods=['POST'])
+@query_budget(7)
 @login_required
 def unarchive_goal(goal_id):
     """Unarchive a goal"""
@@ -130,8 +290,16 @@ def unarchive_goal(goal_id):
     goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
     
     if not goal:
-        return jsonify({'error': 'Goal not found'}), 404
+        cold_goal = get_cold_goal(goal_id, user_id)
+        if cold_goal is None:
+            return jsonify({'error': 'Goal not found'}), 404
+        record_activity(user_id, cold_goal.category, archived=[(cold_goal.archived_at, -1)])
+        restore_goal(cold_goal, next_revision(user_id))
+        db.session.commit()
+        return jsonify({'message': 'Goal unarchived successfully'})
     
+    record_activity(user_id, goal.category, archived=[(goal.archived_at, -1)])
+    goal.revision = next_revision(user_id)
     goal.archived = False
     goal.archived_at = None
     db.session.commit()
@@ -139,27 +307,96 @@ def unarchive_goal(goal_id):
     return jsonify({'message': 'Goal unarchived successfully'})
 
 @goals_bp.route('/archived', methods=['GET'])
+@query_budget(4)
 @login_required
+@conditional_get(goal_list_etag)
 def get_archived_goals():
     """Get all archived goals for the authenticated user"""
     user_id = request.user_id
-    goals = Goal.query.filter_by(user_id=user_id, archived=True).all()
-    return jsonify([goal.to_dict() for goal in goals])
+    return _goal_list_response(
+        Goal.user_id == user_id, Goal.archived == True, cache_key='archived', cold_criteria=[ColdGoal.user_id == user_id]
+    )
+
+@goals_bp.route('/changes', methods=['GET'])
+@query_budget(4)
+@login_required
+def get_changes():
+    """Goals changed and goals/milestones deleted since a sync cursor"""
+    user_id = request.user_id
+    
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    if since < 0:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    try:
+        return jsonify(load_changes(user_id, since))
+    except CursorExpired:
+        return jsonify({'error': 'Cursor expired, sync again without since'}), 410
+
+@goals_bp.route('/search', methods=['GET'])
+@query_budget(3)
+@login_required
+def search_goals():
+    """Search the user's goals by title, description and milestone titles"""
+    user_id = request.user_id
+    terms = search_terms(request.args.get('q'))
+    
+    if not terms:
+        return jsonify({'error': 'A search query with at least 2 characters is required'}), 400
+    
+    try:
+        projection = parse_projection(request.args.get('fields'), request.args.get('include'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or offset'}), 400
+    
+    if limit < 1 or offset < 0:
+        return jsonify({'error': 'Limit must be positive and offset must not be negative'}), 400
+    
+    limit = min(limit, MAX_PAGE_SIZE)
+    include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+    filters = _goal_filters(include_archived, request.args.get('category'))
+    
+    # Fetch one extra id to tell whether another page follows
+    goal_ids = search_goal_ids(user_id, terms, *filters, limit=limit + 1, offset=offset)
+    next_offset = offset + limit if len(goal_ids) > limit else None
+    goal_ids = goal_ids[:limit]
+    
+    goals = {}
+    if goal_ids:
+        goals = {goal['id']: goal for goal in load_goal_dicts(Goal.id.in_(goal_ids), projection=projection)}
+    
+    return jsonify({'goals': [goals[goal_id] for goal_id in goal_ids], 'next_offset': next_offset})
 
 # Milestones endpoints
 @goals_bp.route('/<int:goal_id>/milestones', methods=['GET'])
+@query_budget(3)
 @login_required
+@conditional_get(goal_etag)
 def get_milestones(goal_id):
     """Get all milestones for a specific goal"""
     user_id = request.user_id
     goal = Goal.query.filter_by(id=goal_id, user_id=user_id).first()
     
     if not goal:
-        return jsonify({'error': 'Goal not found'}), 404
+        cold_goal = get_cold_goal(goal_id, user_id)
+        if cold_goal is None:
+            return jsonify({'error': 'Goal not found'}), 404
+        return jsonify(cold_goal_dict(cold_goal)['milestones'])
     
     return jsonify([milestone.to_dict() for milestone in goal.milestones])
 
 @goals_bp.route('/<int:goal_id>/milestones', methods=['POST'])
+@query_budget(6)
 @login_required
 def create_milestone(goal_id):
     """Create a new milestone for a goal"""
@@ -176,51 +413,77 @@ def create_milestone(goal_id):
     
     milestone = Milestone(
         title=data['title'],
-        goal_id=goal_id
+        goal_id=goal_id,
+        created_at=datetime.utcnow()
     )
     
     db.session.add(milestone)
+    _update_goal_counters(goal_id, next_revision(user_id), total=1)
+    record_activity(user_id, goal.category, added=[(milestone.created_at, 1)])
     db.session.commit()
     
     return jsonify(milestone.to_dict()), 201
 
 @goals_bp.route('/milestones/<int:milestone_id>', methods=['PUT'])
+@query_budget(6)
 @login_required
 def update_milestone(milestone_id):
     """Update a milestone"""
     user_id = request.user_id
-    milestone = Milestone.query.join(Goal).filter(
-        Milestone.id == milestone_id,
-        Goal.user_id == user_id
+    data = request.get_json()
+    
+    # Flip the flag first, in an UPDATE that only matches when it changes it.
+    # Its rowcount is the counter delta however concurrent toggles interleave,
+    # and the row stays locked for the reads below until commit.
+    flipped = 0
+    if 'completed' in data:
+        flipped = db.session.execute(
+            db.update(Milestone)
+            .where(
+                Milestone.id == milestone_id,
+                Milestone.completed != bool(data['completed']),
+                Milestone.goal_id.in_(db.select(Goal.id).where(Goal.user_id == user_id))
+            )
+            .values(completed=bool(data['completed'])),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+    
+    row = db.session.execute(
+        db.select(Milestone, Goal.archived_at)
+        .join(Goal)
+        .where(Milestone.id == milestone_id, Goal.user_id == user_id)
     ).first()
     
-    if not milestone:
+    if not row:
         return jsonify({'error': 'Milestone not found'}), 404
     
-    data = request.get_json()
+    milestone, archived_at = row
+    completed_at = milestone.completed_at
     
     if 'title' in data:
         milestone.title = data['title']
-    if 'completed' in data:
-        milestone.completed = data['completed']
+    completed_delta = 0
+    if flipped:
+        completed_delta = 1 if milestone.completed else -1
         # Set completed_at timestamp when milestone is completed
-        if data['completed']:
-            milestone.completed_at = datetime.utcnow()
-        else:
-            milestone.completed_at = None
+        milestone.completed_at = datetime.utcnow() if milestone.completed else None
+    
+    # Update the counters and auto-archive the goal if all milestones are completed
+    goal = _update_goal_counters(milestone.goal_id, next_revision(user_id), completed=completed_delta, auto_archive=True)
+    record_activity(
+        user_id, goal.category,
+        completed=[(completed_at, -1), (milestone.completed_at, 1)],
+        archived=[(archived_at, -1), (goal.archived_at, 1)]
+    )
     
+    # Serialize before committing; afterwards the expired milestone would be selected again
+    result = milestone.to_dict()
     db.session.commit()
     
-    # Check if all milestones are completed and auto-archive the goal
-    goal = Goal.query.get(milestone.goal_id)
-    if goal and all(m.completed for m in goal.milestones) and len(goal.milestones) > 0:
-        goal.archived = True
-        goal.archived_at = datetime.utcnow()
-        db.session.commit()
-    
-    return jsonify(milestone.to_dict())
+    return jsonify(result)
 
 @goals_bp.route('/milestones/<int:milestone_id>', methods=['DELETE'])
+@query_budget(6)
 @login_required
 def delete_milestone(milestone_id):
     """Delete a milestone"""
@@ -233,7 +496,13 @@ def delete_milestone(milestone_id):
     if not milestone:
         return jsonify({'error': 'Milestone not found'}), 404
     
+    revision = next_revision(user_id)
     db.session.delete(milestone)
+    goal = _update_goal_counters(milestone.goal_id, revision, total=-1, completed=-int(bool(milestone.completed)))
+    record_activity(
+        user_id, goal.category, added=[(milestone.created_at, -1)], completed=[(milestone.completed_at, -1)]
+    )
+    record_deletions(user_id, revision, 'milestone', [milestone_id])
     db.session.commit()
     
     return jsonify({'message': 'Milestone deleted successfully'})
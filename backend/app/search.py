@@ -0,0 +1,210 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from .models import db, Goal, Milestone
+import re
+import unicodedata
+
+# One FTS5 row per goal (rowid = goal.id). owner holds "u<user_id>" so a
+# search only walks the posting lists of the requesting user's goals;
+# milestones holds the titles of the goal's milestones separated by spaces.
+SEARCH_TABLE = 'goal_search'
+
+# Adds goals, with their milestone titles, to the index
+INDEX_GOALS = (
+    "INSERT INTO goal_search (rowid, owner, title, description, milestones) "
+    "SELECT goal.id, 'u' || goal.user_id, goal.title, coalesce(goal.description, ''), "
+    "coalesce((SELECT group_concat(milestone.title, ' ') FROM milestone WHERE milestone.goal_id = goal.id), '') "
+    "FROM goal"
+)
+
+# Triggers that bulk_insert_indexing() replaces with one statement per batch
+INSERT_TRIGGERS = ('goal_search_goal_insert', 'goal_search_milestone_insert')
+
+SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE goal_search USING fts5("
+    "owner, title, description, milestones, "
+    "prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER goal_search_goal_insert AFTER INSERT ON goal BEGIN "
+    "INSERT INTO goal_search (rowid, owner, title, description, milestones) "
+    "VALUES (new.id, 'u' || new.user_id, new.title, coalesce(new.description, ''), ''); "
+    "END",
+
+    "CREATE TRIGGER goal_search_goal_update AFTER UPDATE OF user_id, title, description ON goal BEGIN "
+    "UPDATE goal_search SET owner = 'u' || new.user_id, title = new.title, "
+    "description = coalesce(new.description, '') WHERE rowid = new.id; "
+    "END",
+
+    "CREATE TRIGGER goal_search_goal_delete AFTER DELETE ON goal BEGIN "
+    "DELETE FROM goal_search WHERE rowid = old.id; "
+    "END",
+
+    "CREATE TRIGGER goal_search_milestone_insert AFTER INSERT ON milestone BEGIN "
+    "UPDATE goal_search SET milestones = milestones || ' ' || new.title WHERE rowid = new.goal_id; "
+    "END",
+
+    "CREATE TRIGGER goal_search_milestone_update AFTER UPDATE OF title, goal_id ON milestone BEGIN "
+    "UPDATE goal_search SET milestones = coalesce("
+    "(SELECT group_concat(title, ' ') FROM milestone WHERE goal_id = goal_search.rowid), '') "
+    "WHERE rowid IN (old.goal_id, new.goal_id); "
+    "END",
+
+    "CREATE TRIGGER goal_search_milestone_delete AFTER DELETE ON milestone BEGIN "
+    "UPDATE goal_search SET milestones = coalesce("
+    "(SELECT group_concat(title, ' ') FROM milestone WHERE goal_id = old.goal_id), '') "
+    "WHERE rowid = old.goal_id; "
+    "END",
+
+    INDEX_GOALS,
+)
+
+# Ranking weights for the title, description and milestones columns
+COLUMN_WEIGHTS = (10.0, 2.0, 4.0)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MIN_TERM_LENGTH = 2
+MAX_SEARCH_TERMS = 10
+
+# Longest prefix with its own index (prefix='2 3' above). Longer prefix
+# queries make FTS5 merge the doclists of every matching term in the whole
+# table, so the index is queried with this many characters and the full
+# term is checked against the user's candidate rows instead.
+INDEXED_PREFIX = 3
+
+# Same token characters as the unicode61 tokenizer: letters and digits
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    """Create the index alongside db.create_all() for databases that are not migrated"""
+    if connection.dialect.name != 'sqlite':
+        return
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+    ).first()
+    if not exists:
+        for statement in SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+
+def _index_goals(goal_ids):
+    if goal_ids:
+        db.session.execute(
+            db.text(f'{INDEX_GOALS} WHERE goal.id IN :ids').bindparams(db.bindparam('ids', expanding=True)),
+            {'ids': list(goal_ids)}
+        )
+
+@contextmanager
+def bulk_insert_indexing():
+    """Index goals inserted inside the block once per batch instead of once per row.
+
+    Yields a function to call with each batch's new goal ids after their
+    milestones are inserted. On SQLite the insert triggers, which rewrite a
+    goal's index row for every milestone, are dropped for the block and
+    recreated on exit. This happens inside the caller's write transaction,
+    which must already hold the write lock, so no other writer sees the gap.
+    Elsewhere there is no index and the function does nothing.
+    """
+    if db.session.get_bind().dialect.name != 'sqlite':
+        yield lambda goal_ids: None
+        return
+
+    connection = db.session.connection()
+    triggers = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name IN (?, ?)", INSERT_TRIGGERS
+    ).scalars().all()
+    for name in INSERT_TRIGGERS:
+        connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+    try:
+        yield _index_goals
+    finally:
+        for statement in triggers:
+            connection.exec_driver_sql(statement)
+
+def _fold(text):
+    """Lower-case text and strip diacritics like the index's tokenizer"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def _tokens(text):
+    return _TOKEN_RE.findall(_fold(text or ''))
+
+def search_terms(query):
+    """Split a user query into distinct folded terms of at least MIN_TERM_LENGTH characters"""
+    terms = [term for term in dict.fromkeys(_tokens(query)) if len(term) >= MIN_TERM_LENGTH]
+    return terms[:MAX_SEARCH_TERMS]
+
+def match_expression(user_id, terms):
+    """FTS5 query for the user's goals matching the indexed prefix of every term"""
+    phrases = ' '.join(f'"{term[:INDEXED_PREFIX]}"*' for term in terms)
+    return f'owner : "u{user_id}" AND {{title description milestones}} : ({phrases})'
+
+def rank_matches(rows, terms):
+    """Return the ids of rows containing every term as a word prefix, best first.
+
+    rows are (id, title, description, milestones) tuples. Scores are BM25
+    term-frequency components weighted by column; IDF is left out because
+    every returned row contains every term.
+    """
+    documents = [(row[0], [_tokens(text) for text in row[1:]]) for row in rows]
+    average_lengths = [
+        max(1.0, sum(len(columns[index]) for _, columns in documents) / max(1, len(documents)))
+        for index in range(len(COLUMN_WEIGHTS))
+    ]
+
+    scored = []
+    for goal_id, columns in documents:
+        score = 0.0
+        for term in terms:
+            found = False
+            for tokens, weight, average in zip(columns, COLUMN_WEIGHTS, average_lengths):
+                frequency = sum(1 for token in tokens if token.startswith(term))
+                if frequency:
+                    found = True
+                    norm = 1 - BM25_B + BM25_B * len(tokens) / average
+                    score += weight * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+            if not found:
+                break
+        else:
+            scored.append((-score, goal_id))
+
+    return [goal_id for _, goal_id in sorted(scored)]
+
+def search_goal_ids(user_id, terms, *criteria, limit, offset=0):
+    """Return ids of the user's goals matching every term as a prefix, best match first.
+
+    criteria filter the joined goal rows (e.g. archived or category). On SQLite
+    the FTS5 index narrows the user's goals to candidates which are then
+    ranked in Python; other databases fall back to case-insensitive substring
+    matching ordered by most recently updated.
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        index = db.table(SEARCH_TABLE, db.column('title'), db.column('description'), db.column('milestones'))
+        rowid = db.literal_column(f'{SEARCH_TABLE}.rowid')
+        rows = db.session.execute(
+            db.select(Goal.id, index.c.title, index.c.description, index.c.milestones)
+            .select_from(index)
+            .join(Goal, Goal.id == rowid)
+            .where(db.literal_column(SEARCH_TABLE).op('MATCH')(match_expression(user_id, terms)), *criteria)
+        ).all()
+        return rank_matches(rows, terms)[offset:offset + limit]
+
+    conditions = []
+    for term in terms:
+        pattern = f'%{term}%'
+        conditions.append(db.or_(
+            Goal.title.ilike(pattern),
+            Goal.description.ilike(pattern),
+            db.select(Milestone.id)
+            .where(Milestone.goal_id == Goal.id, Milestone.title.ilike(pattern))
+            .exists()
+        ))
+
+    return db.session.scalars(
+        db.select(Goal.id)
+        .where(Goal.user_id == user_id, *conditions, *criteria)
+        .order_by(Goal.updated_at.desc(), Goal.id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
@@ -0,0 +1,79 @@
+from flask import current_app, g
+from .engine import PRIMARY_ONLY
+from .models import db, User, UserDirectory
+
+# Users are spread over the primary database (shard 0) and the databases in
+# SHARD_URLS by user_id modulo the shard count. A user's goals, milestones,
+# tombstones and cold goals live on the user's shard; user_directory on the
+# primary database maps usernames to ids and hands out new ids. The shard
+# count cannot change once users exist, since that would move them.
+
+def shard_count():
+    return len(current_app.config['SHARD_URLS']) + 1
+
+def shard_of(user_id):
+    return user_id % shard_count()
+
+def use_shard(shard):
+    """Send the session's statements to this shard for the rest of the app context"""
+    g.shard = shard
+
+def use_user_shard(user_id):
+    use_shard(shard_of(user_id))
+
+def each_shard():
+    """Select every shard in turn and yield its number.
+
+    The session is closed after each shard so that rows with the same id on
+    different shards never meet in its identity map; commit before moving on.
+    """
+    try:
+        for shard in range(shard_count()):
+            use_shard(shard)
+            yield shard
+            db.session.close()
+    finally:
+        use_shard(0)
+
+def sharded_tables():
+    """Tables every shard holds, in dependency order"""
+    return [table for table in db.metadata.sorted_tables if not table.info.get(PRIMARY_ONLY)]
+
+def backfill_directory():
+    """Add the primary database's users that are missing from the directory.
+
+    Covers databases made by create_all before the directory existed; the
+    migration that adds it does the same.
+    """
+    db.session.execute(
+        db.insert(UserDirectory).from_select(
+            ['id', 'username'],
+            db.select(User.id, User.username).where(User.id.not_in(db.select(UserDirectory.id)))
+        )
+    )
+    db.session.commit()
+
+def find_user(username):
+    """Return the user with this username, or None, and select their shard"""
+    if shard_count() > 1:
+        user_id = db.session.scalar(db.select(UserDirectory.id).where(UserDirectory.username == username))
+        if user_id is None:
+            return None
+        use_user_shard(user_id)
+    return db.session.execute(db.select(User).where(User.username == username)).scalar()
+
+def username_taken(username):
+    return db.session.scalar(
+        db.select(UserDirectory.id).where(UserDirectory.username == username)
+    ) is not None
+
+def create_user(username, password):
+    """Add a user to the directory and to the shard of their new id; the caller commits"""
+    entry = UserDirectory(username=username)
+    db.session.add(entry)
+    db.session.flush()  # assigns the id on the primary database
+
+    use_user_shard(entry.id)
+    user = User(id=entry.id, username=username, password=password)
+    db.session.add(user)
+    return user
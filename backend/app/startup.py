@@ -0,0 +1,142 @@
+from flask import current_app
+from .cache import MemoryResponseCache, NullResponseCache
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from .engine import shard_binds
+from weakref import WeakSet
+import click
+import os
+import re
+
+# Apps whose engines and worker pools must be reset in forked children
+_apps = WeakSet()
+
+_REVISION_RE = re.compile(r'^(down_)?revision\s*=\s*(.+)$', re.MULTILINE)
+_REVISION_ID_RE = re.compile(r"['\"](\w+)['\"]")
+
+class MigrateCommands(click.Group):
+    """`flask db` command group that imports Flask-Migrate on first use.
+
+    Flask-Migrate pulls in Alembic, which takes longer to import than the rest
+    of the app, so it is only loaded when a migration command actually runs.
+    """
+
+    def __init__(self, db, directory):
+        super().__init__('db', help='Perform database migrations.')
+        self.db = db
+        self.directory = directory
+
+    def _commands(self):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as commands
+
+        app = current_app._get_current_object()
+        if 'migrate' not in app.extensions:
+            Migrate(app, self.db, directory=self.directory)
+        return commands
+
+    def list_commands(self, ctx):
+        return self._commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands().get_command(ctx, name)
+
+def migration_heads(directory):
+    """Return the head revision ids of the migration scripts in directory.
+
+    The ids are read straight from the version files, which is much cheaper
+    than loading Alembic's script directory.
+    """
+    revisions, parents = set(), set()
+    versions = os.path.join(directory, 'versions')
+
+    for name in os.listdir(versions):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(versions, name), encoding='utf-8') as f:
+            source = f.read()
+        for down, value in _REVISION_RE.findall(source):
+            (parents if down else revisions).update(_REVISION_ID_RE.findall(value))
+
+    return revisions - parents
+
+def check_schema_revision(app, db):
+    """Raise RuntimeError unless the database and every shard are at the latest migration"""
+    heads = migration_heads(app.config['MIGRATIONS_DIR'])
+
+    with app.app_context():
+        for bind_key in [None, *shard_binds(app.config)]:
+            try:
+                with db.engines[bind_key].connect() as connection:
+                    current = set(connection.scalars(text('SELECT version_num FROM alembic_version')))
+            except DBAPIError:
+                current = set()  # never migrated
+
+            if current != heads:
+                raise RuntimeError(
+                    f'Database {bind_key or "primary"} is at revision {", ".join(sorted(current)) or "none"} '
+                    f'but the migrations head is {", ".join(sorted(heads))}; run "flask db upgrade"'
+                )
+
+def in_cli_command():
+    """Return True while a flask CLI command other than `flask run` is loading the app"""
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.command.name != 'run'
+
+def prepare_database(app, db):
+    """Create or verify the schema as selected by DB_STARTUP.
+
+    create_all creates any missing tables (on every shard), check only
+    compares the databases' Alembic revisions with the migration scripts, and
+    skip does neither.
+    Commands run through the flask CLI (other than `flask run`) skip both,
+    so that `flask db upgrade` can still bring an outdated database up to
+    date instead of colliding with tables create_all made ahead of their
+    migrations.
+    """
+    mode = app.config['DB_STARTUP']
+    if mode not in ('create_all', 'check', 'skip'):
+        raise ValueError(f'Unknown DB_STARTUP mode: {mode}')
+    if in_cli_command():
+        return
+
+    if mode == 'create_all':
+        with app.app_context():
+            from .shards import backfill_directory, sharded_tables
+            # Only the primary bind: shards get their tables below, and db is shared by
+            # every app in the process, so it may list binds this app lacks
+            db.create_all(bind_key=None)
+            backfill_directory()
+            for bind_key in shard_binds(app.config):
+                db.metadata.create_all(db.engines[bind_key], tables=sharded_tables())
+    elif mode == 'check':
+        check_schema_revision(app, db)
+
+def reset_after_fork(app):
+    """Drop state a forked worker must not share with its parent.
+
+    Pooled connections are de-referenced without being closed, since the
+    parent still owns the sockets, and the password hashing and batch worker
+    threads, which do not survive a fork, are replaced.
+    """
+    with app.app_context():
+        for engine in app.extensions['sqlalchemy'].engines.values():
+            engine.dispose(close=False)
+
+    app.extensions['focusflow_passwords'].reset_after_fork()
+    if isinstance(app.extensions['focusflow_response_cache'], MemoryResponseCache):
+        # Writes handled by sibling workers would never drop this worker's entries
+        app.logger.warning('RESPONSE_CACHE=memory only works in a single process; response caching is off in forked workers')
+        app.extensions['focusflow_response_cache'] = NullResponseCache()
+    app.extensions['focusflow_batch'].reset_after_fork()
+
+def _reset_apps_after_fork():
+    for app in list(_apps):
+        reset_after_fork(app)
+
+def track_forks(app):
+    """Reset app in every child process forked after this call (e.g. gunicorn --preload)"""
+    _apps.add(app)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_apps_after_fork)
@@ -0,0 +1,214 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from flask.cli import with_appcontext
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from .models import db, ColdGoal, DailyStat, Goal, Milestone
+from .auth import login_required
+from .coldstore import unpack_goal
+from .querylog import query_budget
+from .shards import each_shard
+import click
+
+stats_bp = Blueprint('stats', __name__)
+
+# daily_stat holds, per user, UTC day and goal category, how many milestones
+# were added (by created_at) and completed (by completed_at) and how many
+# goals were archived (by archived_at), counting the current rows, cold goals
+# included. Every write that changes one of those timestamps, a goal's
+# category or deletes rows adjusts the counters in the same transaction, so
+# /goals/stats reads one row per active day and category. Rows whose
+# counters drop to zero are left behind and ignored; `flask rebuild-stats`
+# recomputes the table from scratch.
+COUNTERS = ('milestones_added', 'milestones_completed', 'goals_archived')
+
+DEFAULT_STATS_DAYS = 30
+MAX_STATS_DAYS = 366
+
+def _upsert(select=None):
+    """INSERT into daily_stat that adds to the counters of existing rows"""
+    dialect = db.session.get_bind().dialect.name
+    module = {'postgresql': postgresql, 'mysql': mysql, 'mariadb': mysql}.get(dialect, sqlite)
+    insert = module.insert(DailyStat)
+    if select is not None:
+        insert = insert.from_select(['user_id', 'day', 'category', *COUNTERS], select)
+
+    if module is mysql:
+        return insert.on_duplicate_key_update(
+            {name: getattr(DailyStat, name) + insert.inserted[name] for name in COUNTERS}
+        )
+    return insert.on_conflict_do_update(
+        index_elements=['user_id', 'day', 'category'],
+        set_={name: getattr(DailyStat, name) + insert.excluded[name] for name in COUNTERS}
+    )
+
+def _apply(deltas):
+    """Add {(user_id, day, category): [added, completed, archived]} to daily_stat in one statement"""
+    rows = [
+        {'user_id': user_id, 'day': day, 'category': category, **dict(zip(COUNTERS, counts))}
+        for (user_id, day, category), counts in deltas.items()
+        if any(counts)
+    ]
+    if rows:
+        db.session.execute(_upsert(), rows)
+
+def _count(deltas, user_id, category, index, timestamp, delta):
+    if timestamp is not None:
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        deltas[(user_id, timestamp.date(), category or '')][index] += delta
+
+def record_activity(user_id, category, added=(), completed=(), archived=()):
+    """Adjust the counters of one goal's category.
+
+    added, completed and archived hold (timestamp, delta) pairs; pairs with
+    a None timestamp are skipped and changes that cancel out within a day
+    write nothing.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for index, changes in enumerate((added, completed, archived)):
+        for timestamp, delta in changes:
+            _count(deltas, user_id, category, index, timestamp, delta)
+    _apply(deltas)
+
+def _count_goal_dict(deltas, goal, sign):
+    """Count a full goal dict (e.g. a cold goal's document) into deltas"""
+    user_id, category = goal['user_id'], goal['category']
+    for milestone in goal['milestones']:
+        _count(deltas, user_id, category, 0, milestone['created_at'], sign)
+        _count(deltas, user_id, category, 1, milestone['completed_at'], sign)
+    _count(deltas, user_id, category, 2, goal['archived_at'], sign)
+
+def record_goal_dict(goal, sign=1):
+    """Add (or with sign=-1 remove) everything a full goal dict counts"""
+    deltas = defaultdict(lambda: [0, 0, 0])
+    _count_goal_dict(deltas, goal, sign)
+    _apply(deltas)
+
+def _activity_select(*criteria, sign=1):
+    """Select the daily_stat rows that the goals matching criteria count, times sign"""
+    category = db.func.coalesce(Goal.category, '').label('category')
+    zero, delta = db.literal(0), db.literal(sign)
+
+    def part(timestamp, added, completed, archived):
+        select = db.select(
+            Goal.user_id.label('user_id'), db.func.date(timestamp).label('day'), category,
+            added.label('added'), completed.label('completed'), archived.label('archived')
+        )
+        if timestamp.class_ is Milestone:
+            select = select.select_from(Milestone).join(Goal, Milestone.goal_id == Goal.id)
+        return select.where(timestamp.is_not(None), *criteria)
+
+    activity = db.union_all(
+        part(Milestone.created_at, delta, zero, zero),
+        part(Milestone.completed_at, zero, delta, zero),
+        part(Goal.archived_at, zero, zero, delta)
+    ).subquery()
+
+    return (
+        db.select(
+            activity.c.user_id, activity.c.day, activity.c.category,
+            db.func.sum(activity.c.added), db.func.sum(activity.c.completed), db.func.sum(activity.c.archived)
+        )
+        # SQLite needs a WHERE clause to tell INSERT ... SELECT from its ON CONFLICT
+        .where(activity.c.user_id.is_not(None))
+        .group_by(activity.c.user_id, activity.c.day, activity.c.category)
+    )
+
+def add_goal_activity(goal_ids):
+    """Count the current state of these goals and their milestones"""
+    if goal_ids:
+        db.session.execute(_upsert(_activity_select(Goal.id.in_(list(goal_ids)))))
+
+def remove_goal_activity(goal_ids):
+    """Uncount these goals and their milestones; call before changing or deleting them"""
+    if goal_ids:
+        db.session.execute(_upsert(_activity_select(Goal.id.in_(list(goal_ids)), sign=-1)))
+
+def rebuild_stats(batch_size=500):
+    """Recompute daily_stat for the session's shard from goals, milestones and cold goals"""
+    db.session.execute(db.delete(DailyStat), execution_options={'synchronize_session': False})
+    db.session.execute(_upsert(_activity_select()))
+
+    deltas = defaultdict(lambda: [0, 0, 0])
+    documents = db.session.scalars(db.select(ColdGoal.document).execution_options(yield_per=batch_size))
+    for document in documents:
+        _count_goal_dict(deltas, unpack_goal(document), 1)
+    _apply(deltas)
+    db.session.commit()
+
+def streaks(days, today):
+    """Return (current, longest) runs of consecutive days in a set of days.
+
+    The current streak ends today, or yesterday while today has no activity yet.
+    """
+    longest = 0
+    for day in days:
+        if day - timedelta(days=1) not in days:
+            length = 1
+            while day + timedelta(days=length) in days:
+                length += 1
+            longest = max(longest, length)
+
+    current = 0
+    day = today if today in days else today - timedelta(days=1)
+    while day in days:
+        current += 1
+        day -= timedelta(days=1)
+    return current, longest
+
+@stats_bp.route('/stats', methods=['GET'])
+@query_budget(1)
+@login_required
+def get_stats():
+    """Completion rates per category, daily completions and streaks over the last days days"""
+    try:
+        days = int(request.args.get('days', DEFAULT_STATS_DAYS))
+    except ValueError:
+        return jsonify({'error': 'Invalid days'}), 400
+    if not 1 <= days <= MAX_STATS_DAYS:
+        return jsonify({'error': f'Days must be between 1 and {MAX_STATS_DAYS}'}), 400
+
+    # UTC days, like the stored timestamps
+    today = datetime.utcnow().date()
+    # A range on the primary key's second column, so only the window's rows are read
+    cutoff = today - timedelta(days=days - 1)
+    rows = db.session.execute(
+        db.select(DailyStat.day, DailyStat.category, *(getattr(DailyStat, name) for name in COUNTERS))
+        .where(DailyStat.user_id == request.user_id, DailyStat.day >= cutoff)
+    ).all()
+
+    categories = defaultdict(lambda: {'milestones': 0, 'completed': 0, 'goals_archived': 0})
+    completed_by_day = defaultdict(int)
+    for day, category, added, completed, archived in rows:
+        totals = categories[category]
+        totals['milestones'] += added
+        totals['completed'] += completed
+        totals['goals_archived'] += archived
+        completed_by_day[day] += completed
+
+    for totals in categories.values():
+        totals['completion_rate'] = round(totals['completed'] / totals['milestones'], 4) if totals['milestones'] else 0.0
+
+    daily = [
+        {'day': day.isoformat(), 'completed': completed_by_day.get(day, 0)}
+        for day in (today - timedelta(days=offset) for offset in range(days - 1, -1, -1))
+    ]
+    current, longest = streaks({day for day, completed in completed_by_day.items() if completed > 0}, today)
+
+    return jsonify({
+        'categories': {
+            category: totals for category, totals in categories.items()
+            if totals['milestones'] or totals['goals_archived']
+        },
+        'daily': daily,
+        'streak': {'current': current, 'longest': longest}
+    })
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Recompute the daily stats rollup on every shard"""
+    for _ in each_shard():
+        rebuild_stats()
+    click.echo('Rebuilt daily stats')
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import with_appcontext
+from .coldstore import load_cold_goal_dicts, merge_by_id
+from .models import db, ColdGoal, Goal, Tombstone, User
+from .queries import load_goal_dicts
+from .shards import each_shard
+import click
+
+class CursorExpired(Exception):
+    """Raised when the tombstones a sync cursor depends on were compacted away"""
+
+def next_revision(user_id):
+    """Bump and return the user's sync revision.
+
+    Call once per write transaction and stamp the result on every goal it
+    changes. The UPDATE locks the user's row until commit, so one user's
+    writes receive increasing revisions in commit order.
+    """
+    return db.session.execute(
+        db.update(User)
+        .where(User.id == user_id)
+        .values(sync_revision=User.sync_revision + 1)
+        .returning(User.sync_revision),
+        execution_options={'synchronize_session': False}
+    ).scalar_one()
+
+def record_deletions(user_id, revision, kind, object_ids):
+    """Insert tombstones for hard-deleted goals or milestones"""
+    if object_ids:
+        now = datetime.utcnow()
+        db.session.execute(db.insert(Tombstone), [
+            {'user_id': user_id, 'kind': kind, 'object_id': object_id, 'revision': revision, 'deleted_at': now}
+            for object_id in object_ids
+        ])
+
+def load_changes(user_id, since):
+    """Return the user's goals changed after revision since, plus deletions.
+
+    The result holds full goal dicts (with milestones, archived included),
+    deleted goal and milestone ids, and the cursor to pass next time. With
+    since=0 every goal is returned, cold-stored ones included, and no
+    deletions are needed. Raises
+    CursorExpired if compaction removed tombstones newer than since.
+    """
+    revision, floor = db.session.execute(
+        db.select(User.sync_revision, User.sync_floor).where(User.id == user_id)
+    ).one()
+
+    if 0 < since < floor:
+        raise CursorExpired()
+
+    criteria = [Goal.user_id == user_id, Goal.revision <= revision]
+    if since:
+        criteria.append(Goal.revision > since)
+    goals = load_goal_dicts(*criteria)
+    if not since:
+        # Cold goals never change while cold, so only a full sync needs them
+        goals = list(merge_by_id(goals, load_cold_goal_dicts(ColdGoal.user_id == user_id)))
+
+    deleted = {'goals': [], 'milestones': []}
+    if since:
+        for kind, object_id in db.session.execute(
+            db.select(Tombstone.kind, Tombstone.object_id)
+            .where(Tombstone.user_id == user_id, Tombstone.revision > since, Tombstone.revision <= revision)
+            .order_by(Tombstone.revision, Tombstone.id)
+        ):
+            deleted[f'{kind}s'].append(object_id)
+
+    return {'goals': goals, 'deleted': deleted, 'cursor': str(revision)}
+
+def compact_tombstones(older_than):
+    """Delete tombstones recorded before older_than and return how many were removed.
+
+    Each affected user's sync_floor moves up to the newest revision removed,
+    so cursors older than that have to resync from scratch.
+    """
+    newest_removed = (
+        db.select(db.func.max(Tombstone.revision))
+        .where(Tombstone.user_id == User.id, Tombstone.deleted_at < older_than)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        db.update(User)
+        .where(User.id.in_(db.select(Tombstone.user_id).where(Tombstone.deleted_at < older_than)))
+        .values(sync_floor=db.case((newest_removed > User.sync_floor, newest_removed), else_=User.sync_floor)),
+        execution_options={'synchronize_session': False}
+    )
+    removed = db.session.execute(
+        db.delete(Tombstone).where(Tombstone.deleted_at < older_than),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    db.session.commit()
+    return removed
+
+@click.command('compact-tombstones')
+@click.option('--days', type=int, default=None, help='Keep tombstones this many days (default TOMBSTONE_RETENTION_DAYS)')
+@with_appcontext
+def compact_tombstones_command(days):
+    """Remove old delta-sync tombstones from every shard"""
+    if days is None:
+        days = current_app.config['TOMBSTONE_RETENTION_DAYS']
+    older_than = datetime.utcnow() - timedelta(days=days)
+    removed = sum(compact_tombstones(older_than) for _ in each_shard())
+    click.echo(f'Removed {removed} tombstones older than {days} days')
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+import secrets
+import time
+
+TOKEN_SALT = 'focusflow-auth-token'
+
+class TokenManager:
+    """Issues and verifies signed, expiring auth tokens.
+
+    Verified tokens are kept in a bounded LRU cache so repeat requests skip
+    signature checks and the database. Revocations are stored in the
+    revoked_token table, which is consulted when a token is not cached and
+    again once its cache entry is cache_ttl seconds old, so a logout handled
+    by one worker process reaches the others within cache_ttl and survives
+    restarts.
+    """
+
+    def __init__(self, secret_key, max_age, cache_size, cache_ttl):
+        self.serializer = URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+        self.max_age = max_age
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._verified = OrderedDict()  # token -> (user_id, token_id, expires_at, recheck_at)
+        self._lock = Lock()
+
+    def _remember(self, token, entry, now):
+        user_id, token_id, expires_at = entry
+        with self._lock:
+            self._verified[token] = (user_id, token_id, expires_at, min(expires_at, now + self.cache_ttl))
+            self._verified.move_to_end(token)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+    def _forget(self, token):
+        with self._lock:
+            self._verified.pop(token, None)
+
+    def issue(self, user_id):
+        """Create a new signed token for a user"""
+        token_id = secrets.token_urlsafe(8)
+        now = time.time()
+        token = self.serializer.dumps({'uid': user_id, 'jti': token_id})
+        # A token that was just issued cannot have been revoked yet
+        self._remember(token, (user_id, token_id, int(now) + self.max_age), now)
+        return token
+
+    def _decode(self, token):
+        """Verify a token's signature and age, returning (user_id, token_id, expires_at) or None"""
+        try:
+            payload, issued_at = self.serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+        except BadSignature:
+            return None
+
+        if not isinstance(payload, dict) or 'uid' not in payload:
+            return None
+
+        return payload['uid'], payload.get('jti'), issued_at.timestamp() + self.max_age
+
+    def verify(self, token):
+        """Return the user id a token was issued for, or None if it is invalid or revoked"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._verified.get(token)
+            if entry is not None and entry[3] > now:
+                self._verified.move_to_end(token)
+                return entry[0]
+
+        if entry is not None and entry[2] > now:
+            entry = entry[:3]  # the signature was checked before; only revocation needs a fresh look
+        else:
+            entry = self._decode(token)
+            if entry is None:
+                self._forget(token)
+                return None
+
+        if entry[1] is not None and is_revoked(entry[1]):
+            self._forget(token)
+            return None
+
+        self._remember(token, entry, now)
+        return entry[0]
+
+    def revoke(self, token):
+        """Revoke a token so it is rejected by every later verify() call; the caller commits"""
+        entry = self._decode(token)
+        self._forget(token)
+        if entry is not None and entry[1] is not None:
+            store_revocation(*entry)
+
+    def clear(self):
+        """Forget all cached verifications"""
+        with self._lock:
+            self._verified.clear()
+
+# The models are imported when first needed: this module is loaded while the
+# app package, which defines db, is still being imported.
+
+def is_revoked(token_id):
+    """Return True if the token with this id was revoked.
+
+    Reads from the primary database, even for GET requests when a read
+    replica is configured, so that a logout takes effect at once.
+    """
+    from .models import db, RevokedToken
+    return db.session.scalar(
+        db.select(RevokedToken.jti).where(RevokedToken.jti == token_id),
+        bind_arguments={'bind': db.engine}
+    ) is not None
+
+def store_revocation(user_id, token_id, expires_at):
+    """Record a revoked token until it would have expired, dropping revocations that are no longer needed"""
+    from .models import db, RevokedToken
+    db.session.execute(
+        db.delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.add(RevokedToken(jti=token_id, user_id=user_id, expires_at=datetime.utcfromtimestamp(expires_at)))
+
+def get_token_manager():
+    """Return the token manager registered by create_app"""
+    return current_app.extensions['focusflow_tokens']
+
+def issue_token(user_id):
+    """Issue a signed token for a user"""
+    return get_token_manager().issue(user_id)
+
+def verify_token(token):
+    """Return the user id for a valid token, or None"""
+    return get_token_manager().verify(token)
+
+def revoke_token(token):
+    """Revoke a previously issued token; the caller commits"""
+    get_token_manager().revoke(token)
@@ -0,0 +1,226 @@
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask.cli import with_appcontext
+from itertools import islice
+from .models import db, ColdGoal, Goal, Milestone
+from .auth import login_required
+from .cache import get_response_cache, invalidate_after_write
+from .coldstore import iter_cold_goal_dicts, merge_by_id
+from .queries import STREAM_CHUNK_SIZE, insert_in_row_order, iter_goal_dicts
+from .querylog import repeats_queries
+from .search import bulk_insert_indexing
+from .shards import find_user
+from .stats import add_goal_activity
+from .sync import next_revision
+import click
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+transfer_bp = Blueprint('transfer', __name__)
+transfer_bp.after_request(invalidate_after_write)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+READ_CHUNK_SIZE = 64 * 1024  # bytes
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+class ImportFormatError(ValueError):
+    """Raised for an import line that is not a valid goal"""
+
+    def __init__(self, line_number, message):
+        super().__init__(f'Line {line_number}: {message}')
+        self.line_number = line_number
+
+def export_lines(user_id):
+    """Yield every goal of the user, archived and cold-stored ones included, as NDJSON lines.
+
+    Each line is one goal with its milestones, as GET /goals/<id> returns it,
+    and each chunk holds up to STREAM_CHUNK_SIZE lines. Goals are read through
+    server-side cursors, so memory use stays constant.
+    """
+    goals = merge_by_id(
+        iter_goal_dicts(Goal.user_id == user_id),
+        iter_cold_goal_dicts(ColdGoal.user_id == user_id)
+    )
+    dumps = current_app.json.dumps_bytes
+    while chunk := list(islice(goals, STREAM_CHUNK_SIZE)):
+        yield b''.join(dumps(goal) + b'\n' for goal in chunk)
+
+def _read_lines(stream):
+    """Split a binary stream into lines, reading it in large chunks.
+
+    Iterating the WSGI input stream directly reads it one byte at a time.
+    """
+    pending = b''
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+def _timestamp(value, line_number, name):
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ImportFormatError(line_number, f'Invalid {name}') from None
+
+def _parse_goal(line, line_number, user_id, revision, now):
+    """Turn one NDJSON line into a goal row and its milestone rows"""
+    try:
+        data = _loads(line)
+    except ValueError:
+        raise ImportFormatError(line_number, 'Invalid JSON') from None
+
+    if not isinstance(data, dict) or not isinstance(data.get('title'), str):
+        raise ImportFormatError(line_number, 'Title is required')
+
+    milestones = data.get('milestones') or []
+    if not isinstance(milestones, list) or not all(
+        isinstance(milestone, dict) and isinstance(milestone.get('title'), str) for milestone in milestones
+    ):
+        raise ImportFormatError(line_number, 'Every milestone requires a title')
+
+    milestone_rows = [
+        {
+            'title': milestone['title'],
+            'completed': bool(milestone.get('completed')),
+            'created_at': _timestamp(milestone.get('created_at'), line_number, 'created_at') or now,
+            'completed_at': _timestamp(milestone.get('completed_at'), line_number, 'completed_at')
+        }
+        for milestone in milestones
+    ]
+
+    archived = bool(data.get('archived'))
+    goal_row = {
+        'title': data['title'],
+        'description': data.get('description', ''),
+        'category': data.get('category', 'Personal'),
+        'user_id': user_id,
+        'created_at': _timestamp(data.get('created_at'), line_number, 'created_at') or now,
+        'updated_at': _timestamp(data.get('updated_at'), line_number, 'updated_at') or now,
+        'archived': archived,
+        'archived_at': _timestamp(data.get('archived_at'), line_number, 'archived_at') if archived else None,
+        'milestone_total': len(milestone_rows),
+        'milestone_completed': sum(1 for row in milestone_rows if row['completed']),
+        'revision': revision
+    }
+    return goal_row, milestone_rows
+
+# Imports insert through the Core tables: the ORM's bulk insert path costs
+# more per row than SQLite spends storing it
+_goal_table = Goal.__table__
+_milestone_table = Milestone.__table__
+
+def _insert_batch(batch, index):
+    """Insert a batch of parsed goals with one statement per table, then index and count them"""
+    if not batch:
+        return 0
+
+    goal_ids = [row.id for row in insert_in_row_order(_goal_table, [goal_row for goal_row, _ in batch], _goal_table.c.id)]
+
+    milestone_rows = []
+    for (_, milestones), goal_id in zip(batch, goal_ids):
+        for row in milestones:
+            row['goal_id'] = goal_id
+            milestone_rows.append(row)
+    if milestone_rows:
+        db.session.execute(db.insert(_milestone_table), milestone_rows)
+    index(goal_ids)
+    add_goal_activity(goal_ids)
+    return len(milestone_rows)
+
+def import_lines(user_id, lines, batch_size):
+    """Import NDJSON goal lines (as export_lines writes them) for the user.
+
+    Lines are parsed one at a time and inserted batch_size goals at a time,
+    so memory use does not grow with the input. Ids in the input are ignored
+    and new ones assigned. Everything is imported in one transaction which
+    the caller commits; raises ImportFormatError on the first invalid line.
+    Returns the number of goals and milestones imported.
+    """
+    # Taking the revision first also takes the write lock bulk_insert_indexing needs
+    revision = next_revision(user_id)
+    now = datetime.utcnow()
+    goals = milestones = 0
+    batch = []
+
+    with bulk_insert_indexing() as index:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            batch.append(_parse_goal(line, line_number, user_id, revision, now))
+            if len(batch) >= batch_size:
+                milestones += _insert_batch(batch, index)
+                goals += len(batch)
+                batch = []
+
+        milestones += _insert_batch(batch, index)
+        goals += len(batch)
+    return goals, milestones
+
+@transfer_bp.route('/export', methods=['GET'])
+@login_required
+def export_goals():
+    """Stream all of the user's goals and milestones as NDJSON"""
+    return Response(stream_with_context(export_lines(request.user_id)), mimetype=NDJSON_MIMETYPE)
+
+@transfer_bp.route('/import', methods=['POST'])
+@repeats_queries
+@login_required
+def import_goals():
+    """Import goals and milestones from an NDJSON request body in one transaction"""
+    try:
+        goals, milestones = import_lines(
+            request.user_id, _read_lines(request.stream), current_app.config['IMPORT_BATCH_SIZE']
+        )
+    except ImportFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    db.session.commit()
+    return jsonify({'goals': goals, 'milestones': milestones}), 201
+
+def _user_id(username):
+    """Return the id of the named user and select their shard"""
+    user = find_user(username)
+    if user is None:
+        raise click.BadParameter(f'No user named {username}', param_hint='USERNAME')
+    return user.id
+
+@click.command('export-goals')
+@click.argument('username')
+@click.argument('file', type=click.File('wb'), default='-')
+@with_appcontext
+def export_goals_command(username, file):
+    """Write a user's goals as NDJSON to FILE (default stdout)"""
+    for line in export_lines(_user_id(username)):
+        file.write(line)
+
+@click.command('import-goals')
+@click.argument('username')
+@click.argument('file', type=click.File('rb'), default='-')
+@click.option('--batch-size', type=int, default=None, help='Goals inserted per statement (default IMPORT_BATCH_SIZE)')
+@with_appcontext
+def import_goals_command(username, file, batch_size):
+    """Import NDJSON goals from FILE (default stdin) for a user"""
+    if batch_size is None:
+        batch_size = current_app.config['IMPORT_BATCH_SIZE']
+    user_id = _user_id(username)
+    try:
+        goals, milestones = import_lines(user_id, file, batch_size)
+    except ImportFormatError as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    db.session.commit()
+    get_response_cache().invalidate(user_id)
+    click.echo(f'Imported {goals} goals and {milestones} milestones for {username}')
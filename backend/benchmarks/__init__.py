@@ -0,0 +1 @@
+"""Benchmarks for the FocusFlow API. Run modules with ``python -m benchmarks.<name>``."""
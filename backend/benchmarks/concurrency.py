@@ -0,0 +1,130 @@
+"""Stress SQLite with concurrent readers while a writer keeps committing.
+
+Runs the same workload twice: once with the default engine profile (WAL and
+busy_timeout) and once with the pragmas disabled (rollback journal). Each run
+uses a fresh database file, one writer process toggling milestones and several
+reader processes listing goals. Prints throughput, latency percentiles and the
+number of failed requests for readers and the writer as JSON.
+
+    python -m benchmarks.concurrency --readers 8 --seconds 5
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from app.engine import SQLITE_PRAGMAS
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+def make_app(database, pragmas):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'SQLITE_PRAGMAS': pragmas,
+        'RESPONSE_CACHE': 'none',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    })
+
+def reader(database, pragmas, headers, start, deadline, results):
+    """Worker process listing goals between start and deadline"""
+    client = make_app(database, pragmas).test_client()
+    time.sleep(max(0, start - time.time()))
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        response = client.get('/goals/?include_archived=true', headers=headers)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    results.put(('read', latencies, errors))
+
+def writer(database, pragmas, headers, milestone_ids, start, deadline, results):
+    """Worker process toggling milestones between start and deadline"""
+    client = make_app(database, pragmas).test_client()
+    time.sleep(max(0, start - time.time()))
+    latencies, errors, index = [], 0, 0
+    while time.time() < deadline:
+        milestone_id = milestone_ids[index % len(milestone_ids)]
+        started = time.perf_counter()
+        response = client.put(f'/goals/milestones/{milestone_id}', headers=headers, json={'completed': index % 2 == 0})
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+        index += 1
+    results.put(('write', latencies, errors))
+
+def run(profile, pragmas, readers, seconds, goals):
+    """Run one stress round and return its reader/writer statistics"""
+    database = os.path.join(tempfile.mkdtemp(prefix='focusflow-stress-'), 'stress.db')
+    client = make_app(database, pragmas).test_client()
+
+    client.post('/auth/register', json={'username': 'stress', 'password': 'stress'})
+    token = client.post('/auth/login', json={'username': 'stress', 'password': 'stress'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    created = client.post('/goals/bulk', headers=headers, json={'operations': [
+        {'op': 'create', 'title': f'Goal {index}', 'milestones': [{'title': 'Step'}] * 5}
+        for index in range(goals)
+    ]}).get_json()
+    milestone_ids = [
+        milestone['id']
+        for result in created['results']
+        for milestone in result['data']['milestones']
+    ]
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    # Leave time for the spawned interpreters to import the app before the clock starts
+    start = time.time() + 3
+    deadline = start + seconds
+    processes = [
+        context.Process(target=reader, args=(database, pragmas, headers, start, deadline, results))
+        for _ in range(readers)
+    ]
+    processes.append(context.Process(target=writer, args=(database, pragmas, headers, milestone_ids, start, deadline, results)))
+    for process in processes:
+        process.start()
+
+    collected = {'read': ([], 0), 'write': ([], 0)}
+    for _ in processes:
+        kind, latencies, errors = results.get()
+        collected[kind] = (collected[kind][0] + latencies, collected[kind][1] + errors)
+    for process in processes:
+        process.join()
+
+    summary = {'profile': profile}
+    for kind, (latencies, errors) in collected.items():
+        summary[kind] = {
+            'per_second': len(latencies) / seconds,
+            'errors': errors,
+            'p50_ms': percentile(latencies, 0.50),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': max(latencies) * 1000 if latencies else None,
+            'mean_ms': statistics.mean(latencies) * 1000 if latencies else None,
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--goals', type=int, default=50)
+    args = parser.parse_args()
+
+    results = [
+        run('wal', dict(SQLITE_PRAGMAS), args.readers, args.seconds, args.goals),
+        run('rollback-journal', {'journal_mode': 'DELETE'}, args.readers, args.seconds, args.goals),
+    ]
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Generate a synthetic FocusFlow dataset for benchmarks.
+
+Creates N users with a per-user number of goals drawn from a range, each goal
+with a number of milestones drawn from another range, a configurable share of
+archived goals and completed milestones, and categories drawn from
+GOAL_CATEGORIES (optionally weighted). The same seed always produces the same
+data. Rows are inserted with one executemany per table, and every user gets
+the same password, hashed once.
+
+    python -m benchmarks.dataset --database /tmp/focusflow.db --users 100 --goals 10:30 --milestones 0:8
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import random
+
+from app import create_app, db
+from app.models import GOAL_CATEGORIES, Goal, Milestone, User, UserDirectory
+from app.passwords import hash_password
+from app.shards import each_shard, shard_count
+
+PASSWORD = 'benchmark'
+
+def parse_range(value):
+    """Parse "N" or "MIN:MAX" into an inclusive (min, max) tuple"""
+    low, _, high = value.partition(':')
+    low = int(low)
+    high = int(high) if high else low
+    if not 0 <= low <= high:
+        raise argparse.ArgumentTypeError(f'invalid range: {value}')
+    return low, high
+
+def parse_weights(value):
+    """Parse "Work=3,Health=1" into category weights"""
+    weights = {}
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in GOAL_CATEGORIES:
+            raise argparse.ArgumentTypeError(f'unknown category: {name}')
+        weights[name] = float(weight or 1)
+    return weights
+
+def generate(app, users=10, goals=(10, 30), milestones=(0, 8), archived_ratio=0.2,
+             completed_ratio=0.5, categories=None, seed=0, prefix='bench'):
+    """Insert a synthetic dataset and return the created users.
+
+    Each user is returned as {'username', 'password', 'goal_ids',
+    'milestone_ids'} so scenarios can address their own rows. Ids continue
+    after the highest existing ones, so the database does not have to be empty.
+    With SHARD_URLS configured, each user's rows go to the user's shard.
+    """
+    rng = random.Random(seed)
+    weights = categories or {name: 1 for name in GOAL_CATEGORIES}
+    names, category_weights = list(weights), list(weights.values())
+    start = datetime.utcnow() - timedelta(days=365)
+
+    with app.app_context():
+        password_hash = hash_password(PASSWORD)
+        next_ids = {model: 1 for model in (User, Goal, Milestone)}
+        for _ in each_shard():
+            for model in next_ids:
+                next_ids[model] = max(next_ids[model], (db.session.scalar(db.select(db.func.max(model.id))) or 0) + 1)
+
+        user_rows, goal_rows, milestone_rows, created = [], [], [], []
+        for user_index in range(users):
+            user_id = next_ids[User] + user_index
+            username = f'{prefix}-{seed}-{user_id}'
+            user_rows.append({'id': user_id, 'username': username, 'password': password_hash, 'created_at': start})
+            user = {'username': username, 'password': PASSWORD, 'goal_ids': [], 'milestone_ids': []}
+
+            for _ in range(rng.randint(*goals)):
+                goal_id = next_ids[Goal] + len(goal_rows)
+                created_at = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+                completed = 0
+                total = rng.randint(*milestones)
+                for step in range(total):
+                    done = rng.random() < completed_ratio
+                    completed += done
+                    milestone_id = next_ids[Milestone] + len(milestone_rows)
+                    milestone_rows.append({
+                        'id': milestone_id,
+                        'title': f'Step {step + 1}',
+                        'completed': done,
+                        'goal_id': goal_id,
+                        'created_at': created_at,
+                        'completed_at': created_at + timedelta(days=step + 1) if done else None,
+                    })
+                    user['milestone_ids'].append(milestone_id)
+
+                archived = rng.random() < archived_ratio
+                goal_rows.append({
+                    'id': goal_id,
+                    'title': f'Goal {goal_id}',
+                    'description': 'Read twenty pages every evening before bed',
+                    'category': rng.choices(names, category_weights)[0],
+                    'user_id': user_id,
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                    'archived': archived,
+                    'archived_at': created_at + timedelta(days=30) if archived else None,
+                    'milestone_total': total,
+                    'milestone_completed': completed,
+                })
+                user['goal_ids'].append(goal_id)
+
+            created.append(user)
+
+        if user_rows:
+            db.session.execute(db.insert(UserDirectory), [{'id': row['id'], 'username': row['username']} for row in user_rows])
+            db.session.commit()
+
+        count = shard_count()
+        shard_of_goal = {row['id']: row['user_id'] % count for row in goal_rows}
+        for shard in each_shard():
+            for model, rows in (
+                (User, [row for row in user_rows if row['id'] % count == shard]),
+                (Goal, [row for row in goal_rows if row['user_id'] % count == shard]),
+                (Milestone, [row for row in milestone_rows if shard_of_goal[row['goal_id']] == shard]),
+            ):
+                if rows:
+                    db.session.execute(db.insert(model), rows)
+            db.session.commit()
+
+    return created
+
+def add_arguments(parser):
+    """Register the dataset options shared with the load test"""
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--goals', type=parse_range, default=(10, 30), help='goals per user, N or MIN:MAX')
+    parser.add_argument('--milestones', type=parse_range, default=(0, 8), help='milestones per goal, N or MIN:MAX')
+    parser.add_argument('--archived-ratio', type=float, default=0.2)
+    parser.add_argument('--completed-ratio', type=float, default=0.5)
+    parser.add_argument('--categories', type=parse_weights, default=None, help='weights, e.g. Work=3,Health=1')
+    parser.add_argument('--seed', type=int, default=0)
+
+def generate_from_args(app, args):
+    return generate(
+        app, users=args.users, goals=args.goals, milestones=args.milestones,
+        archived_ratio=args.archived_ratio, completed_ratio=args.completed_ratio,
+        categories=args.categories, seed=args.seed
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='SQLite file to fill')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{args.database}'})
+    users = generate_from_args(app, args)
+    print(json.dumps({
+        'users': len(users),
+        'goals': sum(len(user['goal_ids']) for user in users),
+        'milestones': sum(len(user['milestone_ids']) for user in users),
+        'password': PASSWORD,
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
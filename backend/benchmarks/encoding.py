@@ -0,0 +1,119 @@
+"""Compare JSON encode time and bytes on the wire for goal list payloads.
+
+"before" is Flask's default provider (stdlib json, identity encoding);
+"after" is FocusFlowJSONProvider (orjson when installed) plus gzip/deflate at
+the app's default COMPRESS_LEVEL. Prints one JSON document with the results.
+
+    python -m benchmarks.encoding --goals 500 --milestones 10
+"""
+from datetime import datetime, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import argparse
+import json
+import timeit
+import zlib
+
+from app import FocusFlowJSONProvider, format_datetime, orjson
+
+COMPRESS_LEVEL = 6
+
+def build_rows(goals, milestones):
+    """Synthetic goal rows shaped like the read path's output, with raw datetimes"""
+    start = datetime(2025, 1, 1)
+    rows = []
+    for goal_id in range(1, goals + 1):
+        created = start + timedelta(minutes=goal_id)
+        rows.append({
+            'id': goal_id,
+            'title': f'Goal {goal_id}',
+            'description': 'Read twenty pages every evening before bed',
+            'category': ('Work', 'Health', 'Learning', 'Personal')[goal_id % 4],
+            'user_id': 1,
+            'created_at': created,
+            'updated_at': created,
+            'archived': False,
+            'archived_at': None,
+            'milestone_total': milestones,
+            'milestone_completed': milestones // 2,
+            'milestones': [
+                {
+                    'id': goal_id * milestones + index,
+                    'title': f'Milestone {index}',
+                    'completed': index < milestones // 2,
+                    'goal_id': goal_id,
+                    'created_at': created,
+                    'completed_at': created + timedelta(days=1) if index < milestones // 2 else None
+                }
+                for index in range(milestones)
+            ]
+        })
+    return rows
+
+def format_rows(rows, formatter):
+    """Replace datetimes with strings the way the serializers do"""
+    def convert(value):
+        return formatter(value) if isinstance(value, datetime) else value
+
+    return [
+        {
+            **{key: convert(value) for key, value in row.items() if key != 'milestones'},
+            'milestones': [{key: convert(value) for key, value in m.items()} for m in row['milestones']]
+        }
+        for row in rows
+    ]
+
+def measure(func, repeat):
+    """Best per-call time in milliseconds"""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--goals', type=int, default=500)
+    parser.add_argument('--milestones', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    before = DefaultJSONProvider(app)
+    after = FocusFlowJSONProvider(app)
+    rows = build_rows(args.goals, args.milestones)
+
+    format_datetime.cache_clear()
+    format_rows(rows, format_datetime)  # warm the cache as a long-running worker would
+
+    payload = format_rows(rows, datetime.isoformat)
+    before_body = before.dumps(payload, separators=(',', ':')).encode()
+    after_body = after.dumps_bytes(payload)
+    assert json.loads(before_body) == json.loads(after_body)
+
+    results = {
+        'goals': args.goals,
+        'milestones_per_goal': args.milestones,
+        'encoder': 'orjson' if orjson is not None else 'stdlib',
+        'format_ms': {
+            'isoformat': measure(lambda: format_rows(rows, datetime.isoformat), args.repeat),
+            'cached': measure(lambda: format_rows(rows, format_datetime), args.repeat)
+        },
+        'encode_ms': {
+            'before': measure(lambda: before.dumps(payload, separators=(',', ':')), args.repeat),
+            'after': measure(lambda: after.dumps_bytes(payload), args.repeat)
+        },
+        'bytes': {
+            'before': len(before_body),
+            'after': len(after_body)
+        }
+    }
+
+    for encoding, wbits in (('gzip', 16 + zlib.MAX_WBITS), ('deflate', zlib.MAX_WBITS)):
+        def compress():
+            compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, wbits)
+            return compressor.compress(after_body) + compressor.flush()
+
+        results['bytes'][encoding] = len(compress())
+        results['encode_ms'][f'after+{encoding}'] = results['encode_ms']['after'] + measure(compress, args.repeat)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
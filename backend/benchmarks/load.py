@@ -0,0 +1,354 @@
+"""Replay the frontend's call patterns against the API and report per-endpoint results.
+
+Fills a fresh SQLite database with benchmarks.dataset, then runs concurrent
+virtual users for a fixed time. Each user logs in and repeatedly picks a
+scenario from a weighted mix:
+
+- login: POST /auth/login
+- list: the goal list page (categories, then /goals/)
+- dashboard: categories, then /goals/?include_archived=true
+- toggle_milestone: PUT a milestone, then refresh /goals/
+- archive: archive a goal and refresh, then open the archive and unarchive it
+
+The same workload runs against the Flask test client, a real WSGI server
+(werkzeug, threaded, HTTP/1.1 keep-alive, in this process) or both. Every
+run gets its own identically seeded database, split over --shards SQLite
+files when more than one is asked for. Results hold throughput plus
+p50/p95/p99 latency and SQL statements per request for each endpoint, and
+are written as JSON so they can be compared between commits. Requests shed
+by admission control (429 or 503) are counted as rejected, not as errors,
+and a user whose login was shed keeps trying to log in before going on.
+
+    python -m benchmarks.load --transport both --users 20 --concurrency 8 --seconds 10 --output load.json
+"""
+from collections import defaultdict
+from datetime import datetime
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from threading import Lock, Thread
+from werkzeug.serving import WSGIRequestHandler, make_server
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from app import create_app, db
+from benchmarks.concurrency import percentile
+from benchmarks.dataset import add_arguments, generate_from_args
+
+QUERY_HEADER = 'X-Benchmark-Queries'
+ENDPOINT_HEADER = 'X-Benchmark-Endpoint'
+
+DEFAULT_MIX = {'login': 1, 'list': 5, 'dashboard': 2, 'toggle_milestone': 4, 'archive': 1}
+
+def _count_query(*args):
+    if has_request_context():
+        g.benchmark_queries = g.get('benchmark_queries', 0) + 1
+
+def _label_response(response):
+    response.headers[QUERY_HEADER] = str(g.get('benchmark_queries', 0))
+    if request.url_rule is not None:
+        response.headers[ENDPOINT_HEADER] = f'{request.method} {request.url_rule.rule}'
+    return response
+
+def instrument(app):
+    """Report each request's SQL statement count and route in response headers"""
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _count_query)
+    app.after_request(_label_response)
+
+class ClientTransport:
+    """Sends requests through the Flask test client"""
+
+    name = 'client'
+
+    def __init__(self, app):
+        self.app = app
+
+    def connect(self):
+        return ClientConnection(self.app.test_client())
+
+    def close(self):
+        pass
+
+class ClientConnection:
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method, path, body, headers):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.headers, response.get_data()
+
+    def close(self):
+        pass
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+class ServerTransport:
+    """Serves the app with werkzeug's threaded server on a free local port"""
+
+    name = 'server'
+
+    def __init__(self, app):
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        return HTTPConnection('127.0.0.1', self.server.server_port)
+
+    def close(self):
+        self.server.shutdown()
+        self.thread.join()
+
+class HTTPConnection:
+    """One keep-alive HTTP connection per virtual user"""
+
+    def __init__(self, host, port):
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+
+    def request(self, method, path, body, headers):
+        headers = dict(headers)
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, body=data, headers=headers)
+        response = self.connection.getresponse()
+        return response.status, response.headers, response.read()
+
+    def close(self):
+        self.connection.close()
+
+class Recorder:
+    """Collects latencies, errors and query counts per endpoint across threads"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.scenarios = defaultdict(int)
+
+    def record(self, endpoint, elapsed, status, queries):
+        with self.lock:
+            if status < 400:
+                self.latencies[endpoint].append(elapsed)
+            elif status in (429, 503):
+                self.rejected[endpoint] += 1
+            else:
+                self.errors[endpoint] += 1
+            if queries is not None:
+                self.queries[endpoint].append(queries)
+
+    def scenario(self, name):
+        with self.lock:
+            self.scenarios[name] += 1
+
+    def summary(self, seconds):
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors) | set(self.rejected)):
+            latencies, queries = self.latencies[endpoint], self.queries[endpoint]
+            endpoints[endpoint] = {
+                'requests': len(latencies) + self.errors[endpoint] + self.rejected[endpoint],
+                'errors': self.errors[endpoint],
+                'rejected': self.rejected[endpoint],
+                'per_second': len(latencies) / seconds,
+                'p50_ms': percentile(latencies, 0.50),
+                'p95_ms': percentile(latencies, 0.95),
+                'p99_ms': percentile(latencies, 0.99),
+                'max_ms': max(latencies) * 1000 if latencies else None,
+                'queries_mean': sum(queries) / len(queries) if queries else None,
+                'queries_max': max(queries) if queries else None,
+            }
+
+        requests = sum(endpoint['requests'] for endpoint in endpoints.values())
+        errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+        rejected = sum(endpoint['rejected'] for endpoint in endpoints.values())
+        return {
+            'requests': requests,
+            'errors': errors,
+            'rejected': rejected,
+            'per_second': (requests - errors - rejected) / seconds,
+            'scenarios': dict(self.scenarios),
+            'endpoints': endpoints,
+        }
+
+class VirtualUser:
+    """One simulated frontend session for a generated user"""
+
+    def __init__(self, connection, user, rng, recorder):
+        self.connection = connection
+        self.user = user
+        self.rng = rng
+        self.recorder = recorder
+        self.token = None
+        self.completed = {}
+
+    def call(self, method, path, body=None):
+        headers = {'Authorization': f'Bearer {self.token}'} if self.token else {}
+        started = time.perf_counter()
+        status, headers, data = self.connection.request(method, path, body, headers)
+        elapsed = time.perf_counter() - started
+
+        queries = headers.get(QUERY_HEADER)
+        self.recorder.record(
+            headers.get(ENDPOINT_HEADER, f'{method} {path}'),
+            elapsed,
+            status,
+            int(queries) if queries is not None else None
+        )
+        return status, data
+
+    def login(self):
+        status, data = self.call('POST', '/auth/login', {
+            'username': self.user['username'],
+            'password': self.user['password'],
+        })
+        if status == 200:
+            self.token = json.loads(data)['token']
+
+    def list(self):
+        self.call('GET', '/goals/categories')
+        self.call('GET', '/goals/')
+
+    def dashboard(self):
+        self.call('GET', '/goals/categories')
+        self.call('GET', '/goals/?include_archived=true')
+
+    def toggle_milestone(self):
+        if not self.user['milestone_ids']:
+            return self.list()
+        milestone_id = self.rng.choice(self.user['milestone_ids'])
+        completed = not self.completed.get(milestone_id, self.rng.random() < 0.5)
+        self.completed[milestone_id] = completed
+        self.call('PUT', f'/goals/milestones/{milestone_id}', {'completed': completed})
+        self.call('GET', '/goals/')
+
+    def archive(self):
+        if not self.user['goal_ids']:
+            return self.list()
+        goal_id = self.rng.choice(self.user['goal_ids'])
+        self.call('POST', f'/goals/{goal_id}/archive')
+        self.call('GET', '/goals/')
+        self.call('GET', '/goals/archived')
+        self.call('POST', f'/goals/{goal_id}/unarchive')
+        self.call('GET', '/goals/archived')
+
+def parse_mix(value):
+    """Parse "list=5,toggle_milestone=4" into scenario weights"""
+    mix = {}
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'unknown scenario: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+def virtual_user(transport, user, seed, mix, deadline, recorder):
+    """Thread body: log in, then run weighted scenarios until the deadline"""
+    rng = random.Random(seed)
+    connection = transport.connect()
+    session = VirtualUser(connection, user, rng, recorder)
+    names, weights = list(mix), list(mix.values())
+
+    try:
+        session.login()
+        while time.time() < deadline:
+            if session.token is None:
+                session.login()
+                if session.token is None:
+                    continue
+            name = rng.choices(names, weights)[0]
+            recorder.scenario(name)
+            getattr(session, name)()
+    finally:
+        connection.close()
+
+def make_app(database, args):
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'RESPONSE_CACHE': args.cache,
+    }
+    if args.password_method:
+        config['PASSWORD_HASH_METHOD'] = args.password_method
+    if args.shards > 1:
+        config['SHARD_URLS'] = [f'sqlite:///{database}.shard{shard}' for shard in range(1, args.shards)]
+    app = create_app(config)
+    instrument(app)
+    return app
+
+def run(transport_class, args):
+    """Generate a dataset, then run the workload over one transport"""
+    database = os.path.join(tempfile.mkdtemp(prefix='focusflow-load-'), 'load.db')
+    app = make_app(database, args)
+    users = generate_from_args(app, args)
+    transport = transport_class(app)
+    recorder = Recorder()
+
+    started = time.time()
+    deadline = started + args.seconds
+    threads = [
+        Thread(target=virtual_user, args=(
+            transport, users[index % len(users)], args.seed + index, args.mix, deadline, recorder
+        ))
+        for index in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+    transport.close()
+
+    return {'transport': transport.name, 'seconds': elapsed, **recorder.summary(elapsed)}
+
+def current_commit():
+    """Return the checked-out git commit, if any, so results can be compared"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--transport', choices=('client', 'server', 'both'), default='both')
+    parser.add_argument('--concurrency', type=int, default=4, help='simultaneous virtual users')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX), help='weights, e.g. list=5,archive=1')
+    parser.add_argument('--cache', choices=('memory', 'sqlite', 'none'), default='memory', help='RESPONSE_CACHE backend')
+    parser.add_argument('--shards', type=int, default=1, help='SQLite databases to spread users over (SHARD_URLS)')
+    parser.add_argument('--password-method', help='PASSWORD_HASH_METHOD; defaults to the app default')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    transports = {'client': [ClientTransport], 'server': [ServerTransport], 'both': [ClientTransport, ServerTransport]}
+    results = {
+        'commit': current_commit(),
+        'started_at': datetime.utcnow().isoformat(),
+        'python': sys.version.split()[0],
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'runs': [run(transport_class, args) for transport_class in transports[args.transport]],
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
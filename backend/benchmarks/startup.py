@@ -0,0 +1,81 @@
+"""Measure how long a fresh interpreter takes to import and build the app.
+
+Each run starts a new Python process that imports the app package and calls
+create_app against a database already at the latest migration, once per
+DB_STARTUP mode. Prints the timings as JSON and exits with status 1 if the
+median startup of the checked mode exceeds --target-ms, so it can gate CI or
+a deploy.
+
+    python -m benchmarks.startup --runs 5 --target-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from app import create_app, db
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (created - imported) * 1000}))
+'''
+
+def prepare_database():
+    """Create a database with every table and stamp it at the migrations head"""
+    from flask_migrate import Migrate, stamp
+
+    database = os.path.join(tempfile.mkdtemp(prefix='focusflow-startup-'), 'startup.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+    Migrate(app, db, directory=app.config['MIGRATIONS_DIR'])
+    with app.app_context():
+        stamp(directory=app.config['MIGRATIONS_DIR'])
+    return database
+
+def measure(database, mode, runs):
+    """Start the app in runs fresh processes and summarise the timings"""
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', DB_STARTUP=mode)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD], cwd=BACKEND_DIR, env=env,
+            check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.splitlines()[-1]))
+
+    totals = [sample['import_ms'] + sample['create_app_ms'] for sample in samples]
+    return {
+        'mode': mode,
+        'runs': runs,
+        'import_ms': statistics.median(sample['import_ms'] for sample in samples),
+        'create_app_ms': statistics.median(sample['create_app_ms'] for sample in samples),
+        'median_ms': statistics.median(totals),
+        'max_ms': max(totals),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=1000)
+    parser.add_argument('--mode', default='check', help='DB_STARTUP mode the target applies to')
+    args = parser.parse_args()
+
+    database = prepare_database()
+    results = [measure(database, mode, args.runs) for mode in ('create_all', 'check', 'skip')]
+    checked = next(result for result in results if result['mode'] == args.mode)
+    passed = checked['median_ms'] <= args.target_ms
+
+    print(json.dumps({'target_ms': args.target_ms, 'passed': passed, 'results': results}, indent=2))
+    sys.exit(0 if passed else 1)
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ from logging.config import fileConfig
 from flask import current_app
 
 from alembic import context
+from sqlalchemy import inspect
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -45,6 +46,16 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+def get_shard_engines():
+    """Return (shard, engine) for the primary database (shard 0) and every shard"""
+    from app.engine import shard_binds
+
+    engines = [(0, get_engine())]
+    for shard, bind_key in enumerate(shard_binds(current_app.config), 1):
+        engines.append((shard, target_db.engines[bind_key]))
+    return engines
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -94,17 +105,38 @@ def run_migrations_online():
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
-    connectable = get_engine()
-
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=get_metadata(),
-            **conf_args
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+    # Every shard holds the same schema and its own alembic_version, so the
+    # same scripts run against each one in turn. Scripts can read the shard
+    # from config.attributes['shard'] to skip primary-only tables. The
+    # migrations do not start from an empty database, so a new, empty shard
+    # gets the current schema and is stamped at head instead.
+    # Autogenerate only compares the primary database.
+    engines = get_shard_engines()
+    if getattr(config.cmd_opts, 'autogenerate', False):
+        engines = engines[:1]
+
+    for shard, connectable in engines:
+        if len(engines) > 1:
+            logger.info('Migrating shard %d (%s)', shard, connectable.url)
+        config.attributes['shard'] = shard
+
+        with connectable.connect() as connection:
+            context.configure(
+                connection=connection,
+                target_metadata=get_metadata(),
+                **conf_args
+            )
+
+            if shard and not inspect(connection).has_table('user'):
+                from app.shards import sharded_tables
+                logger.info('Creating the schema of new shard %d', shard)
+                target_db.metadata.create_all(connection, tables=sharded_tables())
+                context.get_context().stamp(context.script, 'heads')
+                connection.commit()
+                continue
+
+            with context.begin_transaction():
+                context.run_migrations()
 
 
 if context.is_offline_mode():
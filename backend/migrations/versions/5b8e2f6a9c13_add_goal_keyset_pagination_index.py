@@ -0,0 +1,26 @@
+"""Add goal keyset pagination index
+
+Revision ID: 5b8e2f6a9c13
+Revises: a3f1c9d2b7e4
+Create Date: 2026-10-18 10:03:17.540921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2f6a9c13'
+down_revision = 'a3f1c9d2b7e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.create_index('ix_goal_user_id_created_at', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.drop_index('ix_goal_user_id_created_at')
@@ -0,0 +1,42 @@
+"""Add milestone counters to Goal model
+
+Revision ID: 7f3c5a1e2b94
+Revises: e9a2b4c6d8f1
+Create Date: 2026-10-18 13:58:26.664180
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3c5a1e2b94'
+down_revision = 'e9a2b4c6d8f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('milestone_total', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('milestone_completed', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill the counters from the existing milestones
+    goal = sa.table('goal', sa.column('id'), sa.column('milestone_total'), sa.column('milestone_completed'))
+    milestone = sa.table('milestone', sa.column('goal_id'), sa.column('completed'))
+    op.execute(
+        goal.update().values(
+            milestone_total=sa.select(sa.func.count())
+            .where(milestone.c.goal_id == goal.c.id)
+            .scalar_subquery(),
+            milestone_completed=sa.select(sa.func.count())
+            .where(milestone.c.goal_id == goal.c.id, milestone.c.completed == sa.true())
+            .scalar_subquery()
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.drop_column('milestone_completed')
+        batch_op.drop_column('milestone_total')
@@ -0,0 +1,32 @@
+"""Add goal and milestone lookup indexes
+
+Revision ID: a3f1c9d2b7e4
+Revises: 17679866ef6b
+Create Date: 2026-10-18 09:12:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9d2b7e4'
+down_revision = '17679866ef6b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.create_index('ix_goal_user_id_archived_category', ['user_id', 'archived', 'category'], unique=False)
+
+    with op.batch_alter_table('milestone', schema=None) as batch_op:
+        batch_op.create_index('ix_milestone_goal_id_completed', ['goal_id', 'completed'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('milestone', schema=None) as batch_op:
+        batch_op.drop_index('ix_milestone_goal_id_completed')
+
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.drop_index('ix_goal_user_id_archived_category')
@@ -0,0 +1,42 @@
+"""Add user directory for shards
+
+Revision ID: a7c9e2f4b6d1
+Revises: f1c3b5d7e9a2
+Create Date: 2026-10-18 19:12:37.305118
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c9e2f4b6d1'
+down_revision = 'f1c3b5d7e9a2'
+branch_labels = None
+depends_on = None
+
+
+def _on_shard():
+    # The directory only lives on the primary database (shard 0)
+    return context.config.attributes.get('shard', 0) != 0
+
+
+def upgrade():
+    if _on_shard():
+        return
+
+    op.create_table('user_directory',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username')
+    )
+    # Every existing user is on the primary database
+    op.execute('INSERT INTO user_directory (id, username) SELECT id, username FROM "user"')
+
+
+def downgrade():
+    if _on_shard():
+        return
+
+    op.drop_table('user_directory')
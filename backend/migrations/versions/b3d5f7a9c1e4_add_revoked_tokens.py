@@ -0,0 +1,45 @@
+"""Add revoked tokens
+
+Revision ID: b3d5f7a9c1e4
+Revises: c8e4a1d6f3b9
+Create Date: 2026-10-18 21:04:12.581930
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d5f7a9c1e4'
+down_revision = 'c8e4a1d6f3b9'
+branch_labels = None
+depends_on = None
+
+
+def _on_shard():
+    # Revocations only live on the primary database (shard 0)
+    return context.config.attributes.get('shard', 0) != 0
+
+
+def upgrade():
+    if _on_shard():
+        return
+
+    op.create_table('revoked_token',
+        sa.Column('jti', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('jti')
+    )
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_revoked_token_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    if _on_shard():
+        return
+
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_revoked_token_expires_at'))
+
+    op.drop_table('revoked_token')
@@ -0,0 +1,91 @@
+"""Add goal full-text search index
+
+Revision ID: b6e1d9f3c2a8
+Revises: 7f3c5a1e2b94
+Create Date: 2026-10-18 15:12:40.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1d9f3c2a8'
+down_revision = '7f3c5a1e2b94'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = (
+    'goal_search_goal_insert',
+    'goal_search_goal_update',
+    'goal_search_goal_delete',
+    'goal_search_milestone_insert',
+    'goal_search_milestone_update',
+    'goal_search_milestone_delete',
+)
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases search with LIKE instead
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS goal_search USING fts5("
+        "owner, title, description, milestones, "
+        "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS goal_search_goal_insert AFTER INSERT ON goal BEGIN "
+        "INSERT INTO goal_search (rowid, owner, title, description, milestones) "
+        "VALUES (new.id, 'u' || new.user_id, new.title, coalesce(new.description, ''), ''); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS goal_search_goal_update AFTER UPDATE OF user_id, title, description ON goal BEGIN "
+        "UPDATE goal_search SET owner = 'u' || new.user_id, title = new.title, "
+        "description = coalesce(new.description, '') WHERE rowid = new.id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS goal_search_goal_delete AFTER DELETE ON goal BEGIN "
+        "DELETE FROM goal_search WHERE rowid = old.id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS goal_search_milestone_insert AFTER INSERT ON milestone BEGIN "
+        "UPDATE goal_search SET milestones = milestones || ' ' || new.title WHERE rowid = new.goal_id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS goal_search_milestone_update AFTER UPDATE OF title, goal_id ON milestone BEGIN "
+        "UPDATE goal_search SET milestones = coalesce("
+        "(SELECT group_concat(title, ' ') FROM milestone WHERE goal_id = goal_search.rowid), '') "
+        "WHERE rowid IN (old.goal_id, new.goal_id); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS goal_search_milestone_delete AFTER DELETE ON milestone BEGIN "
+        "UPDATE goal_search SET milestones = coalesce("
+        "(SELECT group_concat(title, ' ') FROM milestone WHERE goal_id = old.goal_id), '') "
+        "WHERE rowid = old.goal_id; "
+        "END"
+    )
+
+    # Index the existing goals. The table and triggers may already exist when
+    # db.create_all() made them, so only goals missing from the index are added.
+    op.execute(
+        "INSERT INTO goal_search (rowid, owner, title, description, milestones) "
+        "SELECT goal.id, 'u' || goal.user_id, goal.title, coalesce(goal.description, ''), "
+        "coalesce((SELECT group_concat(milestone.title, ' ') FROM milestone WHERE milestone.goal_id = goal.id), '') "
+        "FROM goal WHERE goal.id NOT IN (SELECT rowid FROM goal_search)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for trigger in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS goal_search')
@@ -0,0 +1,54 @@
+"""Make goal archived not null
+
+Revision ID: c6f2a8d4e1b3
+Revises: b3d5f7a9c1e4
+Create Date: 2026-10-18 22:31:05.742316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f2a8d4e1b3'
+down_revision = 'b3d5f7a9c1e4'
+branch_labels = None
+depends_on = None
+
+
+def _alter_archived(**kw):
+    # SQLite rebuilds goal to change the column. Rebuilding drops its search
+    # triggers and resets its AUTOINCREMENT counter to the highest remaining
+    # id, which would hand a cold goal's id to a new goal, so save and
+    # restore both.
+    bind = op.get_bind()
+    sqlite = bind.dialect.name == 'sqlite'
+    if sqlite:
+        triggers = bind.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'goal'"
+        ).scalars().all()
+        sequence = bind.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = 'goal'").scalar()
+
+    with op.batch_alter_table('goal', schema=None, table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.alter_column('archived', existing_type=sa.Boolean(), **kw)
+
+    if sqlite:
+        for trigger in triggers:
+            op.execute(trigger)
+        if sequence is not None:
+            bind.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'goal'")
+            bind.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('goal', ?)", (sequence,))
+
+
+def upgrade():
+    # Goals from before archiving existed may have NULL, which meant active.
+    # Without NULLs, the active-goal filter is a plain equality that can use
+    # ix_goal_user_id_archived_category.
+    goal = sa.table('goal', sa.column('archived'))
+    op.execute(goal.update().where(goal.c.archived.is_(None)).values(archived=False))
+
+    _alter_archived(nullable=False, server_default='0')
+
+
+def downgrade():
+    _alter_archived(existing_nullable=False, nullable=True, server_default=None)
@@ -0,0 +1,34 @@
+"""Add daily stat rollup
+
+Revision ID: c8e4a1d6f3b9
+Revises: a7c9e2f4b6d1
+Create Date: 2026-10-18 20:03:41.758204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e4a1d6f3b9'
+down_revision = 'a7c9e2f4b6d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask rebuild-stats`, which also counts cold-stored goals
+    op.create_table('daily_stat',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('milestones_added', sa.Integer(), nullable=False),
+        sa.Column('milestones_completed', sa.Integer(), nullable=False),
+        sa.Column('goals_archived', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'category')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_stat')
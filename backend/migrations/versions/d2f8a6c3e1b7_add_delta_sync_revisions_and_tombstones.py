@@ -0,0 +1,57 @@
+"""Add delta sync revisions and tombstones
+
+Revision ID: d2f8a6c3e1b7
+Revises: b6e1d9f3c2a8
+Create Date: 2026-10-18 16:04:52.917303
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f8a6c3e1b7'
+down_revision = 'b6e1d9f3c2a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing goals keep revision 0 and are only returned by a full sync
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sync_revision', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('sync_floor', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_goal_user_id_revision', ['user_id', 'revision'], unique=False)
+
+    op.create_table('tombstone',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.create_index('ix_tombstone_user_id_revision', ['user_id', 'revision'], unique=False)
+        batch_op.create_index('ix_tombstone_deleted_at', ['deleted_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.drop_index('ix_tombstone_deleted_at')
+        batch_op.drop_index('ix_tombstone_user_id_revision')
+
+    op.drop_table('tombstone')
+
+    # Not batch mode: recreating goal on SQLite would drop the search triggers
+    op.drop_index('ix_goal_user_id_revision', table_name='goal')
+    op.drop_column('goal', 'revision')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('sync_floor')
+        batch_op.drop_column('sync_revision')
@@ -0,0 +1,26 @@
+"""Add goal updated_at index for ETag aggregates
+
+Revision ID: e9a2b4c6d8f1
+Revises: c4d7e1a8f250
+Create Date: 2026-10-18 12:41:52.306127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9a2b4c6d8f1'
+down_revision = 'c4d7e1a8f250'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.create_index('ix_goal_user_id_updated_at', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('goal', schema=None) as batch_op:
+        batch_op.drop_index('ix_goal_user_id_updated_at')
@@ -0,0 +1,105 @@
+"""Add cold storage for archived goals
+
+Revision ID: f1c3b5d7e9a2
+Revises: d2f8a6c3e1b7
+Create Date: 2026-10-18 17:21:06.482915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+import json
+import zlib
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c3b5d7e9a2'
+down_revision = 'd2f8a6c3e1b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cold_goal',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.Column('frozen_at', sa.DateTime(), nullable=True),
+        sa.Column('document', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cold_goal', schema=None) as batch_op:
+        batch_op.create_index('ix_cold_goal_user_id_created_at', ['user_id', 'created_at', 'id'], unique=False)
+
+    # SQLite reuses the highest rowid once it is deleted, which would hand a
+    # cold goal's (or its milestones') id to a new row. AUTOINCREMENT needs the
+    # tables rebuilt, and rebuilding drops their search triggers, so save and
+    # recreate those.
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+
+    triggers = bind.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('goal', 'milestone')"
+    ).scalars().all()
+
+    for table in ('goal', 'milestone'):
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+            pass
+
+    for trigger in triggers:
+        op.execute(trigger)
+
+
+def downgrade():
+    # Move cold goals back into the goal and milestone tables before dropping
+    # cold storage. The tables keep AUTOINCREMENT, which is harmless.
+    bind = op.get_bind()
+    goal = sa.table(
+        'goal', sa.column('id'), sa.column('title'), sa.column('description'), sa.column('category'),
+        sa.column('user_id'), sa.column('created_at'), sa.column('updated_at'), sa.column('archived'),
+        sa.column('archived_at'), sa.column('milestone_total'), sa.column('milestone_completed')
+    )
+    milestone = sa.table(
+        'milestone', sa.column('id'), sa.column('title'), sa.column('completed'), sa.column('goal_id'),
+        sa.column('created_at'), sa.column('completed_at')
+    )
+
+    def timestamp(value):
+        return datetime.fromisoformat(value) if value else None
+
+    for (document,) in bind.execute(sa.text('SELECT document FROM cold_goal')).all():
+        data = json.loads(zlib.decompress(document))
+        bind.execute(goal.insert().values(
+            id=data['id'],
+            title=data['title'],
+            description=data['description'],
+            category=data['category'],
+            user_id=data['user_id'],
+            created_at=timestamp(data['created_at']),
+            updated_at=timestamp(data['updated_at']),
+            archived=data['archived'],
+            archived_at=timestamp(data['archived_at']),
+            milestone_total=data['milestone_total'],
+            milestone_completed=data['milestone_completed']
+        ))
+        if data['milestones']:
+            bind.execute(milestone.insert(), [
+                {
+                    'id': item['id'],
+                    'title': item['title'],
+                    'completed': item['completed'],
+                    'goal_id': item['goal_id'],
+                    'created_at': timestamp(item['created_at']),
+                    'completed_at': timestamp(item['completed_at'])
+                }
+                for item in data['milestones']
+            ])
+
+    with op.batch_alter_table('cold_goal', schema=None) as batch_op:
+        batch_op.drop_index('ix_cold_goal_user_id_created_at')
+
+    op.drop_table('cold_goal')
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    """Config overrides for the app fixture; override this fixture to change them"""
+    return {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "focusflow.db"}',
+        'TESTING': True,
+        'RESPONSE_CACHE': 'none',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'RATE_LIMIT_PER_SECOND': 0,
+        'QUERY_CHECKS': 'raise',
+    }
+
+
+@pytest.fixture
+def app(app_config):
+    app = create_app(app_config)
+    yield app
+    with app.app_context():
+        for engine in app.extensions['sqlalchemy'].engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, username='alice', password='secret'):
+    """Register and log in a user, returning the Authorization header for them"""
+    client.post('/auth/register', json={'username': username, 'password': password})
+    token = client.post('/auth/login', json={'username': username, 'password': password}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return register(client)
+
+
+@pytest.fixture
+def executed(app):
+    """List of (statement, parameters) for every statement run on the primary engine"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,84 @@
+import pytest
+import time
+from threading import Thread
+from app.admission import ConcurrencyLimit, parse_limits
+
+
+@pytest.fixture
+def app_config(request, app_config):
+    """The shared config, updated with the test's indirect parameter if it has one"""
+    return {**app_config, **getattr(request, 'param', {})}
+
+
+def queue(limit, count, admitted):
+    """Start count threads that wait for a slot one after another, recording the order they get it"""
+    def wait(index):
+        if limit.acquire(5) is None:
+            admitted.append(index)
+            limit.release(0)
+
+    threads = []
+    for index in range(count):
+        threads.append(Thread(target=wait, args=(index,)))
+        threads[-1].start()
+        while limit.waiting <= index:
+            time.sleep(0.001)
+    return threads
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    limit = ConcurrencyLimit(1, queue_limit=10)
+    assert limit.acquire(1) is None
+    admitted = []
+    threads = queue(limit, 8, admitted)
+
+    limit.release(0)
+    for thread in threads:
+        thread.join()
+
+    assert admitted == list(range(8))
+    assert (limit.active, limit.waiting) == (0, 0)
+
+
+def test_a_waiter_that_times_out_leaves_the_queue():
+    limit = ConcurrencyLimit(1, queue_limit=10)
+    assert limit.acquire(1) is None
+
+    assert limit.acquire(0.01) is not None
+    assert limit.waiting == 0
+
+    limit.release(0)
+    assert limit.active == 0
+
+
+@pytest.mark.parametrize('app_config', [{'RATE_LIMIT_PER_SECOND': 0.5, 'RATE_LIMIT_BURST': 2}], indirect=True)
+def test_users_over_their_rate_limit_get_429(client, auth_headers):
+    assert [client.get('/goals/', headers=auth_headers).status_code for _ in range(2)] == [200, 200]
+
+    response = client.get('/goals/', headers=auth_headers)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) == 2
+
+
+def test_requests_queued_too_long_upstream_get_503(client, auth_headers):
+    response = client.get('/goals/', headers={**auth_headers, 'X-Request-Start': f't={time.time() - 10:.3f}'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+@pytest.mark.parametrize('app_config', [{'ADMISSION_LIMITS': parse_limits('heavy=1'), 'ADMISSION_QUEUE_TIMEOUT_MS': 50}], indirect=True)
+def test_heavy_requests_are_capped_without_blocking_reads(client, auth_headers):
+    client.post('/goals/bulk', json={'operations': [{'op': 'create', 'title': f'Goal {index}'} for index in range(3)]}, headers=auth_headers)
+
+    # A streamed export holds its slot until its body is closed
+    export = client.get('/goals/export', headers=auth_headers, buffered=False)
+    assert export.status_code == 200
+
+    refused = client.get('/goals/export', headers=auth_headers)
+    assert refused.status_code == 503
+    assert int(refused.headers['Retry-After']) >= 1
+    assert client.get('/goals/', headers=auth_headers).status_code == 200
+
+    export.close()
+    assert client.get('/goals/export', headers=auth_headers).status_code == 200
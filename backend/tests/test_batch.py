@@ -0,0 +1,34 @@
+import pytest
+from flask import request, request_started
+
+
+@pytest.mark.parametrize('path', ['/metrics', '/batch', '/goals/../metrics', '/static/app.js'])
+def test_paths_outside_the_api_are_refused(client, auth_headers, path):
+    response = client.post('/batch', json={'requests': [{'path': path}, {'path': '/goals/'}]}, headers=auth_headers)
+
+    assert response.status_code == 200
+    refused, listed = response.get_json()['responses']
+    assert refused['status'] == 400
+    assert listed['status'] == 200
+
+
+def test_batched_metrics_do_not_bypass_the_local_only_gate(client, auth_headers):
+    headers = {**auth_headers, 'X-Forwarded-For': '203.0.113.9'}
+    assert client.get('/metrics', headers=headers).status_code == 403
+
+    response = client.post('/batch', json={'requests': [{'path': '/metrics'}]}, headers=headers)
+    assert response.get_json()['responses'][0]['status'] == 400
+
+
+def test_sub_requests_keep_the_forwarded_client_address(app, client, auth_headers):
+    seen = []
+
+    def record(sender, **extra):
+        seen.append(request.headers.get('X-Forwarded-For'))
+
+    with request_started.connected_to(record, app):
+        client.post('/batch', json={'requests': [
+            {'path': '/goals/', 'headers': {'X-Forwarded-For': '198.51.100.1'}}
+        ]}, headers={**auth_headers, 'X-Forwarded-For': '203.0.113.9'})
+
+    assert seen == ['203.0.113.9', '203.0.113.9']
@@ -0,0 +1,61 @@
+import pytest
+
+
+def goal_titles(client, headers):
+    return [goal['title'] for goal in client.get('/goals/?include_archived=true', headers=headers).get_json()]
+
+
+@pytest.mark.parametrize('atomic', ['false', 0, None])
+def test_atomic_must_be_a_boolean(client, auth_headers, atomic):
+    response = client.post('/goals/bulk', json={'operations': [{'op': 'create', 'title': 'Goal'}], 'atomic': atomic}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert goal_titles(client, auth_headers) == []
+
+
+@pytest.mark.parametrize('invalid', [
+    {'op': 'create', 'title': None},
+    {'op': 'create', 'title': ['Goal']},
+    {'op': 'create', 'title': 'Goal', 'category': 3},
+    {'op': 'create', 'title': 'Goal', 'milestones': [{'title': None}]},
+])
+def test_atomic_batch_with_an_invalid_operation_applies_nothing(client, auth_headers, invalid):
+    response = client.post('/goals/bulk', json={'operations': [{'op': 'create', 'title': 'Valid'}, invalid]}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert [result['index'] for result in response.get_json()['results']] == [1]
+    assert goal_titles(client, auth_headers) == []
+
+
+def test_partial_batch_applies_valid_operations_and_reports_the_rest(client, auth_headers):
+    created = client.post('/goals/', json={'title': 'Existing'}, headers=auth_headers).get_json()
+
+    response = client.post('/goals/bulk', json={'atomic': False, 'operations': [
+        {'op': 'create', 'title': 'New'},
+        {'op': 'create', 'title': None},
+        {'op': 'update', 'id': created['id'], 'title': 'Renamed'},
+        {'op': 'update', 'id': created['id'] + 1000, 'title': 'Missing'},
+        {'op': 'rename'},
+    ]}, headers=auth_headers)
+
+    assert response.status_code == 207
+    assert [result['status'] for result in response.get_json()['results']] == [201, 400, 200, 404, 400]
+    assert goal_titles(client, auth_headers) == ['Renamed', 'New']
+
+
+def test_milestone_fields_are_validated_per_operation(client, auth_headers):
+    goal = client.post('/goals/bulk', json={'operations': [
+        {'op': 'create', 'title': 'Goal', 'milestones': [{'title': 'First'}, {'title': 'Second'}]}
+    ]}, headers=auth_headers).get_json()['results'][0]['data']
+    first, second = [milestone['id'] for milestone in goal['milestones']]
+
+    response = client.post('/goals/milestones/bulk', json={'atomic': False, 'operations': [
+        {'op': 'update', 'id': first, 'completed': 'false'},
+        {'op': 'update', 'id': second, 'completed': True},
+        {'op': 'create', 'goal_id': goal['id'], 'title': 7},
+    ]}, headers=auth_headers)
+
+    assert response.status_code == 207
+    assert [result['status'] for result in response.get_json()['results']] == [400, 200, 400]
+    milestones = client.get(f'/goals/{goal["id"]}/milestones', headers=auth_headers).get_json()
+    assert [milestone['completed'] for milestone in milestones] == [False, True]
@@ -0,0 +1,73 @@
+import pytest
+from .conftest import register
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def app_config(request, app_config, tmp_path):
+    return {**app_config, 'RESPONSE_CACHE': request.param, 'RESPONSE_CACHE_PATH': str(tmp_path / 'response_cache.db')}
+
+
+@pytest.fixture
+def cache(app):
+    return app.extensions['focusflow_response_cache']
+
+
+def titles(client, headers, path='/goals/'):
+    return [goal['title'] for goal in client.get(path, headers=headers).get_json()]
+
+
+def test_listing_is_served_from_the_cache_until_a_write(client, auth_headers, cache):
+    client.post('/goals/', json={'title': 'First'}, headers=auth_headers)
+    assert titles(client, auth_headers) == ['First']
+    assert titles(client, auth_headers) == ['First']
+    assert cache.stats()['hits'] == 1
+
+    client.post('/goals/', json={'title': 'Second'}, headers=auth_headers)
+    assert titles(client, auth_headers) == ['First', 'Second']
+
+
+def test_archive_and_unarchive_drop_both_listings(client, auth_headers):
+    goal = client.post('/goals/', json={'title': 'Goal'}, headers=auth_headers).get_json()
+    assert titles(client, auth_headers) == ['Goal']
+    assert titles(client, auth_headers, '/goals/archived') == []
+
+    client.post(f'/goals/{goal["id"]}/archive', headers=auth_headers)
+    assert titles(client, auth_headers) == []
+    assert titles(client, auth_headers, '/goals/archived') == ['Goal']
+
+    client.post(f'/goals/{goal["id"]}/unarchive', headers=auth_headers)
+    assert titles(client, auth_headers) == ['Goal']
+    assert titles(client, auth_headers, '/goals/archived') == []
+
+
+def test_bulk_writes_drop_the_listing(client, auth_headers):
+    created = client.post('/goals/bulk', json={'operations': [
+        {'op': 'create', 'title': 'Goal', 'milestones': [{'title': 'Step'}]}
+    ]}, headers=auth_headers).get_json()['results'][0]['data']
+    assert titles(client, auth_headers) == ['Goal']
+
+    client.post('/goals/bulk', json={'operations': [{'op': 'update', 'id': created['id'], 'title': 'Renamed'}]}, headers=auth_headers)
+    assert titles(client, auth_headers) == ['Renamed']
+
+    # Completing the only milestone auto-archives the goal
+    client.post('/goals/milestones/bulk', json={'operations': [
+        {'op': 'update', 'id': created['milestones'][0]['id'], 'completed': True}
+    ]}, headers=auth_headers)
+    assert titles(client, auth_headers) == []
+
+
+def test_failed_writes_keep_the_cache(client, auth_headers, cache):
+    client.post('/goals/', json={'title': 'Goal'}, headers=auth_headers)
+    titles(client, auth_headers)
+
+    assert client.post('/goals/bulk', json={'operations': [{'op': 'create'}]}, headers=auth_headers).status_code == 400
+    assert titles(client, auth_headers) == ['Goal']
+    assert cache.stats()['hits'] == 1
+
+
+def test_users_do_not_share_entries(client, auth_headers):
+    client.post('/goals/', json={'title': 'Alice goal'}, headers=auth_headers)
+    assert titles(client, auth_headers) == ['Alice goal']
+
+    bob = register(client, 'bob')
+    assert titles(client, bob) == []
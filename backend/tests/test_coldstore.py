@@ -0,0 +1,41 @@
+import json
+import pytest
+
+
+@pytest.fixture
+def frozen_goal(app, client, auth_headers):
+    response = client.post('/goals/bulk', json={'operations': [
+        {'op': 'create', 'title': 'Old goal', 'milestones': [{'title': 'First'}, {'title': 'Second'}]},
+        {'op': 'create', 'title': 'Current goal'}
+    ]}, headers=auth_headers)
+    goal = response.get_json()['results'][0]['data']
+    client.post(f'/goals/{goal["id"]}/archive', headers=auth_headers)
+    archived = client.get(f'/goals/{goal["id"]}', headers=auth_headers).get_json()
+
+    result = app.test_cli_runner().invoke(args=['freeze-archived-goals', '--days', '-1'])
+    assert 'Moved 1 goals' in result.output
+    return archived
+
+
+@pytest.mark.parametrize('path, extract', [
+    ('/goals/{id}', lambda body: body),
+    ('/goals/{id}/milestones', lambda body: body),
+    ('/goals/archived', lambda body: body[0]),
+    ('/goals/?include_archived=true', lambda body: body[0]),
+    ('/goals/changes', lambda body: body['goals'][0]),
+])
+def test_frozen_goal_is_readable_through_every_get_route(client, auth_headers, frozen_goal, path, extract):
+    response = client.get(path.format(id=frozen_goal['id']), headers=auth_headers)
+
+    assert response.status_code == 200
+    found = extract(response.get_json())
+    if path.endswith('/milestones'):
+        assert found == frozen_goal['milestones']
+    else:
+        assert found == frozen_goal
+
+
+def test_frozen_goal_is_exported(client, auth_headers, frozen_goal):
+    lines = client.get('/goals/export', headers=auth_headers).get_data(as_text=True).splitlines()
+
+    assert [goal['title'] for goal in map(json.loads, lines)] == ['Old goal', 'Current goal']
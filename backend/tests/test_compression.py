@@ -0,0 +1,28 @@
+import json
+import pytest
+import zlib
+
+
+@pytest.mark.parametrize('path', ['/goals/?stream=true', '/goals/export'])
+def test_streamed_chunks_decode_on_arrival(client, auth_headers, path):
+    client.post('/goals/bulk', json={'operations': [
+        {'op': 'create', 'title': f'Goal {index}', 'milestones': [{'title': 'Step'}]} for index in range(120)
+    ]}, headers=auth_headers)
+
+    response = client.get(path, headers={**auth_headers, 'Accept-Encoding': 'gzip'}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = b''
+    chunks = list(response.response)
+    for chunk in chunks[:-1]:
+        decoded = decompressor.decompress(chunk)
+        assert decoded, 'a chunk was held back in the compressor'
+        body += decoded
+    body += decompressor.decompress(chunks[-1]) + decompressor.flush()
+
+    assert body == client.get(path, headers=auth_headers).get_data()
+    if path == '/goals/export':
+        assert len([json.loads(line) for line in body.splitlines()]) == 120
+    else:
+        assert len(json.loads(body)) == 120
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from app import db
+from app.models import Goal, Milestone
+
+WRITERS = 8
+MILESTONES_PER_WRITER = 3
+ROUNDS = 5
+
+
+def test_engine_uses_wal(app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+
+
+def test_concurrent_milestone_toggles_lose_no_counter_updates(app, client, auth_headers):
+    response = client.post('/goals/bulk', json={'operations': [{
+        'op': 'create',
+        'title': 'Shared goal',
+        'milestones': [{'title': f'Step {index}'} for index in range(WRITERS * MILESTONES_PER_WRITER)]
+    }]}, headers=auth_headers)
+    goal = response.get_json()['results'][0]['data']
+    milestone_ids = [milestone['id'] for milestone in goal['milestones']]
+
+    def toggle(ids):
+        """Flip each milestone ROUNDS times, ending completed"""
+        worker = app.test_client()
+        return [
+            worker.put(f'/goals/milestones/{milestone_id}', json={'completed': round % 2 == 0}, headers=auth_headers).status_code
+            for round in range(ROUNDS)
+            for milestone_id in ids
+        ]
+
+    def read(_):
+        worker = app.test_client()
+        return [worker.get('/goals/?include_archived=true', headers=auth_headers).status_code for _ in range(ROUNDS)]
+
+    # Every writer hits the same goal row, so its counters see the most contention
+    with ThreadPoolExecutor(max_workers=WRITERS * 2) as pool:
+        writes = pool.map(toggle, [milestone_ids[index::WRITERS] for index in range(WRITERS)])
+        reads = pool.map(read, range(WRITERS))
+        statuses = [status for batch in [*writes, *reads] for status in batch]
+    assert set(statuses) == {200}
+
+    with app.app_context():
+        completed = db.session.scalar(
+            db.select(db.func.count()).where(Milestone.goal_id == goal['id'], Milestone.completed == True)
+        )
+        stored = db.session.get(Goal, goal['id'])
+        assert completed == len(milestone_ids)
+        assert stored.milestone_total == len(milestone_ids)
+        assert stored.milestone_completed == completed
+
+
+def test_concurrent_toggles_of_one_milestone_count_each_flip_once(app, client, auth_headers):
+    response = client.post('/goals/bulk', json={'operations': [{
+        'op': 'create',
+        'title': 'Shared goal',
+        'milestones': [{'title': 'Contested'}, {'title': 'Untouched'}]
+    }]}, headers=auth_headers)
+    goal = response.get_json()['results'][0]['data']
+    milestone_id = goal['milestones'][0]['id']
+
+    def toggle(writer):
+        """Set the milestone ROUNDS * 4 times, half the writers out of phase with the others"""
+        worker = app.test_client()
+        return [
+            worker.put(f'/goals/milestones/{milestone_id}', json={'completed': (round + writer) % 2 == 0}, headers=auth_headers).status_code
+            for round in range(ROUNDS * 4)
+        ]
+
+    # Every writer races for the same milestone row, so most requests see a stale value
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        statuses = [status for batch in pool.map(toggle, range(WRITERS)) for status in batch]
+    assert set(statuses) == {200}
+
+    with app.app_context():
+        milestone = db.session.get(Milestone, milestone_id)
+        stored = db.session.get(Goal, goal['id'])
+        assert stored.milestone_completed == int(milestone.completed)
+        assert (milestone.completed_at is not None) == milestone.completed
+        assert not stored.archived
@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.mark.parametrize('headers, environ, status', [
+    ({}, {}, 200),
+    ({}, {'REMOTE_ADDR': '10.0.0.7'}, 403),
+    ({'X-Forwarded-For': '203.0.113.9'}, {}, 403),
+])
+def test_metrics_without_token_are_local_only(client, headers, environ, status):
+    response = client.get('/metrics', headers=headers, environ_base=environ)
+    assert response.status_code == status
+
+
+@pytest.mark.parametrize('authorization, status', [
+    (None, 401),
+    ('Bearer wrong', 401),
+    ('scrape-secret', 401),
+    ('Bearer scrape-secret', 200),
+])
+def test_metrics_token_is_required_when_set(app, client, authorization, status):
+    app.config['METRICS_TOKEN'] = 'scrape-secret'
+    headers = {'Authorization': authorization} if authorization else {}
+
+    response = client.get('/metrics', headers=headers, environ_base={'REMOTE_ADDR': '10.0.0.7'})
+    assert response.status_code == status
+    if status == 200:
+        assert 'focusflow_' in response.get_data(as_text=True)
@@ -0,0 +1,83 @@
+import pytest
+from app.querylog import max_queries
+from .conftest import register
+
+SIZES = (1, 10, 100)
+
+
+def create_goals(client, headers, count):
+    return client.post('/goals/bulk', json={'operations': [
+        {
+            'op': 'create',
+            'title': f'Goal {index}',
+            'category': ('Work', 'Health')[index % 2],
+            'milestones': [{'title': 'First step'}, {'title': 'Second step'}]
+        }
+        for index in range(count)
+    ]}, headers=headers)
+
+
+def seed(client, headers, count):
+    """Create count goals with two milestones each; returns the goals"""
+    response = create_goals(client, headers, count)
+    assert response.status_code == 200
+    goals = [result['data'] for result in response.get_json()['results']]
+    assert [goal['title'] for goal in goals] == [f'Goal {index}' for index in range(count)]
+    return goals
+
+
+def list_goals(client, headers, goals):
+    return client.get('/goals/?include=milestones', headers=headers)
+
+
+def search_goals(client, headers, goals):
+    return client.get('/goals/search?q=goal&include=milestones', headers=headers)
+
+
+def get_changes(client, headers, goals):
+    return client.get('/goals/changes?since=0', headers=headers)
+
+
+def get_stats(client, headers, goals):
+    return client.get('/goals/stats', headers=headers)
+
+
+def bulk_create(client, headers, goals):
+    return create_goals(client, headers, len(goals))
+
+
+def bulk_goals(client, headers, goals):
+    return client.post('/goals/bulk', json={'operations': [
+        {'op': 'update', 'id': goal['id'], 'title': f"{goal['title']} renamed"} for goal in goals
+    ]}, headers=headers)
+
+
+def bulk_milestones(client, headers, goals):
+    return client.post('/goals/milestones/bulk', json={'operations': [
+        {'op': 'update', 'id': milestone['id'], 'completed': True}
+        for goal in goals for milestone in goal['milestones']
+    ]}, headers=headers)
+
+
+@pytest.mark.parametrize('call, limit', [
+    (list_goals, 3),
+    (search_goals, 3),
+    (get_changes, 4),
+    (get_stats, 1),
+    (bulk_create, 7),
+    (bulk_goals, 5),
+    (bulk_milestones, 9),
+], ids=lambda value: getattr(value, '__name__', None))
+def test_query_count_does_not_grow_with_goals(client, call, limit):
+    counts = []
+    for size in SIZES:
+        headers = register(client, f'user{size}')
+        goals = seed(client, headers, size)
+        assert len(goals) == size
+
+        with max_queries(limit) as log:
+            response = call(client, headers, goals)
+        assert response.status_code == 200, response.get_json()
+        counts.append(log.count)
+
+    assert len(set(counts)) == 1, dict(zip(SIZES, counts))
@@ -0,0 +1,55 @@
+import pytest
+from app import db
+
+ARCHIVED_INDEX = 'ix_goal_user_id_archived_category'
+
+
+def query_plan(app, statement, parameters):
+    """SQLite's EXPLAIN QUERY PLAN details for one executed statement"""
+    with app.app_context():
+        rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+        db.session.remove()
+    return [row[3] for row in rows]
+
+
+def archived_filters(executed):
+    """The executed goal SELECTs that filter on archived"""
+    return [(statement, parameters) for statement, parameters in executed
+            if statement.startswith('SELECT') and '\nFROM goal' in statement and 'goal.archived' in statement.split('WHERE')[-1]]
+
+
+@pytest.fixture
+def goals(client, auth_headers):
+    for title, category in (('Run', 'Health'), ('Read', 'Personal'), ('Ship', 'Work')):
+        client.post('/goals/', json={'title': title, 'category': category}, headers=auth_headers)
+
+
+@pytest.mark.parametrize('query, searched', [
+    ('', 'user_id=? AND archived=?'),
+    ('?category=Work', 'user_id=? AND archived=? AND category=?'),
+])
+def test_active_goal_list_searches_archived_index(app, client, auth_headers, goals, executed, query, searched):
+    response = client.get(f'/goals/{query}', headers=auth_headers)
+    assert response.status_code == 200
+
+    selects = archived_filters(executed)
+    assert selects
+    for statement, parameters in selects:
+        plan = query_plan(app, statement, parameters)
+        assert any(f'USING INDEX {ARCHIVED_INDEX} ({searched})' in detail for detail in plan), plan
+        assert not any(detail.startswith('SCAN goal') for detail in plan), plan
+
+
+def test_archived_filter_has_no_null_branch(app, client, auth_headers, goals, executed):
+    client.get('/goals/', headers=auth_headers)
+
+    for statement, _ in archived_filters(executed):
+        assert 'archived IS NULL' not in statement
+
+
+def test_stats_read_only_the_window_through_the_primary_key(app, client, auth_headers, goals, executed):
+    assert client.get('/goals/stats?days=7', headers=auth_headers).status_code == 200
+
+    [(statement, parameters)] = [(statement, parameters) for statement, parameters in executed if 'FROM daily_stat' in statement]
+    plan = query_plan(app, statement, parameters)
+    assert any(detail.startswith('SEARCH daily_stat') and '(user_id=? AND day>?)' in detail for detail in plan), plan
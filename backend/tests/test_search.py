@@ -0,0 +1,66 @@
+import pytest
+from app import db
+from .conftest import register
+
+
+def search(client, headers, query, **params):
+    response = client.get('/goals/search', query_string={'q': query, **params}, headers=headers)
+    assert response.status_code == 200
+    return [goal['title'] for goal in response.get_json()['goals']]
+
+
+@pytest.fixture
+def goals(client, auth_headers):
+    response = client.post('/goals/bulk', json={'operations': [
+        {'op': 'create', 'title': 'Weekend long runs', 'milestones': [{'title': 'Finish a marathon'}]},
+        {'op': 'create', 'title': 'Marathon training', 'description': 'Build up the mileage'},
+        {'op': 'create', 'title': 'Learn Spanish', 'description': 'Café conversations'},
+    ]}, headers=auth_headers)
+    return [result['data'] for result in response.get_json()['results']]
+
+
+def test_terms_match_word_prefixes(client, auth_headers, goals):
+    assert search(client, auth_headers, 'spa') == ['Learn Spanish']
+    assert search(client, auth_headers, 'SPANISH') == ['Learn Spanish']
+    assert search(client, auth_headers, 'cafe') == ['Learn Spanish']
+    assert search(client, auth_headers, 'athon') == []
+
+
+def test_terms_longer_than_the_indexed_prefix_must_match_in_full(client, auth_headers, goals):
+    assert search(client, auth_headers, 'mileage') == ['Marathon training']
+    assert search(client, auth_headers, 'milestone') == []
+
+
+def test_every_term_must_match(client, auth_headers, goals):
+    assert search(client, auth_headers, 'marathon train') == ['Marathon training']
+    assert search(client, auth_headers, 'marathon spanish') == []
+
+
+def test_title_matches_rank_above_milestone_matches(client, auth_headers, goals):
+    assert search(client, auth_headers, 'marathon') == ['Marathon training', 'Weekend long runs']
+
+
+def test_results_are_paged_in_rank_order(client, auth_headers, goals):
+    response = client.get('/goals/search', query_string={'q': 'marathon', 'limit': 1}, headers=auth_headers).get_json()
+    assert [goal['title'] for goal in response['goals']] == ['Marathon training']
+    assert response['next_offset'] == 1
+
+    assert search(client, auth_headers, 'marathon', limit=1, offset=1) == ['Weekend long runs']
+
+
+def test_other_users_goals_are_not_found(client, auth_headers, goals):
+    assert search(client, register(client, 'bob'), 'marathon') == []
+
+
+def test_short_queries_are_rejected(client, auth_headers):
+    assert client.get('/goals/search', query_string={'q': 'a'}, headers=auth_headers).status_code == 400
+
+
+def test_other_databases_fall_back_to_substring_matching(app, client, auth_headers, goals, monkeypatch):
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'name', 'postgresql')
+
+    # Substrings match anywhere; results are ordered by most recently updated
+    client.put(f'/goals/{goals[0]["id"]}', json={'title': 'Weekend long runs, marathon pace'}, headers=auth_headers)
+    assert search(client, auth_headers, 'athon') == ['Weekend long runs, marathon pace', 'Marathon training']
+    assert search(client, auth_headers, 'marathon mileage') == ['Marathon training']
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine
+from .conftest import register
+
+
+@pytest.fixture
+def app_config(app_config, tmp_path):
+    return {**app_config, 'SHARD_URLS': [f'sqlite:///{tmp_path / "shard1.db"}']}
+
+
+@pytest.fixture
+def query(tmp_path):
+    """Run a query straight against one shard's database file"""
+    engines = {0: create_engine(f'sqlite:///{tmp_path / "focusflow.db"}'), 1: create_engine(f'sqlite:///{tmp_path / "shard1.db"}')}
+
+    def run(shard, sql):
+        with engines[shard].connect() as connection:
+            return connection.exec_driver_sql(sql).all()
+
+    yield run
+    for engine in engines.values():
+        engine.dispose()
+
+
+def test_users_and_their_goals_live_on_their_shard(client, query):
+    # Ids are handed out by the directory; user 1 lands on shard 1, user 2 on shard 0
+    alice, bob = register(client, 'alice'), register(client, 'bob')
+    client.post('/goals/', json={'title': 'Alice goal'}, headers=alice)
+    client.post('/goals/', json={'title': 'Bob goal'}, headers=bob)
+
+    assert query(0, 'SELECT id, username FROM user_directory ORDER BY id') == [(1, 'alice'), (2, 'bob')]
+    assert query(1, 'SELECT id, username FROM user') == [(1, 'alice')]
+    assert query(0, 'SELECT id, username FROM user') == [(2, 'bob')]
+    assert query(1, 'SELECT title FROM goal') == [('Alice goal',)]
+    assert query(0, 'SELECT title FROM goal') == [('Bob goal',)]
+
+
+def test_goal_ids_repeat_across_shards_without_mixing_users(client):
+    alice, bob = register(client, 'alice'), register(client, 'bob')
+    alice_goal = client.post('/goals/', json={'title': 'Alice goal'}, headers=alice).get_json()
+    bob_goal = client.post('/goals/', json={'title': 'Bob goal'}, headers=bob).get_json()
+    assert alice_goal['id'] == bob_goal['id']
+
+    assert client.get(f'/goals/{alice_goal["id"]}', headers=alice).get_json()['title'] == 'Alice goal'
+    assert client.get(f'/goals/{bob_goal["id"]}', headers=bob).get_json()['title'] == 'Bob goal'
+    assert [goal['title'] for goal in client.get('/goals/', headers=bob).get_json()] == ['Bob goal']
+
+
+def test_login_finds_the_user_through_the_directory(client):
+    register(client, 'alice')
+    register(client, 'bob')
+
+    for username in ('alice', 'bob'):
+        response = client.post('/auth/login', json={'username': username, 'password': 'secret'})
+        assert response.status_code == 200
+        assert response.get_json()['username'] == username
+
+    assert client.post('/auth/login', json={'username': 'alice', 'password': 'wrong'}).status_code == 401
+    assert client.post('/auth/login', json={'username': 'carol', 'password': 'secret'}).status_code == 401
+    assert client.post('/auth/register', json={'username': 'alice', 'password': 'other'}).status_code == 400
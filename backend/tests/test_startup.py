@@ -0,0 +1,107 @@
+import click
+import json
+import os
+import pytest
+import subprocess
+import sys
+from flask_migrate import Migrate, stamp
+from sqlalchemy import create_engine, inspect
+from app import create_app, db
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Builds the app as a flask CLI command would, in a fresh interpreter so the
+# test's own imports do not mask what create_app pulls in
+CLI_STARTUP = '''
+import click, json, sys
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+from app import create_app
+with click.Context(click.Command(sys.argv[1])):
+    create_app()
+print(json.dumps({
+    'modules': sorted(name for name in sys.modules if name.split('.')[0] in ('alembic', 'flask_migrate')),
+    'statements': statements,
+}))
+'''
+
+
+def make_app(path, **config):
+    return create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'RESPONSE_CACHE': 'none', **config})
+
+
+def table_names(path):
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        return set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+
+
+def stamp_head(app):
+    Migrate(app, db, directory=app.config['MIGRATIONS_DIR'])
+    with app.app_context():
+        stamp(directory=app.config['MIGRATIONS_DIR'])
+
+
+def test_check_refuses_unmigrated_database(tmp_path):
+    with pytest.raises(RuntimeError, match='at revision none'):
+        make_app(tmp_path / 'focusflow.db', DB_STARTUP='check')
+
+
+def test_check_refuses_outdated_database(tmp_path):
+    path = tmp_path / 'focusflow.db'
+    stamp_head(make_app(path))
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE alembic_version SET version_num = '17679866ef6b'")
+    engine.dispose()
+
+    with pytest.raises(RuntimeError, match='flask db upgrade'):
+        make_app(path, DB_STARTUP='check')
+
+
+def test_check_accepts_database_at_head(tmp_path):
+    path = tmp_path / 'focusflow.db'
+    stamp_head(make_app(path))
+
+    make_app(path, DB_STARTUP='check')
+
+
+def test_skip_creates_nothing(tmp_path):
+    path = tmp_path / 'focusflow.db'
+    make_app(path, DB_STARTUP='skip')
+
+    assert table_names(path) == set()
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='DB_STARTUP'):
+        make_app(tmp_path / 'focusflow.db', DB_STARTUP='migrate')
+
+
+@pytest.mark.parametrize('command, creates', [('upgrade', False), ('routes', False), ('run', True)])
+def test_only_flask_run_creates_tables_under_the_cli(tmp_path, command, creates):
+    path = tmp_path / 'focusflow.db'
+    with click.Context(click.Command(command)):
+        make_app(path)
+
+    assert ('goal' in table_names(path)) == creates
+
+
+@pytest.mark.parametrize('command', ['upgrade', 'routes'])
+def test_cli_startup_skips_migrations_and_ddl(tmp_path, command):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{tmp_path / "focusflow.db"}', DB_STARTUP='create_all')
+    output = subprocess.run(
+        [sys.executable, '-c', CLI_STARTUP, command], cwd=BACKEND_DIR, env=env,
+        check=True, capture_output=True, text=True
+    ).stdout
+    startup = json.loads(output.splitlines()[-1])
+
+    assert startup['modules'] == []
+    assert [
+        statement for statement in startup['statements']
+        if statement.lstrip().split(' ', 1)[0].upper() in ('CREATE', 'ALTER', 'DROP')
+    ] == []
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import DailyStat
+
+
+def test_days_outside_the_window_are_left_out(app, client, auth_headers):
+    goal = client.post('/goals/bulk', json={'operations': [
+        {'op': 'create', 'title': 'Goal', 'category': 'Health', 'milestones': [{'title': 'First'}, {'title': 'Second'}]}
+    ]}, headers=auth_headers).get_json()['results'][0]['data']
+    client.put(f'/goals/milestones/{goal["milestones"][0]["id"]}', json={'completed': True}, headers=auth_headers)
+
+    today = datetime.utcnow().date()
+    with app.app_context():
+        db.session.add(DailyStat(
+            user_id=goal['user_id'], day=today - timedelta(days=7), category='Health',
+            milestones_added=5, milestones_completed=5, goals_archived=1
+        ))
+        db.session.commit()
+
+    week = client.get('/goals/stats?days=7', headers=auth_headers).get_json()
+    assert week['categories']['Health'] == {'milestones': 2, 'completed': 1, 'goals_archived': 0, 'completion_rate': 0.5}
+    assert [day['completed'] for day in week['daily']] == [0] * 6 + [1]
+    assert week['streak'] == {'current': 1, 'longest': 1}
+
+    longer = client.get('/goals/stats?days=8', headers=auth_headers).get_json()
+    assert longer['categories']['Health']['milestones'] == 7
+    assert longer['daily'][0] == {'day': (today - timedelta(days=7)).isoformat(), 'completed': 5}
@@ -0,0 +1,56 @@
+def changes(client, headers, since=None):
+    query_string = {'since': since} if since is not None else {}
+    return client.get('/goals/changes', query_string=query_string, headers=headers)
+
+
+def create_goals(client, headers, *titles):
+    response = client.post('/goals/bulk', json={'operations': [
+        {'op': 'create', 'title': title, 'milestones': [{'title': f'{title} step'}]} for title in titles
+    ]}, headers=headers)
+    return [result['data'] for result in response.get_json()['results']]
+
+
+def test_changes_since_a_cursor_hold_only_what_changed(client, auth_headers):
+    first, second = create_goals(client, auth_headers, 'First', 'Second')
+    full = changes(client, auth_headers).get_json()
+    assert [goal['title'] for goal in full['goals']] == ['First', 'Second']
+
+    client.put(f'/goals/{second["id"]}', json={'title': 'Second, renamed'}, headers=auth_headers)
+    delta = changes(client, auth_headers, full['cursor']).get_json()
+    assert [goal['title'] for goal in delta['goals']] == ['Second, renamed']
+    assert delta['deleted'] == {'goals': [], 'milestones': []}
+
+    assert changes(client, auth_headers, delta['cursor']).get_json()['goals'] == []
+
+
+def test_deletions_are_reported_as_tombstones(client, auth_headers):
+    first, second = create_goals(client, auth_headers, 'First', 'Second')
+    cursor = changes(client, auth_headers).get_json()['cursor']
+
+    client.delete(f'/goals/milestones/{first["milestones"][0]["id"]}', headers=auth_headers)
+    client.delete(f'/goals/{second["id"]}', headers=auth_headers)
+    delta = changes(client, auth_headers, cursor).get_json()
+
+    assert delta['deleted'] == {'goals': [second['id']], 'milestones': [first['milestones'][0]['id']]}
+    # The goal that lost a milestone changed too; the deleted one is gone
+    assert [goal['id'] for goal in delta['goals']] == [first['id']]
+
+
+def test_cursor_below_the_compaction_floor_must_resync(app, client, auth_headers):
+    first, second = create_goals(client, auth_headers, 'First', 'Second')
+    old_cursor = changes(client, auth_headers).get_json()['cursor']
+    client.delete(f'/goals/{second["id"]}', headers=auth_headers)
+    new_cursor = changes(client, auth_headers, old_cursor).get_json()['cursor']
+
+    result = app.test_cli_runner().invoke(args=['compact-tombstones', '--days', '-1'])
+    assert 'Removed 1 tombstones' in result.output
+
+    assert changes(client, auth_headers, old_cursor).status_code == 410
+    assert changes(client, auth_headers, new_cursor).status_code == 200
+    full = changes(client, auth_headers).get_json()
+    assert [goal['id'] for goal in full['goals']] == [first['id']]
+
+
+def test_invalid_cursors_are_rejected(client, auth_headers):
+    assert changes(client, auth_headers, 'abc').status_code == 400
+    assert changes(client, auth_headers, -1).status_code == 400
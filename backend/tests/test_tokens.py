@@ -0,0 +1,51 @@
+import pytest
+import time
+from types import SimpleNamespace
+from app import create_app, tokens
+
+
+@pytest.fixture
+def worker(app):
+    """A second app on the same database, standing in for another worker process"""
+    other = create_app({
+        name: app.config[name]
+        for name in ('SQLALCHEMY_DATABASE_URI', 'TESTING', 'RESPONSE_CACHE', 'RATE_LIMIT_PER_SECOND', 'QUERY_CHECKS')
+    })
+    yield other
+    with other.app_context():
+        for engine in other.extensions['sqlalchemy'].engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the time seen by the token cache with one the test moves by hand"""
+    now = SimpleNamespace(value=time.time())
+    monkeypatch.setattr(tokens, 'time', SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_logout_revokes_the_token(client, auth_headers):
+    assert client.get('/goals/', headers=auth_headers).status_code == 200
+
+    assert client.post('/auth/logout', headers=auth_headers).status_code == 200
+    assert client.get('/goals/', headers=auth_headers).status_code == 401
+    assert client.post('/auth/logout', headers=auth_headers).status_code == 401
+
+
+def test_logout_is_seen_by_a_worker_that_never_cached_the_token(client, auth_headers, worker):
+    client.post('/auth/logout', headers=auth_headers)
+
+    assert worker.test_client().get('/goals/', headers=auth_headers).status_code == 401
+
+
+def test_logout_reaches_other_workers_once_their_cache_entry_is_rechecked(app, client, auth_headers, worker, clock):
+    other = worker.test_client()
+    assert other.get('/goals/', headers=auth_headers).status_code == 200
+
+    client.post('/auth/logout', headers=auth_headers)
+    # The other worker still trusts its cached verification until cache_ttl passes
+    assert other.get('/goals/', headers=auth_headers).status_code == 200
+
+    clock.value += app.config['TOKEN_CACHE_TTL'] + 1
+    assert other.get('/goals/', headers=auth_headers).status_code == 401